@@ -17,7 +17,8 @@ from starlette.background import BackgroundTask
 from database.models import Site
 from database.session import get_session
 from settings import VARS
-from site_manager import backup_site, remove_site
+from site_manager import backup_site
+from site_manager.reaper import reap_sites_in_background
 from utils.auth import (
     create_access_token,
     create_download_token,
@@ -329,12 +330,12 @@ async def delete_site(
     site.removed_at = datetime.now()
     site.removed_ip = client_ip
     site.removal_reason = "Requested by you through settings. This deletion is permanent and cannot be undone."
-
-    background_tasks.add_task(
-        remove_site, site, skip_backup=True, reason=site.removal_reason
-    )
+    site.purge_skip_backup = True
     await db.commit()
 
+    # picks up every pending removal, so a burst of deletions is reaped in one batch
+    background_tasks.add_task(reap_sites_in_background)
+
     return {
         "message": "Your site is being removed. You will receive an email when the process is complete. If you haven't received anything, please contact us."
     }
@@ -15,8 +15,8 @@ from site_manager.custom_domains import (
     link_custom_domain,
     rewrite_urls,
     unlink_custom_domain,
-    write_nginx_maps,
 )
+from site_manager.nginx_maps import update_nginx_maps
 from utils.auth import get_current_site
 
 V1_SETTINGS = fa.APIRouter(prefix="/settings", tags=["settings"])
@@ -121,7 +121,7 @@ async def change_parent_domain(
     old_hostname = site.hostname
     site.hostname = new_hostname
     await db.commit()
-    await write_nginx_maps(db)
+    await update_nginx_maps(db, site)
     await rewrite_urls(site, old_hostname)
 
     return {"message": f"Parent domain changed. Your site is now at '{new_hostname}'."}
@@ -12,7 +12,7 @@ from database.models import Site
 from database.session import async_session_factory, get_session
 from settings import VARS
 from site_manager import provision_site
-from site_manager.custom_domains import write_nginx_maps
+from site_manager.nginx_maps import update_nginx_maps
 from utils import is_tag_blacklisted, random_string, validate_tag
 from utils.auth import create_reset_token
 from utils.health import get_health_status
@@ -102,6 +102,11 @@ async def signup(
             raise fa.HTTPException(
                 status_code=400, detail="A site with this tag already exists"
             )
+        if existing.is_pending_purge():
+            raise fa.HTTPException(
+                status_code=409,
+                detail="A site with this tag is still being removed, try again later",
+            )
         await db.delete(existing)
         await db.flush()
 
@@ -120,13 +125,15 @@ async def signup(
 
 async def _provision_and_finalize(site_tag: str, reset_token: str):
     async with async_session_factory() as db:
-        site = await db.get(Site, site_tag)
+        provisioned = await db.get(Site, site_tag)
 
     # runs outside the session so we don't hold a DB connection during provisioning
-    await asyncio.to_thread(provision_site, site, reset_token)
+    await asyncio.to_thread(provision_site, provisioned, reset_token)
 
     async with async_session_factory() as db:
         site = await db.get(Site, site_tag)
+        # set by provision_site on the detached instance, which no session tracks
+        site.skeleton_release = provisioned.skeleton_release
         site.installed_at = datetime.now()
         await db.commit()
-        await write_nginx_maps(db)
+        await update_nginx_maps(db, site)
@@ -0,0 +1,181 @@
+"""
+Mount table size vs. per-tenant mount lookups, for the bind and overlay layouts.
+
+For every tenant count, a mount table with the layout's mounts per tenant
+(bind: one per mount_paths entry, overlay: one) on top of `--base` system
+mounts is generated, and the time to find the mounts of every tenant is
+measured with the legacy `mount | grep <tenant_dir>` scan (one scan per
+tenant, as backup and cleanup did) and with `utils.mounts.MountIndex` (one
+parse per batch).
+
+With `--live` (root only) the mounts are created for real as bind mounts of
+an empty directory under `--workdir`, so the kernel side is included:
+`/proc/self/mountinfo` read time, `grep` scans over the real `mount` output
+and the time to unmount everything again.
+
+    python -m benchmarks.mounts --tenants 1000,5000,20000
+"""
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from site_manager.skeleton import load_file_vars
+from utils.mounts import MOUNTINFO_PATH, MountIndex, parse_mountinfo
+
+SYSTEM_LINE = (
+    "{id} 1 0:{id} / /sys/fs/unit{id} rw,relatime shared:{id} - tmpfs tmpfs rw"
+)
+TENANT_LINE = (
+    "{id} 1 8:1 /srv/skeleton/mediawiki/{path} {root}/{tag}/{path} ro,relatime"
+    " shared:1 - ext4 /dev/sda1 rw"
+)
+
+
+def layouts(site_type: str) -> dict[str, list[str]]:
+    file_vars = load_file_vars(site_type)
+    return {
+        "bind": file_vars["mount_paths"],
+        "overlay": [file_vars["overlay_root"]],
+    }
+
+
+def generate_mountinfo(root: str, tenants: int, paths: list[str], base: int) -> str:
+    lines = [SYSTEM_LINE.format(id=i) for i in range(base)]
+    for t in range(tenants):
+        for path in paths:
+            lines.append(
+                TENANT_LINE.format(
+                    id=len(lines), root=root, tag=f"site{t:06d}", path=path
+                )
+            )
+    return "\n".join(lines) + "\n"
+
+
+def time_grep_scans(mount_output: str, root: str, tags: list[str]) -> float:
+    """One `grep` over the whole table per tenant, like `mount | grep` in the playbooks."""
+
+    started = time.perf_counter()
+    for tag in tags:
+        subprocess.run(
+            ["grep", f"{root}/{tag}"],
+            input=mount_output,
+            capture_output=True,
+            text=True,
+        )
+    return time.perf_counter() - started
+
+
+def time_index(mountinfo: str, root: Path, tags: list[str]) -> float:
+    started = time.perf_counter()
+    index = MountIndex(parse_mountinfo(mountinfo), root=root)
+    for tag in tags:
+        index.get(tag)
+    return time.perf_counter() - started
+
+
+def run_live(workdir: Path, tenants: int, paths: list[str], sample: int) -> None:
+    source = workdir / "source"
+    source.mkdir()
+    mount_points = [
+        workdir / f"site{t:06d}" / path for t in range(tenants) for path in paths
+    ]
+
+    started = time.perf_counter()
+    for mount_point in mount_points:
+        mount_point.mkdir(parents=True, exist_ok=True)
+        subprocess.run(["mount", "--bind", "-o", "ro", source, mount_point], check=True)
+    mount_s = time.perf_counter() - started
+
+    try:
+        started = time.perf_counter()
+        mountinfo = MOUNTINFO_PATH.read_text()
+        read_ms = (time.perf_counter() - started) * 1000
+        tags = [f"site{t:06d}" for t in range(0, tenants, max(tenants // sample, 1))]
+        mount_output = subprocess.run(["mount"], capture_output=True, text=True).stdout
+        grep_s = time_grep_scans(mount_output, str(workdir), tags) / len(tags)
+        index_s = time_index(mountinfo, workdir, tags)
+        print(
+            f"    live: {len(parse_mountinfo(mountinfo))} mounts in table,"
+            f" mounting took {mount_s:.1f}s, mountinfo read {read_ms:.0f}ms,"
+            f" grep {grep_s * 1000:.1f}ms/tenant, index {index_s * 1000:.0f}ms/batch"
+        )
+    finally:
+        started = time.perf_counter()
+        for mount_point in reversed(mount_points):
+            subprocess.run(["umount", mount_point], check=False)
+        print(f"    live: unmounting took {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--tenants",
+        default="1000,5000,20000",
+        help="Comma separated tenant counts (default: 1000,5000,20000)",
+    )
+    parser.add_argument(
+        "--service",
+        default="mediawiki",
+        choices=["mediawiki", "wordpress"],
+        help="Site type whose mount paths are used (default: mediawiki)",
+    )
+    parser.add_argument(
+        "--base",
+        type=int,
+        default=50,
+        help="System mounts in the table besides tenant mounts (default: 50)",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=50,
+        help="Tenants looked up per case, grep time is per tenant (default: 50)",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        default=False,
+        help="Also create the mounts for real (needs root)",
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=Path(tempfile.gettempdir()),
+        help="Where --live mounts are created (default: $TMPDIR)",
+    )
+
+    args = parser.parse_args()
+    root = "/srv/tenants"
+    print(
+        f"{'TENANTS':>8}  {'LAYOUT':<8} {'MOUNTS':>8} {'GREP_MS/TENANT':>15}"
+        f" {'BATCH_GREP_S':>13} {'INDEX_MS/BATCH':>15}"
+    )
+
+    for tenants in (int(t) for t in args.tenants.split(",")):
+        tags = [
+            f"site{t:06d}" for t in range(0, tenants, max(tenants // args.sample, 1))
+        ]
+        for layout, paths in layouts(args.service).items():
+            mountinfo = generate_mountinfo(root, tenants, paths, args.base)
+            # `mount` prints "<source> on <mount point> type ..." per line, same size class
+            mount_output = mountinfo
+            grep_s = time_grep_scans(mount_output, root, tags) / len(tags)
+            index_s = time_index(mountinfo, Path(root), tags)
+            mounts = args.base + tenants * len(paths)
+            print(
+                f"{tenants:>8}  {layout:<8} {mounts:>8} {grep_s * 1000:>15.1f}"
+                f" {grep_s * tenants:>13.1f} {index_s * 1000:>15.0f}"
+            )
+
+            if args.live:
+                with tempfile.TemporaryDirectory(
+                    dir=args.workdir, prefix="mounts-bench-"
+                ) as tmp:
+                    run_live(Path(tmp), tenants, paths, args.sample)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Compare the full and compact nginx map modes at various tenant counts.
+
+For every (count, mode) pair this renders a synthetic map, reports its size,
+and - if an nginx binary is available - runs `nginx -t` against a minimal
+config that includes it. `nginx -t` does the same parsing and hash building a
+reload does, so its wall time and peak RSS approximate reload time and the map
+memory of every new master/worker generation.
+
+Run with the API environment loaded (`.envrc`), e.g.:
+
+    python -m benchmarks.nginx_maps --counts 1000,10000,30000
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from shutil import which
+
+from settings import VARS
+from site_manager.nginx_maps import MAP_MODES, render_nginx_maps
+
+NGINX_CONF = """\
+pid {prefix}/nginx.pid;
+error_log {prefix}/error.log;
+events {{}}
+http {{
+    access_log off;
+    map_hash_max_size 1048576;
+    map_hash_bucket_size 128;
+    server_names_hash_max_size 1048576;
+    server_names_hash_bucket_size 128;
+
+    include {prefix}/sites.conf;
+
+    server {{
+        listen unix:{prefix}/nginx.sock;
+        server_name _;
+        include {prefix}/custom-server-names.conf;
+        return 200 "$site_id $service_type $canonical_host";
+    }}
+}}
+"""
+
+
+def generate_entries(count: int, custom_ratio: float) -> dict[str, list[str]]:
+    rng = random.Random(count)
+    site_types = ("flarum", "mediawiki", "wordpress")
+    entries = {}
+    for i in range(count):
+        tag = f"site{i:06d}"
+        if rng.random() < custom_ratio:
+            hostname = f"www.{tag}-example.com"
+        else:
+            hostname = f"{tag}.{rng.choice(VARS['allowed_domains'])}"
+        entries[tag] = [hostname, rng.choice(site_types)]
+    return entries
+
+
+def run_nginx_test(nginx: str, prefix: Path) -> tuple[float, int]:
+    """Returns (seconds, peak RSS in KiB) of `nginx -t` on the config in `prefix`."""
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [nginx, "-t", "-q", "-p", str(prefix), "-c", str(prefix / "nginx.conf")],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    _, status, rusage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"nginx -t failed: {process.stderr.read().decode()}")
+    return elapsed, rusage.ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--counts",
+        default="1000,5000,10000,30000",
+        help="Comma separated tenant counts (default: 1000,5000,10000,30000)",
+    )
+    parser.add_argument(
+        "--custom-ratio",
+        type=float,
+        default=0.05,
+        help="Share of sites with a custom domain (default: 0.05)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="nginx -t runs per case, best one is reported (default: 3)",
+    )
+    parser.add_argument(
+        "--nginx",
+        default=which("nginx") or which("nginx", path="/usr/sbin"),
+        help="nginx binary (default: from PATH)",
+    )
+
+    args = parser.parse_args()
+    if not args.nginx:
+        print("nginx not found, only reporting rendered map sizes\n")
+
+    print(f"parent domains: {len(VARS['allowed_domains'])}")
+    print(
+        f"{'SITES':>7}  {'MODE':<8} {'LINES':>8} {'KB':>8} {'RENDER_MS':>10}"
+        f" {'NGINX_T_MS':>11} {'PEAK_RSS_MB':>12}"
+    )
+
+    for count in (int(c) for c in args.counts.split(",")):
+        entries = generate_entries(count, args.custom_ratio)
+        for mode in MAP_MODES:
+            started = time.perf_counter()
+            sites_config, server_names_config = render_nginx_maps(entries, mode)
+            render_ms = (time.perf_counter() - started) * 1000
+
+            nginx_ms = peak_mb = "-"
+            if args.nginx:
+                with tempfile.TemporaryDirectory(prefix="nginx-maps-bench-") as tmp:
+                    prefix = Path(tmp)
+                    (prefix / "logs").mkdir()
+                    (prefix / "sites.conf").write_text(sites_config)
+                    (prefix / "custom-server-names.conf").write_text(
+                        server_names_config
+                    )
+                    (prefix / "nginx.conf").write_text(NGINX_CONF.format(prefix=tmp))
+                    runs = [
+                        run_nginx_test(args.nginx, prefix) for _ in range(args.repeat)
+                    ]
+                nginx_ms = f"{min(r[0] for r in runs) * 1000:.0f}"
+                peak_mb = f"{min(r[1] for r in runs) / 1024:.1f}"
+
+            print(
+                f"{count:>7}  {mode:<8} {sites_config.count(chr(10)):>8}"
+                f" {len(sites_config) / 1024:>8.0f} {render_ms:>10.0f}"
+                f" {nginx_ms:>11} {peak_mb:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compare ways of materializing a tenant file tree from a skeleton.
+
+- rsync: `rsync -a` + `find -exec chown` over the copy, the legacy
+  copy_structure.yml path
+- snapshot: `cp --reflink=auto` of a prepared template, run as the owner, no
+  chown pass (what provisioning does with a template)
+- hardlink: `cp -al`, for reference only; tenants can't share inodes of files
+  they own and write to
+
+The tree is synthetic (`--files` files spread over directories like a PHP
+app) unless `--source` points at a real skeleton/template. Without root the
+chown is to the current user, which still costs one syscall per file. Run
+the benchmark on the tenant filesystem (`--workdir`), reflinks only work
+within a single btrfs/XFS filesystem.
+
+    python -m benchmarks.provision_tree --files 5000,20000 --workdir /srv/tmp
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+
+def generate_tree(root: Path, count: int) -> None:
+    rng = random.Random(count)
+    dirs = [root / "app" / "public"]
+    for i in range(count):
+        if i % 20 == 0:
+            parent = rng.choice(dirs)
+            dirs.append(parent / f"dir{i:06d}")
+            dirs[-1].mkdir(parents=True, exist_ok=True)
+        path = rng.choice(dirs) / f"file{i:06d}.php"
+        path.write_bytes(rng.randbytes(rng.randint(200, 20_000)))
+
+
+def supports_reflink(workdir: Path) -> bool:
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        src = Path(tmp) / "src"
+        src.write_bytes(b"x" * 4096)
+        result = subprocess.run(
+            ["cp", "--reflink=always", src, Path(tmp) / "dst"],
+            capture_output=True,
+        )
+        return result.returncode == 0
+
+
+def run(*commands: list[str]) -> float:
+    started = time.perf_counter()
+    for command in commands:
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def strategies(src: Path, dest: Path) -> dict[str, list[list[str]]]:
+    owner = f"{os.getuid()}:{os.getgid()}"
+    return {
+        "rsync": [
+            ["rsync", "-a", f"{src}/", f"{dest}/"],
+            ["find", str(dest), "-exec", "chown", owner, "{}", "+"],
+        ],
+        "snapshot": [
+            [
+                "cp",
+                "--recursive",
+                "--no-target-directory",
+                "--no-dereference",
+                "--preserve=mode,timestamps,links",
+                "--reflink=auto",
+                str(src),
+                str(dest),
+            ],
+        ],
+        "hardlink": [["cp", "-al", "--no-target-directory", str(src), str(dest)]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--files",
+        default="2000,10000,30000",
+        help="Comma separated file counts of the synthetic tree (default: 2000,10000,30000)",
+    )
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=None,
+        help="Benchmark against an existing tree instead of a synthetic one",
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=Path(tempfile.gettempdir()),
+        help="Where trees are created, should be the tenant filesystem (default: $TMPDIR)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per case, best one is reported (default: 3)",
+    )
+
+    args = parser.parse_args()
+    reflink = supports_reflink(args.workdir)
+    print(
+        f"workdir: {args.workdir} (reflinks {'supported' if reflink else 'unsupported, cp copies'})"
+    )
+    print(f"{'FILES':>7}  {'MODE':<9} {'BEST_MS':>9} {'PER_FILE_US':>12}")
+
+    counts = [None] if args.source else [int(c) for c in args.files.split(",")]
+    for count in counts:
+        with tempfile.TemporaryDirectory(dir=args.workdir, prefix="tree-bench-") as tmp:
+            src = args.source
+            if src is None:
+                src = Path(tmp) / "template"
+                generate_tree(src, count)
+            files = sum(len(f) for _, _, f in os.walk(src))
+
+            for mode in ("rsync", "snapshot", "hardlink"):
+                timings = []
+                for i in range(args.repeat):
+                    dest = Path(tmp) / f"{mode}-{i}"
+                    timings.append(run(*strategies(src, dest)[mode]))
+                    shutil.rmtree(dest)
+                best = min(timings)
+                print(
+                    f"{files:>7}  {mode:<9} {best * 1000:>9.0f}"
+                    f" {best / files * 1_000_000:>12.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
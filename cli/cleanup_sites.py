@@ -3,12 +3,10 @@ import asyncio
 import sys
 from datetime import datetime, timedelta
 
-from sqlalchemy import func, select
-
-from database.models import Site, SiteStats
+from database.models import Site, SiteStatsLatest
 from database.session import async_session_factory, engine
-from site_manager import remove_site as do_remove
-from site_manager.custom_domains import write_nginx_maps
+from database.stats import disk_growth_mb, get_latest_stats, get_weekly_growth
+from site_manager.reaper import REAPER_CONCURRENCY, reap_sites
 
 MIN_AGE_DAYS = 60
 
@@ -16,17 +14,28 @@ MIN_AGE_DAYS = 60
 MAX_CONTENT = 10_000
 MAX_USERS = 5_000
 MAX_ASSETS_MB = 500
+MAX_DB_MB = 1_000  # data + index
+MAX_DB_ROWS = 5_000_000
 
 # inactive
 MIN_CONTENT = 10
 MIN_USERS = 2
 
 
-def _classify(stats: SiteStats) -> str | None:
+def _db_size_mb(stats: SiteStatsLatest) -> float:
+    return (stats.db_data_mb or 0.0) + (stats.db_index_mb or 0.0)
+
+
+def _classify(stats: SiteStatsLatest) -> str | None:
+    db_size_mb = _db_size_mb(stats)
+    db_rows = stats.db_rows or 0
+
     if (
         stats.content_count > MAX_CONTENT
         or stats.user_count > MAX_USERS
         or stats.assets_mb > MAX_ASSETS_MB
+        or db_size_mb > MAX_DB_MB
+        or db_rows > MAX_DB_ROWS
     ):
         parts = []
         if stats.content_count > MAX_CONTENT:
@@ -35,6 +44,10 @@ def _classify(stats: SiteStats) -> str | None:
             parts.append(f"users={stats.user_count}")
         if stats.assets_mb > MAX_ASSETS_MB:
             parts.append(f"assets={stats.assets_mb}MB")
+        if db_size_mb > MAX_DB_MB:
+            parts.append(f"db={db_size_mb:.1f}MB")
+        if db_rows > MAX_DB_ROWS:
+            parts.append(f"db_rows={db_rows}")
         return f"too active ({', '.join(parts)})"
 
     if stats.content_count < MIN_CONTENT or stats.user_count <= MIN_USERS:
@@ -48,26 +61,6 @@ def _classify(stats: SiteStats) -> str | None:
     return None
 
 
-async def _get_latest_stats(db) -> dict[str, SiteStats]:
-    latest_sub = (
-        select(
-            SiteStats.site_tag,
-            func.max(SiteStats.collected_at).label("max_collected"),
-        )
-        .group_by(SiteStats.site_tag)
-        .subquery()
-    )
-
-    stmt = select(SiteStats).join(
-        latest_sub,
-        (SiteStats.site_tag == latest_sub.c.site_tag)
-        & (SiteStats.collected_at == latest_sub.c.max_collected),
-    )
-
-    result = await db.execute(stmt)
-    return {row.site_tag: row for row in result.scalars()}
-
-
 async def _main():
     parser = argparse.ArgumentParser(
         description="Clean up inactive or excessively active tenant sites"
@@ -84,15 +77,23 @@ async def _main():
         action="store_true",
         help="Do not send removal notification emails",
     )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=REAPER_CONCURRENCY,
+        help=f"Number of sites removed in parallel (default: {REAPER_CONCURRENCY})",
+    )
 
     args = parser.parse_args()
     cutoff = datetime.now() - timedelta(days=MIN_AGE_DAYS)
 
     try:
         async with async_session_factory() as db:
-            latest_stats = await _get_latest_stats(db)
+            latest_stats = await get_latest_stats(db)
             if not latest_stats:
                 sys.exit("No stats collected yet. Run collect_stats first.")
+            growth = await get_weekly_growth(db)
 
             flagged: list[tuple[Site, str]] = []
 
@@ -124,11 +125,14 @@ async def _main():
                 "CONTENT",
                 "USERS",
                 "ASSETS MB",
+                "DB MB",
+                "MB/WEEK",
                 "REASON",
             ]
             rows = []
             for site, reason in flagged:
                 stats = latest_stats[site.tag]
+                site_growth = growth.get(site.tag)
                 rows.append(
                     [
                         site.tag,
@@ -137,6 +141,8 @@ async def _main():
                         str(stats.content_count),
                         str(stats.user_count),
                         f"{stats.assets_mb:.1f}",
+                        f"{_db_size_mb(stats):.1f}",
+                        (f"{disk_growth_mb(site_growth):+.1f}" if site_growth else "-"),
                         reason,
                     ]
                 )
@@ -148,26 +154,23 @@ async def _main():
                 print("(dry run — no changes made)")
                 return
 
+            now = datetime.now()
             for site, reason in flagged:
-                try:
-                    print(f"\nremoving {site.tag} ({reason})...")
-                    runner = do_remove(
-                        site,
-                        send_email=not args.no_send_email,
-                        reason=f"auto-cleanup: {reason}",
-                    )
-                    print(runner.stdout.read())
-                    print(runner.stderr.read())
-
-                    site.removed_at = datetime.now()
-                    site.removal_reason = f"auto-cleanup: {reason}"
-                    await db.commit()
-
-                    print(f"removed {site.tag}")
-                except Exception as e:
-                    print(f"failed to remove {site.tag}: {e}", file=sys.stderr)
-
-            await write_nginx_maps(db)
+                site.removed_at = now
+                site.removal_reason = f"auto-cleanup: {reason}"
+                site.purge_notify = not args.no_send_email
+            await db.commit()
+
+            # resources are removed in parallel, with one reload/map update per batch
+            tags = [site.tag for site, _ in flagged]
+            results = await reap_sites(
+                db, *tags, limit=len(tags), concurrency=args.concurrency
+            )
+            for tag, error in results.items():
+                if error is None:
+                    print(f"removed {tag}")
+                else:
+                    print(f"failed to remove {tag}: {error}", file=sys.stderr)
     finally:
         await engine.dispose()
 
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+from datetime import datetime
+
+import aiomysql
+from sqlalchemy import insert
+
+from database.models import DbUsageStats, Site
+from database.session import async_session_factory, engine
+from database.stats import get_db_usage
+from site_manager.db_usage import (
+    get_limited,
+    query_counters,
+    take_deltas,
+    update_limits,
+)
+
+MYSQL_SOCKET = "/var/run/mysqld/mysqld.sock"
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Collect per-tenant MariaDB workload (performance_schema), limit outliers"
+    )
+    parser.add_argument(
+        "--limit",
+        action="store_true",
+        default=False,
+        help="Apply MAX_USER_CONNECTIONS/MAX_QUERIES_PER_HOUR to outliers, lift them from calmed down tenants",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="With --limit, only show who would be limited or lifted",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="Print the top N database consumers of the last --hours",
+    )
+    parser.add_argument(
+        "--hours",
+        type=int,
+        default=24,
+        help="Window of the --top report in hours (default: 24)",
+    )
+
+    args = parser.parse_args()
+    now = datetime.now()
+
+    try:
+        async with async_session_factory() as db:
+            sites = {site.tag: site async for site in Site.get_all_active(db)}
+
+            pool = await aiomysql.create_pool(
+                unix_socket=MYSQL_SOCKET, user="root", minsize=1, maxsize=1
+            )
+            try:
+                deltas = {
+                    tag: delta
+                    for tag, delta in take_deltas(await query_counters(pool)).items()
+                    if tag in sites
+                }
+                if args.limit:
+                    donors = {tag for tag, site in sites.items() if site.is_donor()}
+                    limited, lifted = await update_limits(
+                        pool, deltas, set(sites), donors, dry_run=args.dry_run
+                    )
+                    for tag in limited:
+                        print(f"limit {tag}")
+                    for tag in lifted:
+                        print(f"lift {tag}")
+            finally:
+                pool.close()
+                await pool.wait_closed()
+
+            if deltas:
+                await db.execute(
+                    insert(DbUsageStats),
+                    [
+                        {"site_tag": tag, **delta, "collected_at": now}
+                        for tag, delta in deltas.items()
+                    ],
+                )
+            await db.commit()
+            print(f"collected database workload of {len(deltas)} active tenants")
+
+            if args.top:
+                usage = await get_db_usage(db, hours=args.hours)
+                _print_top(usage, args.top, args.hours)
+    finally:
+        await engine.dispose()
+
+
+def _print_top(usage: dict[str, dict[str, int]], top: int, hours: int):
+    if not usage:
+        print("\nNo database workload collected yet.")
+        return
+
+    limited = get_limited()
+    total_ms = sum(u["latency_ms"] for u in usage.values()) or 1
+    print(f"\ntop {top} by statement latency (last {hours}h):")
+    print(
+        f"  {'TAG':<32} {'SHARE':>6} {'STATEMENTS':>11} {'LATENCY_S':>10}"
+        f" {'ROWS_EXAMINED':>14} {'TMP_DISK':>9} {'CPU_S':>7}"
+    )
+    ranked = sorted(usage.items(), key=lambda item: item[1]["latency_ms"], reverse=True)
+    for tag, u in ranked[:top]:
+        print(
+            f"  {tag:<32} {u['latency_ms'] / total_ms:>6.1%} {u['statements']:>11}"
+            f" {u['latency_ms'] / 1000:>10.1f} {u['rows_examined']:>14}"
+            f" {u['tmp_disk_tables']:>9} {u['cpu_ms'] / 1000:>7.1f}"
+            f"{'  (limited)' if tag in limited else ''}"
+        )
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
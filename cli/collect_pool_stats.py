@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from os import environ
+
+from sqlalchemy import insert
+
+from database.models import PoolStats, Site
+from database.session import async_session_factory, engine
+from site_manager.object_cache import get_cache_stats, uses_object_cache
+from utils.cgroups import read_usage
+from utils.fastcgi import FastCGIError, get_fpm_status
+from utils.memcached import MemcachedError
+
+CONCURRENCY = int(environ.get("COLLECT_POOL_STATS_CONCURRENCY", "64"))
+EMPTY_CGROUP_USAGE = {"cpu_usage_usec": 0, "memory_bytes": 0, "memory_high_events": 0}
+
+
+def status_row(
+    tag: str, status: dict, now: datetime, cache: dict[str, int] | None = None
+) -> dict:
+    """
+    `PoolStats` values from a pool's `?json&full` status, its tenant cgroup
+    and the `stats` of its memcached (`cache`).
+    """
+
+    # CPU of the last request of every worker that has served one
+    cpu = [
+        float(process["last request cpu"])
+        for process in status.get("processes", [])
+        if process.get("requests")
+    ]
+    return {
+        "site_tag": tag,
+        "start_since": int(status["start since"]),
+        "accepted_conn": int(status["accepted conn"]),
+        "max_children_reached": int(status["max children reached"]),
+        "slow_requests": int(status["slow requests"]),
+        "listen_queue": int(status["listen queue"]),
+        "active_processes": int(status["active processes"]),
+        "idle_processes": int(status["idle processes"]),
+        "max_active_processes": int(status["max active processes"]),
+        "cpu_pct": round(sum(cpu) / len(cpu), 2) if cpu else 0.0,
+        **(read_usage(tag) or EMPTY_CGROUP_USAGE),
+        "cache_gets": (cache or {}).get("cmd_get", 0),
+        "cache_hits": (cache or {}).get("get_hits", 0),
+        "collected_at": now,
+    }
+
+
+async def _collect_pool(
+    limit: asyncio.Semaphore,
+    site: Site,
+    timeout: float,
+    now: datetime,
+) -> dict:
+    async with limit:
+        status = await get_fpm_status(site.tag, timeout=timeout)
+        cache = None
+        if uses_object_cache(site.site_type):
+            try:
+                cache = await get_cache_stats(site.tag, timeout=timeout)
+            except MemcachedError as e:
+                # pool stats are still worth having without cache hits
+                print(f"error memcached {site.tag}: {e}", file=sys.stderr)
+    return status_row(site.tag, status, now, cache)
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Collect PHP-FPM status, cgroup usage (CPU, memory) and object cache hits of all tenant pools"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help=f"Number of pools queried in parallel (default: {CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=2.0,
+        help="Seconds to wait for a pool's status (default: 2)",
+    )
+
+    args = parser.parse_args()
+    now = datetime.now()
+    errors = 0
+
+    try:
+        async with async_session_factory() as db:
+            # the status page is served by a worker, scraping a hibernated pool
+            # would spawn one in a pool that's meant to have none
+            sites = [
+                site
+                async for site in Site.get_all_active(db)
+                if site.is_installed() and not site.is_hibernated()
+            ]
+
+            limit = asyncio.Semaphore(args.concurrency)
+            results = await asyncio.gather(
+                *(_collect_pool(limit, site, args.timeout, now) for site in sites),
+                return_exceptions=True,
+            )
+
+            rows = []
+            for site, result in zip(sites, results):
+                if isinstance(result, (FastCGIError, KeyError, ValueError)):
+                    errors += 1
+                    print(f"error {site.tag}: {result!r}", file=sys.stderr)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    rows.append(result)
+
+            if rows:
+                await db.execute(insert(PoolStats), rows)
+            await db.commit()
+    finally:
+        await engine.dispose()
+
+    print(f"collected pool status for {len(rows)} sites ({errors} errors)")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,185 @@
+import argparse
 import asyncio
 import sys
 from datetime import datetime
-from pathlib import Path
+from os import cpu_count, environ
 
 import aiomysql
+from sqlalchemy import insert
 
 from database.models import Site, SiteStats
 from database.session import async_session_factory, engine
-from settings import VARS
+from database.stats import upsert_latest
+from utils.dirsize import get_upload_size_mb
 
-TENANTS_ROOT = Path(VARS["paths"]["tenants"]["root"])
+MYSQL_SOCKET = "/var/run/mysqld/mysqld.sock"
+CONCURRENCY = int(environ.get("COLLECT_STATS_CONCURRENCY", cpu_count() or 4))
 
+# `{db}` is replaced with the (backtick-quoted) tenant database name, so all
+# tenants can be queried through the same pooled root connections
 CONTENT_QUERIES: dict[str, str] = {
-    "flarum": "SELECT COUNT(*) FROM posts",
-    "mediawiki": "SELECT COUNT(*) FROM page WHERE page_namespace = 0",
-    "wordpress": "SELECT COUNT(*) FROM wp_posts WHERE post_status = 'publish' AND post_type IN ('post', 'page')",
+    "flarum": "SELECT COUNT(*) FROM {db}.posts",
+    "mediawiki": "SELECT COUNT(*) FROM {db}.page WHERE page_namespace = 0",
+    "wordpress": "SELECT COUNT(*) FROM {db}.wp_posts WHERE post_status = 'publish' AND post_type IN ('post', 'page')",
 }
 
 USER_QUERIES: dict[str, str] = {
-    "flarum": "SELECT COUNT(*) FROM users",
-    "mediawiki": "SELECT COUNT(*) FROM user",
-    "wordpress": "SELECT COUNT(*) FROM wp_users",
+    "flarum": "SELECT COUNT(*) FROM {db}.users",
+    "mediawiki": "SELECT COUNT(*) FROM {db}.user",
+    "wordpress": "SELECT COUNT(*) FROM {db}.wp_users",
 }
 
-# per-app upload directories (relative to tenant root)
-UPLOAD_DIRS: dict[str, str] = {
-    "flarum": "app/public/assets",
-    "mediawiki": "app/public/images",
-    "wordpress": "app/public/wp-content/uploads",
-}
 
+# one pass over all tenant schemas instead of a connection per tenant
+# (`_` is a LIKE wildcard, hence the escape)
+DB_METRICS_QUERY = """
+    SELECT TABLE_SCHEMA,
+           COALESCE(SUM(DATA_LENGTH), 0),
+           COALESCE(SUM(INDEX_LENGTH), 0),
+           COUNT(*),
+           COALESCE(SUM(TABLE_ROWS), 0)
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA LIKE %s
+    GROUP BY TABLE_SCHEMA
+"""
+EMPTY_DB_METRICS = {"db_data_mb": 0.0, "db_index_mb": 0.0, "db_tables": 0, "db_rows": 0}
 
-async def _query_tenant_db(tag: str, query: str) -> int:
-    conn = await aiomysql.connect(
-        unix_socket="/var/run/mysqld/mysqld.sock",
-        db=f"tenant_{tag}",
-        user="root",
-    )
-    try:
+
+async def _query_db_metrics(pool: aiomysql.Pool) -> dict[str, dict]:
+    """Returns {tag: {db_data_mb, db_index_mb, db_tables, db_rows}} for all tenant databases."""
+
+    async with pool.acquire() as conn:
         async with conn.cursor() as cur:
-            await cur.execute(query)
-            row = await cur.fetchone()
-            return row[0] if row else 0
-    finally:
-        conn.close()
+            await cur.execute(DB_METRICS_QUERY, ("tenant\\_%",))
+            rows = await cur.fetchall()
+
+    metrics = {}
+    for schema, data_len, index_len, tables, table_rows in rows:
+        metrics[schema.removeprefix("tenant_")] = {
+            "db_data_mb": round(int(data_len) / 1024 / 1024, 2),
+            "db_index_mb": round(int(index_len) / 1024 / 1024, 2),
+            "db_tables": int(tables),
+            "db_rows": int(table_rows),
+        }
+    return metrics
+
+
+async def _query_counts(pool: aiomysql.Pool, site: Site) -> tuple[int, int]:
+    """Returns (content_count, user_count) in a single round trip."""
 
+    db = f"`tenant_{site.tag}`"
+    content_query = CONTENT_QUERIES[site.site_type].format(db=db)
+    user_query = USER_QUERIES[site.site_type].format(db=db)
 
-def _get_upload_size_mb(tag: str, site_type: str) -> float:
-    upload_dir = TENANTS_ROOT / tag / UPLOAD_DIRS.get(site_type, "")
-    if not upload_dir.exists():
-        return 0.0
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"SELECT ({content_query}), ({user_query})")
+            row = await cur.fetchone()
 
-    total = sum(f.stat().st_size for f in upload_dir.rglob("*") if f.is_file())
-    return round(total / 1024 / 1024, 2)
+    if not row:
+        return 0, 0
+    return row[0] or 0, row[1] or 0
+
+
+async def _collect_site(
+    pool: aiomysql.Pool,
+    limit: asyncio.Semaphore,
+    site: Site,
+    db_metrics: dict,
+    now: datetime,
+) -> dict:
+    async with limit:
+        (content_count, user_count), assets_mb = await asyncio.gather(
+            _query_counts(pool, site),
+            asyncio.to_thread(get_upload_size_mb, site.tag, site.site_type),
+        )
+
+    db_size_mb = db_metrics["db_data_mb"] + db_metrics["db_index_mb"]
+    print(
+        f"{site.tag}: content={content_count} users={user_count} assets={assets_mb} MB db={db_size_mb:.2f} MB"
+    )
+    return {
+        "site_tag": site.tag,
+        "content_count": content_count,
+        "user_count": user_count,
+        "assets_mb": assets_mb,
+        **db_metrics,
+        "collected_at": now,
+    }
 
 
 async def _main():
+    parser = argparse.ArgumentParser(
+        description="Collect resource usage stats for all installed sites"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help=f"Number of sites processed in parallel (default: {CONCURRENCY})",
+    )
+
+    args = parser.parse_args()
     now = datetime.now()
-    collected = 0
     errors = 0
 
     try:
         async with async_session_factory() as db:
-            sites = [
-                site async for site in Site.get_all_active(db) if site.is_installed()
-            ]
-
-            for site in sites:
-                try:
-                    content_query = CONTENT_QUERIES.get(site.site_type)
-                    user_query = USER_QUERIES.get(site.site_type)
-
-                    if not content_query or not user_query:
-                        print(
-                            f"skip {site.tag}: unknown site type '{site.site_type}'",
-                            file=sys.stderr,
-                        )
-                        continue
-
-                    content_count = await _query_tenant_db(site.tag, content_query)
-                    user_count = await _query_tenant_db(site.tag, user_query)
-                    assets_mb = _get_upload_size_mb(site.tag, site.site_type)
-
-                    stats = SiteStats(
-                        site_tag=site.tag,
-                        content_count=content_count,
-                        user_count=user_count,
-                        assets_mb=assets_mb,
-                        collected_at=now,
-                    )
-                    db.add(stats)
-                    collected += 1
-
+            sites = []
+            async for site in Site.get_all_active(db):
+                if not site.is_installed():
+                    continue
+                if site.site_type not in CONTENT_QUERIES:
                     print(
-                        f"{site.tag}: content={content_count} users={user_count} assets={assets_mb} MB"
+                        f"skip {site.tag}: unknown site type '{site.site_type}'",
+                        file=sys.stderr,
                     )
-                except Exception as e:
+                    continue
+                sites.append(site)
+
+            pool = await aiomysql.create_pool(
+                unix_socket=MYSQL_SOCKET,
+                user="root",
+                minsize=1,
+                maxsize=args.concurrency,
+            )
+            try:
+                db_metrics = await _query_db_metrics(pool)
+                limit = asyncio.Semaphore(args.concurrency)
+                results = await asyncio.gather(
+                    *(
+                        _collect_site(
+                            pool,
+                            limit,
+                            site,
+                            db_metrics.get(site.tag, EMPTY_DB_METRICS),
+                            now,
+                        )
+                        for site in sites
+                    ),
+                    return_exceptions=True,
+                )
+            finally:
+                pool.close()
+                await pool.wait_closed()
+
+            rows = []
+            for site, result in zip(sites, results):
+                if isinstance(result, Exception):
                     errors += 1
-                    print(f"error {site.tag}: {e}", file=sys.stderr)
+                    print(f"error {site.tag}: {result}", file=sys.stderr)
+                else:
+                    rows.append(result)
 
+            if rows:
+                await db.execute(insert(SiteStats), rows)
+                await upsert_latest(db, rows)
             await db.commit()
     finally:
         await engine.dispose()
 
-    print(f"\ncollected stats for {collected} sites ({errors} errors)")
+    print(f"\ncollected stats for {len(rows)} sites ({errors} errors)")
 
 
 def main():
@@ -9,7 +9,7 @@ from database.models import Site
 from database.session import async_session_factory, engine
 from settings import VARS
 from site_manager import provision_site
-from site_manager.custom_domains import write_nginx_maps
+from site_manager.nginx_maps import update_nginx_maps
 from utils import random_string, validate_tag
 from utils.auth import create_reset_token
 from utils.health import get_health_status
@@ -85,6 +85,10 @@ async def _main():
             if existing:
                 if existing.removed_at is None:
                     sys.exit(f"Error: site '{args.tag}' already exists")
+                if existing.is_pending_purge():
+                    sys.exit(
+                        f"Error: site '{args.tag}' is still being removed, run reap_sites first"
+                    )
                 await db.delete(existing)
                 await db.flush()
 
@@ -101,7 +105,7 @@ async def _main():
             site.installed_at = datetime.now()
             await db.commit()
 
-            await write_nginx_maps(db)
+            await update_nginx_maps(db, site)
 
         print(f"Site created: {args.tag} ({hostname})")
         if not args.password:
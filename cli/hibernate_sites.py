@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+from datetime import datetime
+from statistics import median, quantiles
+
+from database.models import Site
+from database.session import async_session_factory, engine
+from site_manager.hibernation import (
+    HIBERNATE_AFTER_DAYS,
+    get_hibernation_stats,
+    hibernate_sites,
+    is_idle,
+    should_wake,
+    wake_sites,
+)
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Scale down PHP-FPM pools of idle sites, restore them once they get traffic"
+    )
+    parser.add_argument(
+        "--idle-days",
+        type=int,
+        default=HIBERNATE_AFTER_DAYS,
+        help=f"Hibernate sites without requests for this many days (default: {HIBERNATE_AFTER_DAYS})",
+    )
+    parser.add_argument(
+        "--wake",
+        action="append",
+        default=[],
+        metavar="TAG",
+        help="Wake this site regardless of its traffic, repeatable",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=200,
+        help="Pools rewritten per playbook run / PHP-FPM reload (default: 200)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Only show what would be hibernated or woken",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="Show memory saved and wake latencies, then exit",
+    )
+
+    args = parser.parse_args()
+
+    if args.stats:
+        _print_stats()
+        return
+
+    now = datetime.now()
+    try:
+        async with async_session_factory() as db:
+            to_wake: list[Site] = []
+            to_hibernate: list[Site] = []
+            async for site in Site.get_all_active(db):
+                if should_wake(site) or (
+                    site.is_hibernated() and site.tag in args.wake
+                ):
+                    to_wake.append(site)
+                elif is_idle(site, now, idle_days=args.idle_days):
+                    to_hibernate.append(site)
+
+            for site in to_wake:
+                print(f"wake {site.tag} (hibernated at {site.hibernated_at})")
+            for site in to_hibernate:
+                print(f"hibernate {site.tag} ({site.site_type})")
+            print(f"\n{len(to_wake)} to wake, {len(to_hibernate)} to hibernate")
+            if args.dry_run:
+                return
+
+            # waking first, a tenant waiting for its pool is worse than an idle one
+            for i in range(0, len(to_wake), args.batch_size):
+                await wake_sites(db, to_wake[i : i + args.batch_size])
+            for i in range(0, len(to_hibernate), args.batch_size):
+                await hibernate_sites(db, to_hibernate[i : i + args.batch_size])
+    finally:
+        await engine.dispose()
+
+    _print_stats()
+
+
+def _print_stats():
+    stats = get_hibernation_stats()
+    print(
+        f"{stats['sleeping']} sites hibernated, "
+        f"~{stats['saved_mb']:.0f} MB of worker RSS freed"
+    )
+
+    wake_ms = stats["wake_ms"]
+    if wake_ms:
+        p95 = quantiles(wake_ms, n=20)[-1] if len(wake_ms) > 1 else wake_ms[0]
+        print(
+            f"first request after wake-up: median {median(wake_ms):.0f}ms, "
+            f"p95 {p95:.0f}ms, max {max(wake_ms)}ms ({len(wake_ms)} wake-ups)"
+        )
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
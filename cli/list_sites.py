@@ -6,6 +6,7 @@ from sqlalchemy import or_
 
 from database.models import Site
 from database.session import async_session_factory, engine
+from database.stats import get_latest_stats, get_pool_activity
 from utils.backup import get_attic_backup_path, get_latest_host_backup
 from utils.ip import get_country_code
 
@@ -49,6 +50,16 @@ async def _main():
         action="store_true",
         help="Add HAS_BACKUP column (attic backup existence)",
     )
+    parser.add_argument(
+        "--usage",
+        action="store_true",
+        help="Add CONTENT, USERS and DISK_MB columns (latest collected stats)",
+    )
+    parser.add_argument(
+        "--pools",
+        action="store_true",
+        help="Add REQ/MIN, PEAK_WORKERS, MAXED, SLOW, CPU%%, CPU_S, MEM_MB and CACHE_HIT%% columns (PHP-FPM status, cgroup and object cache, last 24h)",
+    )
     parser.add_argument(
         "--host-backups",
         action="store_true",
@@ -89,6 +100,12 @@ async def _main():
                     db, *sql_filters, match_removed=match_removed
                 )
             ]
+            latest_stats = (
+                await get_latest_stats(db, *sql_filters) if args.usage else {}
+            )
+            pool_activity = (
+                await get_pool_activity(db, *sql_filters) if args.pools else {}
+            )
     finally:
         await engine.dispose()
 
@@ -112,6 +129,21 @@ async def _main():
     headers = ["TAG", "TYPE", "HOSTNAME", "EMAIL", "CREATED", "STATUS", "DONOR"]
     if args.check_backups:
         headers.append("HAS_BACKUP")
+    if args.usage:
+        headers.extend(["CONTENT", "USERS", "DISK_MB"])
+    if args.pools:
+        headers.extend(
+            [
+                "REQ/MIN",
+                "PEAK_WORKERS",
+                "MAXED",
+                "SLOW",
+                "CPU%",
+                "CPU_S",
+                "MEM_MB",
+                "CACHE_HIT%",
+            ]
+        )
     if args.host_backups:
         headers.append("LAST_BACKUP")
 
@@ -140,6 +172,36 @@ async def _main():
 
         if args.check_backups:
             row.append("yes" if get_attic_backup_path(site.tag).exists() else "no")
+        if args.usage:
+            stats = latest_stats.get(site.tag)
+            if stats:
+                disk_mb = stats.assets_mb + stats.db_data_mb + stats.db_index_mb
+                row.extend(
+                    [str(stats.content_count), str(stats.user_count), f"{disk_mb:.1f}"]
+                )
+            else:
+                row.extend(["-", "-", "-"])
+        if args.pools:
+            activity = pool_activity.get(site.tag)
+            if activity:
+                row.extend(
+                    [
+                        f"{activity['requests_per_min']:.1f}",
+                        str(activity["peak_active"]),
+                        str(activity["max_children_reached"]),
+                        str(activity["slow_requests"]),
+                        f"{activity['cpu_pct']:.0f}",
+                        f"{activity['cpu_s']:.0f}",
+                        f"{activity['peak_memory_mb']:.0f}",
+                        (
+                            f"{activity['cache_hit_pct']:.0f}"
+                            if activity["cache_hit_pct"] is not None
+                            else "-"
+                        ),
+                    ]
+                )
+            else:
+                row.extend(["-"] * 8)
         if args.host_backups:
             latest = get_latest_host_backup(site.tag)
             row.append(latest.stem if latest else "-")
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+
+import aiomysql
+
+from database.models import Site
+from database.session import async_session_factory, engine
+from site_manager.db_maintenance import (
+    OPTIMIZE_MIN_FREE_MB,
+    get_reclaimed_mb,
+    plan_maintenance,
+    query_tables,
+    run_maintenance,
+)
+from utils.throttle import THROTTLE_MAX_LOAD, Throttle
+
+MYSQL_SOCKET = "/var/run/mysqld/mysqld.sock"
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="OPTIMIZE fragmented and ANALYZE changed tenant tables, throttled by host load"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=1,
+        choices=[1, 2],
+        help="Statements running at once (default: 1)",
+    )
+    parser.add_argument(
+        "--max-load",
+        type=float,
+        default=THROTTLE_MAX_LOAD,
+        help=f"Wait while the 1 minute load per CPU is above this (default: {THROTTLE_MAX_LOAD})",
+    )
+    parser.add_argument(
+        "--min-free-mb",
+        type=float,
+        default=OPTIMIZE_MIN_FREE_MB,
+        help=f"Only optimize tables with at least this much free space (default: {OPTIMIZE_MIN_FREE_MB:.0f})",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Run at most this many statements",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Only show what would be optimized or analyzed",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        default=False,
+        help="Show the space reclaimed per site so far, then exit",
+    )
+
+    args = parser.parse_args()
+
+    if args.report:
+        _print_report(get_reclaimed_mb())
+        return
+
+    try:
+        async with async_session_factory() as db:
+            active = {f"tenant_{site.tag}" async for site in Site.get_all_active(db)}
+    finally:
+        await engine.dispose()
+
+    pool = await aiomysql.create_pool(
+        unix_socket=MYSQL_SOCKET,
+        user="root",
+        minsize=1,
+        maxsize=args.concurrency,
+    )
+    try:
+        # removed sites' databases are dropped by the reaper, don't rebuild them first
+        tables = [t for t in await query_tables(pool) if t["schema"] in active]
+        plan = plan_maintenance(tables, min_free_mb=args.min_free_mb)[: args.limit]
+
+        for action, table in plan:
+            print(
+                f"{action.lower():<8} {table['schema']}.{table['table']}"
+                f" ({table['size_mb']:.1f} MB, {table['free_mb']:.1f} MB free)"
+            )
+        print(f"\n{len(plan)} statements planned over {len(tables)} tables")
+        if args.dry_run:
+            return
+
+        throttle = Throttle(concurrency=args.concurrency, max_load=args.max_load)
+        entries = await run_maintenance(pool, plan, throttle)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+    errors = [e for e in entries if "error" in e]
+    for entry in errors:
+        print(f"error {entry['tag']}.{entry['table']}: {entry['error']}")
+    reclaimed = sum(e.get("reclaimed_mb", 0) for e in entries)
+    print(
+        f"ran {len(entries) - len(errors)} statements ({len(errors)} errors),"
+        f" reclaimed {reclaimed:.1f} MB, waited {throttle.waited_s:.0f}s for a quiet host"
+    )
+
+
+def _print_report(reclaimed: dict[str, float]):
+    if not reclaimed:
+        print("Nothing reclaimed yet.")
+        return
+
+    print(f"{'TAG':<32} {'RECLAIMED_MB':>12}")
+    for tag, mb in sorted(reclaimed.items(), key=lambda item: item[1], reverse=True):
+        print(f"{tag:<32} {mb:>12.1f}")
+    print(f"\n{sum(reclaimed.values()):.1f} MB over {len(reclaimed)} sites")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+from collections import Counter
+
+from database.models import Site
+from database.session import async_session_factory, engine
+from site_manager.l10n_cache import build_l10n_cache
+from site_manager.releases import create_release, promote_release, release_dir
+from site_manager.skeleton import (
+    build_manifest,
+    diff_manifests,
+    load_current_manifest,
+    save_manifest,
+)
+from site_manager.templates import build_template, template_dir
+
+SITE_TYPES = ["flarum", "mediawiki", "wordpress"]
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Build skeleton manifests and report tenant file drift"
+    )
+    parser.add_argument(
+        "service",
+        nargs="*",
+        choices=SITE_TYPES,
+        help="Site types to prepare (default: all)",
+    )
+    parser.add_argument(
+        "--release",
+        action="store_true",
+        default=False,
+        help="Snapshot the skeleton as a versioned release (see switch_release)",
+    )
+    parser.add_argument(
+        "--promote",
+        action="store_true",
+        default=False,
+        help="With --release, provision new tenants on the new release",
+    )
+    parser.add_argument(
+        "--template",
+        action="store_true",
+        default=False,
+        help="Stage the tenant file template new tenants are snapshotted from",
+    )
+    parser.add_argument(
+        "--skip-l10n",
+        action="store_true",
+        default=False,
+        help="Don't build the shared MediaWiki localisation cache",
+    )
+    parser.add_argument(
+        "--force-l10n",
+        action="store_true",
+        default=False,
+        help="Rebuild the shared MediaWiki localisation cache even if it is current",
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        default=False,
+        help="Only report how many tenants are behind the current manifest",
+    )
+
+    args = parser.parse_args()
+    site_types = args.service or SITE_TYPES
+
+    for site_type in site_types:
+        if args.status:
+            continue
+        if site_type == "mediawiki" and not args.skip_l10n:
+            # before the release snapshot, releases carry their own cache
+            built = await build_l10n_cache(force=args.force_l10n)
+            print(f"{site_type}: l10n cache {'built' if built else 'current'}")
+
+        previous = load_current_manifest(site_type)
+        manifest = build_manifest(site_type, previous)
+        changed = save_manifest(manifest)
+        print(
+            f"{site_type}: manifest {manifest['version'][:12]}, "
+            f"{len(manifest['entries'])} paths, {len(manifest['hardlinks'])} hardlink sources"
+        )
+        if changed and previous is not None:
+            print(f"  {len(diff_manifests(previous, manifest))} paths changed")
+
+        if args.template:
+            template = await build_template(site_type)
+            print(f"  template at {template_dir(site_type, template)}")
+
+        if args.release:
+            release = await create_release(site_type)
+            print(f"  release {release} at {release_dir(site_type, release)}")
+            if args.promote:
+                await promote_release(site_type, release)
+                print(f"  new {site_type} tenants are provisioned on {release}")
+
+    try:
+        async with async_session_factory() as db:
+            for site_type in site_types:
+                # stored by the loop above; with --status nothing is rebuilt or saved
+                manifest = load_current_manifest(site_type)
+                if manifest is None:
+                    print(f"{site_type}: no manifest prepared yet")
+                    continue
+                current = manifest["version"]
+                versions = Counter(
+                    [
+                        site.synced_manifest
+                        async for site in Site.get_all_active(
+                            db, Site.site_type == site_type
+                        )
+                    ]
+                )
+                behind = sum(n for v, n in versions.items() if v != current)
+                print(
+                    f"{site_type}: {versions[current]} tenants current, {behind} behind"
+                    f" ({versions[None]} never synced against a manifest)"
+                )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import sys
+
+from database.session import async_session_factory, engine
+from site_manager.reaper import (
+    REAPER_BATCH_SIZE,
+    REAPER_CONCURRENCY,
+    get_pending_sites,
+    reap_sites,
+)
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Remove resources of removed sites in a batch"
+    )
+    parser.add_argument(
+        "tags",
+        nargs="*",
+        help="Only reap these sites (default: all pending)",
+    )
+    parser.add_argument(
+        "-l",
+        "--limit",
+        type=int,
+        default=REAPER_BATCH_SIZE,
+        help=f"Maximum number of sites per batch (default: {REAPER_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=REAPER_CONCURRENCY,
+        help=f"Number of sites removed in parallel (default: {REAPER_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Only list pending sites",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        async with async_session_factory() as db:
+            if args.dry_run:
+                pending = await get_pending_sites(db, *args.tags, limit=args.limit)
+                for site in pending:
+                    error = (
+                        f" (last error: {site.purge_error})" if site.purge_error else ""
+                    )
+                    print(f"{site.tag}: removed at {site.removed_at}{error}")
+                print(f"\n{len(pending)} sites pending removal")
+                return
+
+            results = await reap_sites(
+                db, *args.tags, limit=args.limit, concurrency=args.concurrency
+            )
+    finally:
+        await engine.dispose()
+
+    if not results:
+        print("Nothing to reap.")
+        return
+
+    failed = 0
+    for tag, error in results.items():
+        if error is None:
+            print(f"removed {tag}")
+        else:
+            failed += 1
+            print(f"failed to remove {tag}: {error}", file=sys.stderr)
+
+    print(f"\n{len(results) - failed} sites removed, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
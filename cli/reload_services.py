@@ -0,0 +1,44 @@
+import argparse
+
+from utils.reload import NGINX, PHP_FPM, get_reload_stats, reload_services
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reload nginx/PHP-FPM through the reload coordinator"
+    )
+    parser.add_argument(
+        "services",
+        nargs="*",
+        default=[PHP_FPM, NGINX],
+        help=f"systemd services to reload (default: {PHP_FPM} {NGINX})",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="Only print reload counters, don't reload",
+    )
+
+    args = parser.parse_args()
+
+    if not args.stats:
+        for service, absorbed in reload_services(*args.services).items():
+            if absorbed:
+                print(f"{service}: reloaded (absorbed {absorbed} requests)")
+            else:
+                print(f"{service}: covered by a concurrent reload")
+
+    for service in args.services:
+        stats = get_reload_stats(service)
+        requested = stats.get("requested", 0)
+        reloads = stats.get("reloads", 0)
+        print(
+            f"{service}: {requested} requests, {reloads} reloads, "
+            f"last absorbed {stats.get('last_absorbed', 0)} "
+            f"at {stats.get('last_reload_at', '-')}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,7 @@ from datetime import datetime
 
 from database.models import Site
 from database.session import async_session_factory, engine
-from site_manager import remove_site as do_remove
-from site_manager.custom_domains import write_nginx_maps
+from site_manager.reaper import reap_sites
 
 
 async def _main():
@@ -37,21 +36,19 @@ async def _main():
             if site is None:
                 sys.exit(f"Error: active site '{args.identifier}' not found")
 
-            runner = do_remove(
-                site,
-                skip_backup=args.skip_backup,
-                send_email=not args.no_email,
-                reason=args.reason,
-            )
-            print(runner.stdout.read())
-            print(runner.stderr.read())
-
             site.removed_at = datetime.now()
             site.removal_reason = args.reason
+            site.purge_skip_backup = args.skip_backup
+            site.purge_notify = not args.no_email
             await db.commit()
 
-            await write_nginx_maps(db)
+            results = await reap_sites(db, site.tag)
 
+        error = results.get(site.tag)
+        if error is not None:
+            sys.exit(
+                f"Error: removing {site.tag} failed, it will be retried by reap_sites: {error}"
+            )
         print(f"Site removed: {site.tag}")
     finally:
         await engine.dispose()
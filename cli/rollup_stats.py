@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+
+from database.session import async_session_factory, engine
+from database.stats import (
+    disk_growth_mb,
+    get_weekly_growth,
+    purge_db_usage,
+    purge_pool_stats,
+    purge_raw,
+    rollup_daily,
+    rollup_monthly,
+)
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Roll up site stats history into daily/monthly aggregates and enforce retention"
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        default=False,
+        help="Print fleet growth per week after the rollup",
+    )
+    parser.add_argument(
+        "--weeks",
+        type=int,
+        default=4,
+        help="Window for the growth report in weeks (default: 4)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of fastest growing sites to list in the report (default: 10)",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        async with async_session_factory() as db:
+            n_daily = await rollup_daily(db)
+            await db.flush()
+            n_monthly = await rollup_monthly(db)
+            n_purged = await purge_raw(db)
+            n_pool_purged = await purge_pool_stats(db)
+            n_db_purged = await purge_db_usage(db)
+            await db.commit()
+
+            print(
+                f"rolled up {n_daily} daily rows, {n_monthly} monthly rows, purged {n_purged} raw rows,"
+                f" {n_pool_purged} pool status rows and {n_db_purged} database workload rows"
+            )
+
+            if args.report:
+                growth = await get_weekly_growth(db, weeks=args.weeks)
+                _print_report(growth, args.weeks, args.top)
+    finally:
+        await engine.dispose()
+
+
+def _print_report(growth: dict[str, dict[str, float]], weeks: int, top: int):
+    if not growth:
+        print("\nNo daily rollups yet, nothing to report.")
+        return
+
+    print(f"\nfleet growth per week (last {weeks} weeks, {len(growth)} sites):")
+    print(f"  content: {sum(g['content_count'] for g in growth.values()):+.0f}")
+    print(f"  users:   {sum(g['user_count'] for g in growth.values()):+.0f}")
+    print(f"  assets:  {sum(g['assets_mb'] for g in growth.values()):+.1f} MB")
+    print(
+        f"  db:      {sum(g['db_data_mb'] + g['db_index_mb'] for g in growth.values()):+.1f} MB"
+    )
+
+    print(f"\ntop {top} by disk growth per week:")
+    ranked = sorted(
+        growth.items(), key=lambda item: disk_growth_mb(item[1]), reverse=True
+    )
+    for tag, values in ranked[:top]:
+        print(f"  {tag}: {disk_growth_mb(values):+.1f} MB")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
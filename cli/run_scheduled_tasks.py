@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+from datetime import datetime
+
+import aiomysql
+
+from database.models import Site
+from database.session import async_session_factory, engine
+from site_manager.scheduler import (
+    SCHEDULER_CONCURRENCY,
+    SCHEDULER_MAX_LOAD,
+    plan_runs,
+    query_pending,
+    run_tasks,
+)
+from site_manager.tenant_config import update_config
+from utils.state import file_lock
+from utils.throttle import Throttle
+
+MYSQL_SOCKET = "/var/run/mysqld/mysqld.sock"
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Run due wp-cron events, MediaWiki jobs and Flarum scheduled tasks of all tenants (run from cron every minute)"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=SCHEDULER_CONCURRENCY,
+        help=f"Tenants running at once (default: {SCHEDULER_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--max-load",
+        type=float,
+        default=SCHEDULER_MAX_LOAD,
+        help=f"Wait while the 1 minute load per CPU is above this (default: {SCHEDULER_MAX_LOAD})",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Run at most this many tenants, least recently run first",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Only show which tenants have pending work",
+    )
+    parser.add_argument(
+        "--configure",
+        action="store_true",
+        default=False,
+        help="Turn off request-triggered wp-cron/job runs in the config of every tenant, then exit",
+    )
+
+    args = parser.parse_args()
+    now = datetime.now()
+
+    try:
+        async with async_session_factory() as db:
+            sites = [
+                site async for site in Site.get_all_active(db) if site.is_installed()
+            ]
+    finally:
+        await engine.dispose()
+
+    if args.configure:
+        # tenants provisioned before the scheduler existed
+        for site in sites:
+            await update_config(site, {"run_jobs_on_requests": False})
+        print(f"configured {len(sites)} tenants")
+        return
+
+    try:
+        # a previous run still busy, its tenants would only be run twice
+        async with file_lock("scheduler", wait=False):
+            await _run(args, sites, now)
+    except BlockingIOError:
+        print("previous run still in progress, skipping")
+
+
+async def _run(args: argparse.Namespace, sites: list[Site], now: datetime):
+    pool = await aiomysql.create_pool(
+        unix_socket=MYSQL_SOCKET, user="root", minsize=1, maxsize=1
+    )
+    try:
+        pending = await query_pending(pool, sites, now)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+    planned = plan_runs(sites, pending, limit=args.limit)
+    if args.dry_run:
+        for site in planned:
+            print(f"{site.site_type:<10} {site.tag}")
+        print(f"\n{len(planned)} of {len(sites)} tenants have pending work")
+        return
+
+    throttle = Throttle(concurrency=args.concurrency, max_load=args.max_load)
+    entries = await run_tasks(planned, throttle)
+
+    errors = [e for e in entries if "error" in e]
+    for entry in errors:
+        print(f"error {entry['tag']} ({entry['type']}): {entry['error']}")
+    print(
+        f"ran {len(entries) - len(errors)} of {len(sites)} tenants ({len(errors)} errors),"
+        f" waited {throttle.waited_s:.0f}s for a quiet host"
+    )
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
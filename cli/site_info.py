@@ -2,8 +2,9 @@ import argparse
 import asyncio
 import sys
 
-from database.models import Site
+from database.models import Site, SiteStatsLatest
 from database.session import async_session_factory, engine
+from database.stats import get_pool_activity
 from utils.ip import get_country_code
 
 
@@ -20,6 +21,9 @@ async def _main():
             if site is None:
                 sys.exit(f"Error: site '{args.identifier}' not found")
 
+            stats = await db.get(SiteStatsLatest, site.tag)
+            activity = (await get_pool_activity(db, Site.tag == site.tag)).get(site.tag)
+
         created_cc = get_country_code(site.created_ip) if site.created_ip else None
         last_login_cc = (
             get_country_code(site.last_login_ip) if site.last_login_ip else None
@@ -34,6 +38,7 @@ async def _main():
             f"created_ip:     {site.created_ip or 'N/A'}{f' ({created_cc})' if created_cc else ''}"
         )
         print(f"installed:      {site.installed_at or 'not yet (or failed)'}")
+        print(f"hibernated:     {site.hibernated_at or 'no'}")
         print()
         print(f"last_login_at:  {site.last_login_at or 'never'}")
         print(
@@ -45,11 +50,43 @@ async def _main():
         )
         print(f"has_perks:      {'yes' if site.has_donor_perks() else 'no'}")
 
+        if stats:
+            print()
+            print(f"content:        {stats.content_count}")
+            print(f"users:          {stats.user_count}")
+            print(f"assets:         {stats.assets_mb:.1f} MB")
+            print(
+                f"database:       {stats.db_data_mb + stats.db_index_mb:.1f} MB ({stats.db_tables} tables, ~{stats.db_rows} rows)"
+            )
+            print(f"stats_at:       {stats.collected_at}")
+
+        if activity:
+            print()
+            print(
+                f"php_requests:   {activity['requests']} in 24h ({activity['requests_per_min']:.1f}/min)"
+            )
+            print(f"php_workers:    {activity['peak_active']} busy at peak")
+            print(f"max_children:   reached {activity['max_children_reached']}x")
+            print(f"slow_requests:  {activity['slow_requests']}")
+            print(f"php_cpu:        {activity['cpu_pct']:.0f}% per request")
+            print(
+                f"cgroup:         {activity['cpu_s']:.0f} CPU s, peak {activity['peak_memory_mb']:.0f} MB,"
+                f" throttled at memory.high {activity['memory_high_events']:.0f}x"
+            )
+            if activity["cache_hit_pct"] is not None:
+                print(
+                    f"object_cache:   {activity['cache_hit_pct']:.0f}% hits"
+                    f" ({activity['cache_hits']} of {activity['cache_gets']} gets)"
+                )
+
         if site.removed_at:
             print()
             print(f"removed_at:     {site.removed_at}")
             print(f"removed_ip:     {site.removed_ip or 'N/A'}")
             print(f"removal_reason: {site.removal_reason or 'N/A'}")
+            print(f"purged_at:      {site.purged_at or 'pending'}")
+            if site.purge_error:
+                print(f"purge_error:    {site.purge_error}")
     finally:
         await engine.dispose()
 
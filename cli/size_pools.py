@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+
+from database.session import async_session_factory, engine
+from site_manager.hibernation import HIBERNATE_MAX_CHILDREN
+from site_manager.pool_sizing import POOL_MEMORY_BUDGET_MB, apply_pool_sizes
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Size PHP-FPM pools from observed usage within a memory budget, reload once"
+    )
+    parser.add_argument(
+        "--budget-mb",
+        type=int,
+        default=POOL_MEMORY_BUDGET_MB,
+        help=f"Memory all pools may use at their max_children (default: {POOL_MEMORY_BUDGET_MB})",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=500,
+        help="Pools rewritten per playbook run (default: 500)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Only show the pools that would change",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        async with async_session_factory() as db:
+            changed = await apply_pool_sizes(
+                db,
+                budget_mb=args.budget_mb,
+                hibernated_children=HIBERNATE_MAX_CHILDREN,
+                batch_size=args.batch_size,
+                dry_run=args.dry_run,
+            )
+    finally:
+        await engine.dispose()
+
+    for tag, pool in sorted(changed.items()):
+        print(
+            f"{tag:<32} {pool['pm']:<9} max_children={pool['max_children']:<3}"
+            f" max_requests={pool['max_requests']}"
+        )
+    print(f"\n{len(changed)} pools {'to change' if args.dry_run else 'changed'}")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+
+from database.models import Site
+from database.session import async_session_factory, engine
+from site_manager import upgrade_site
+from site_manager.releases import get_default_release, list_releases, switch_release
+from site_manager.skeleton import mark_upgraded
+
+SITE_TYPES = ["flarum", "mediawiki", "wordpress"]
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Switch tenants to another skeleton release (or roll them back)"
+    )
+    parser.add_argument("release", nargs="?", help="Release to switch to")
+    parser.add_argument(
+        "--service",
+        help="Site type of the release",
+        choices=SITE_TYPES,
+        default=None,
+    )
+    parser.add_argument(
+        "--tag",
+        action="append",
+        default=[],
+        help="Only switch this tenant, repeatable (default: all tenants of --service)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        "-b",
+        type=int,
+        default=50,
+        help="Tenants switched per playbook run / PHP-FPM reload (default: 50)",
+    )
+    parser.add_argument(
+        "--no-migrate",
+        action="store_true",
+        default=False,
+        help="Don't migrate switched tenants right away (the next upgrade_site run does)",
+    )
+    parser.add_argument(
+        "--list",
+        "-l",
+        action="store_true",
+        default=False,
+        help="List releases and how many tenants run each of them",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        async with async_session_factory() as db:
+            if args.list:
+                await _list(db, [args.service] if args.service else SITE_TYPES)
+                return
+
+            if not args.release or not args.service:
+                sys.exit("Error: release and --service are required to switch")
+            if args.release not in list_releases(args.service):
+                sys.exit(f"Error: {args.service} release '{args.release}' not found")
+
+            filters = [
+                Site.site_type == args.service,
+                Site.installed_at.is_not(None),
+                # legacy tenants without a release are switched too
+                (Site.skeleton_release != args.release)
+                | Site.skeleton_release.is_(None),
+            ]
+            if args.tag:
+                filters.append(Site.tag.in_(args.tag))
+            sites = [site async for site in Site.get_all_active(db, *filters)]
+            if not sites:
+                print("No tenants to switch.")
+                return
+
+            for i in range(0, len(sites), args.batch_size):
+                batch = sites[i : i + args.batch_size]
+                started = time.perf_counter()
+                await switch_release(batch, args.release)
+                await db.commit()
+                print(
+                    f"switched {len(batch)} tenants to {args.release} "
+                    f"in {time.perf_counter() - started:.1f}s "
+                    f"({i + len(batch)}/{len(sites)})"
+                )
+                if not args.no_migrate:
+                    await _migrate(db, batch)
+    finally:
+        await engine.dispose()
+
+
+async def _migrate(db, sites: list[Site]):
+    """Bring the databases of freshly switched tenants up to their new code."""
+
+    for site in sites:
+        try:
+            await upgrade_site(site, migrate=True)
+        except RuntimeError as e:
+            # fingerprint stays cleared, the next upgrade_site run retries
+            print(f"Failed to migrate {site.tag}: {e}", file=sys.stderr)
+            continue
+        mark_upgraded(site)
+        await db.commit()
+
+
+async def _list(db, site_types: list[str]):
+    for site_type in site_types:
+        counts = Counter(
+            [
+                site.skeleton_release
+                async for site in Site.get_all_active(db, Site.site_type == site_type)
+            ]
+        )
+        default = get_default_release(site_type)
+
+        print(f"{site_type}:")
+        for release in list_releases(site_type):
+            marker = " (default)" if release == default else ""
+            print(f"  {release}{marker}: {counts.pop(release, 0)} tenants")
+        for release, count in counts.items():
+            name = release or "legacy layout"
+            print(f"  {name}: {count} tenants")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import time
+
+from database.models import Site
+from database.session import async_session_factory, engine
+from site_manager.runner import install_cgroup_watcher
+from utils.cgroups import (
+    FPM_CGROUP_ROOT,
+    apply_limits,
+    get_limits,
+    place_workers,
+    remove_stale,
+    setup_hierarchy,
+)
+
+# limits (donor tiers) and stale cgroups are re-synced from the database this often with --watch
+SYNC_INTERVAL_S = 60
+# new workers run unconfined until they are placed, so the watcher polls often
+WATCH_INTERVAL_S = 2.0
+
+
+async def _sync() -> None:
+    """Create the hierarchy, (re)apply every tenant's limits and drop cgroups of removed tenants."""
+
+    try:
+        async with async_session_factory() as db:
+            sites = [
+                site async for site in Site.get_all_active(db) if site.is_installed()
+            ]
+    finally:
+        await engine.dispose()
+
+    moved = setup_hierarchy()
+    for site in sites:
+        apply_limits(site.tag, get_limits(site.is_donor()))
+    removed = remove_stale({site.tag for site in sites})
+    print(
+        f"{len(sites)} tenant cgroups under {FPM_CGROUP_ROOT}"
+        f" ({moved} processes moved to the master leaf, {len(removed)} stale removed)"
+    )
+
+
+async def _main():
+    parser = argparse.ArgumentParser(
+        description="Put PHP-FPM workers into per-tenant cgroups with donor-tiered CPU/memory limits"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Keep running, moving new workers into their cgroups every SECONDS",
+    )
+    parser.add_argument(
+        "--install",
+        action="store_true",
+        help="Install the php-fpm cgroup delegation and a service running --watch"
+        f" (every --watch SECONDS, default: {WATCH_INTERVAL_S:g}), then exit",
+    )
+
+    args = parser.parse_args()
+
+    if args.install:
+        await asyncio.to_thread(install_cgroup_watcher, args.watch or WATCH_INTERVAL_S)
+        print("installed the php-fpm delegation and the sync-cgroups service")
+        return
+
+    await _sync()
+    moved = place_workers()
+    print(f"moved {sum(moved.values())} workers of {len(moved)} tenants")
+    if args.watch is None:
+        return
+
+    last_sync = time.monotonic()
+    while True:
+        await asyncio.sleep(args.watch)
+        if time.monotonic() - last_sync >= SYNC_INTERVAL_S:
+            await _sync()
+            last_sync = time.monotonic()
+        else:
+            # after a php-fpm restart the new master starts in the service cgroup
+            setup_hierarchy()
+        place_workers()
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,30 @@
+import argparse
 import asyncio
 
 from database.session import async_session_factory, engine
-from site_manager.custom_domains import write_nginx_maps
+from site_manager.nginx_maps import write_nginx_maps
 
 
 async def _main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild nginx maps for all active sites from the database"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=False,
+        help="Rewrite the map files and reload nginx even if nothing changed",
+    )
+
+    args = parser.parse_args()
+
     try:
         async with async_session_factory() as db:
-            await write_nginx_maps(db)
-        print("Nginx maps synced and nginx reloaded")
+            reloaded = await write_nginx_maps(db, force=args.force)
+        if reloaded:
+            print("Nginx maps synced and nginx reloaded")
+        else:
+            print("Nginx maps already up to date, nginx not reloaded")
     finally:
         await engine.dispose()
 
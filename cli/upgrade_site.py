@@ -1,9 +1,31 @@
 import argparse
 import asyncio
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Site
 from database.session import async_session_factory, engine
 from site_manager import upgrade_site
+from site_manager.object_cache import enable_object_cache, uses_object_cache
+from site_manager.rollout import (
+    CANARY_SIZE,
+    DEFAULT_CONCURRENCY,
+    MAX_ERROR_RATE,
+    Rollout,
+    RolloutAborted,
+)
+from site_manager.skeleton import mark_upgraded, needs_sync, needs_upgrade
+
+
+def _parse_concurrency(values: list[str]) -> dict[str, int]:
+    """["8", "mediawiki=2"] -> {"*": 8, "mediawiki": 2}"""
+
+    concurrency = {}
+    for value in values:
+        site_type, _, limit = value.rpartition("=")
+        concurrency[site_type or "*"] = int(limit)
+    return concurrency
 
 
 async def _main():
@@ -22,6 +44,53 @@ async def _main():
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--force",
+        "-f",
+        help="Upgrade even if the site is already at the current skeleton fingerprint",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--rolling",
+        "-r",
+        help="Upgrade in parallel with a canary batch and error-rate stop",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        action="append",
+        default=[],
+        metavar="[TYPE=]N",
+        help=f"Parallel upgrades, for all or one site type, repeatable (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--canary",
+        type=int,
+        default=CANARY_SIZE,
+        help=f"Canary sites per site type that must succeed first (default: {CANARY_SIZE})",
+    )
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=MAX_ERROR_RATE,
+        help=f"Stop starting new upgrades above this failure rate (default: {MAX_ERROR_RATE})",
+    )
+    parser.add_argument(
+        "--resume",
+        help="Continue the last rolling upgrade, skipping sites that already succeeded",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--enable-object-cache",
+        help="Instead of upgrading, start the own memcached of the WordPress/MediaWiki sites"
+        " and point their config at it (tenants provisioned before the object cache)",
+        action="store_true",
+        default=False,
+    )
 
     args = parser.parse_args()
 
@@ -33,17 +102,78 @@ async def _main():
 
     try:
         async with async_session_factory() as db:
-            async for site in Site.get_all_active(db, *filters):
+            sites = [site async for site in Site.get_all_active(db, *filters)]
+            if args.enable_object_cache:
+                await _enable_object_cache(sites)
+                return
+            if args.rolling or args.resume:
+                await _rolling_upgrade(db, sites, args)
+                return
+
+            for site in sites:
+                migrate = args.force or needs_upgrade(site)
+                sync_files = args.sync_files and (args.force or needs_sync(site))
+                if not migrate and not sync_files:
+                    print(f"skip {site.tag} (already current)")
+                    continue
+
                 print(f"Upgrading {site.tag} ({site.site_type})...")
-                result = await upgrade_site(site, sync_files=args.sync_files)
+                result = await upgrade_site(
+                    site, sync_files=sync_files, migrate=migrate, full_sync=args.force
+                )
                 if result is not None:
                     print(result.stdout.read())
                     print(result.stderr.read())
+
+                mark_upgraded(site, synced_files=args.sync_files)
+                await db.commit()
                 print(f"ok {site.tag}")
     finally:
         await engine.dispose()
 
 
+async def _enable_object_cache(sites: list[Site]):
+    for site in sites:
+        if not site.is_installed() or not uses_object_cache(site.site_type):
+            continue
+        try:
+            await enable_object_cache(site)
+        except RuntimeError as e:
+            print(f"error {site.tag}: {e}", file=sys.stderr)
+            continue
+        print(f"ok {site.tag}")
+
+
+async def _rolling_upgrade(
+    db: AsyncSession, sites: list[Site], args: argparse.Namespace
+):
+    concurrency = _parse_concurrency(args.concurrency)
+    default = concurrency.pop("*", DEFAULT_CONCURRENCY)
+
+    rollout = Rollout(
+        sites,
+        sync_files=args.sync_files,
+        concurrency={
+            site_type: concurrency.get(site_type, default)
+            for site_type in {site.site_type for site in sites}
+        },
+        canary_size=args.canary,
+        max_error_rate=args.max_error_rate,
+        resume=args.resume,
+        force=args.force,
+        db=db,
+    )
+    try:
+        await rollout.run()
+    except RolloutAborted as e:
+        rollout.print_summary()
+        sys.exit(f"Rollout aborted: {e} (fix and re-run with --resume)")
+
+    rollout.print_summary()
+    if rollout.failed:
+        sys.exit(1)
+
+
 def main():
     asyncio.run(_main())
 
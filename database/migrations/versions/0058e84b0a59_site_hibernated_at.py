@@ -0,0 +1,23 @@
+"""site_hibernated_at
+
+Revision ID: 0058e84b0a59
+Revises: 72ac1b2e5424
+Create Date: 2026-10-19 19:02:37.640215
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0058e84b0a59"
+down_revision = "72ac1b2e5424"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sites", sa.Column("hibernated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("sites", "hibernated_at")
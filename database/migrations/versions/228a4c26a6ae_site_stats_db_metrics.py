@@ -0,0 +1,41 @@
+"""site_stats_db_metrics
+
+Revision ID: 228a4c26a6ae
+Revises: 1ee98f5c3794
+Create Date: 2026-10-19 10:12:41.530912
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "228a4c26a6ae"
+down_revision = "1ee98f5c3794"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "site_stats",
+        sa.Column("db_data_mb", sa.Float(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "site_stats",
+        sa.Column("db_index_mb", sa.Float(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "site_stats",
+        sa.Column("db_tables", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "site_stats",
+        sa.Column("db_rows", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("site_stats", "db_rows")
+    op.drop_column("site_stats", "db_tables")
+    op.drop_column("site_stats", "db_index_mb")
+    op.drop_column("site_stats", "db_data_mb")
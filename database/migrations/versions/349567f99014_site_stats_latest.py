@@ -0,0 +1,52 @@
+"""site_stats_latest
+
+Revision ID: 349567f99014
+Revises: efa6055a0b84
+Create Date: 2026-10-19 13:05:52.904417
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "349567f99014"
+down_revision = "efa6055a0b84"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "site_stats_latest",
+        sa.Column("site_tag", sa.String(length=32), nullable=False),
+        sa.Column("content_count", sa.Integer(), nullable=False),
+        sa.Column("user_count", sa.Integer(), nullable=False),
+        sa.Column("assets_mb", sa.Float(), nullable=False),
+        sa.Column("db_data_mb", sa.Float(), nullable=False),
+        sa.Column("db_index_mb", sa.Float(), nullable=False),
+        sa.Column("db_tables", sa.Integer(), nullable=False),
+        sa.Column("db_rows", sa.BigInteger(), nullable=False),
+        sa.Column("collected_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["site_tag"], ["sites.tag"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("site_tag"),
+    )
+
+    # backfill from existing history
+    op.execute("""
+        INSERT INTO site_stats_latest (
+            site_tag, content_count, user_count, assets_mb,
+            db_data_mb, db_index_mb, db_tables, db_rows, collected_at
+        )
+        SELECT s.site_tag, s.content_count, s.user_count, s.assets_mb,
+               s.db_data_mb, s.db_index_mb, s.db_tables, s.db_rows, s.collected_at
+        FROM site_stats s
+        JOIN (
+            SELECT site_tag, MAX(id) AS max_id
+            FROM site_stats
+            GROUP BY site_tag
+        ) latest ON s.id = latest.max_id
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table("site_stats_latest")
@@ -0,0 +1,25 @@
+"""site_skeleton_release
+
+Revision ID: 72ac1b2e5424
+Revises: f6c25a2f26b0
+Create Date: 2026-10-19 17:34:52.118906
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "72ac1b2e5424"
+down_revision = "f6c25a2f26b0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sites", sa.Column("skeleton_release", sa.String(length=64), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("sites", "skeleton_release")
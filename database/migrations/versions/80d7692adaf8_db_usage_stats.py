@@ -0,0 +1,51 @@
+"""db_usage_stats
+
+Revision ID: 80d7692adaf8
+Revises: b02c233e5ccc
+Create Date: 2026-10-19 21:37:20.854113
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "80d7692adaf8"
+down_revision = "b02c233e5ccc"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "db_usage_stats",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("site_tag", sa.String(length=32), nullable=False),
+        sa.Column("statements", sa.BigInteger(), nullable=False),
+        sa.Column("latency_ms", sa.BigInteger(), nullable=False),
+        sa.Column("rows_examined", sa.BigInteger(), nullable=False),
+        sa.Column("rows_sent", sa.BigInteger(), nullable=False),
+        sa.Column("tmp_tables", sa.Integer(), nullable=False),
+        sa.Column("tmp_disk_tables", sa.Integer(), nullable=False),
+        sa.Column("busy_ms", sa.BigInteger(), nullable=False),
+        sa.Column("cpu_ms", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "collected_at",
+            sa.DateTime(),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["site_tag"], ["sites.tag"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_db_usage_stats_tag_collected",
+        "db_usage_stats",
+        ["site_tag", "collected_at"],
+    )
+    op.create_index("ix_db_usage_stats_collected", "db_usage_stats", ["collected_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_db_usage_stats_collected", table_name="db_usage_stats")
+    op.drop_index("ix_db_usage_stats_tag_collected", table_name="db_usage_stats")
+    op.drop_table("db_usage_stats")
@@ -0,0 +1,30 @@
+"""pool_stats_object_cache
+
+Revision ID: 8416b9a2d064
+Revises: 80d7692adaf8
+Create Date: 2026-10-19 23:41:07.215384
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "8416b9a2d064"
+down_revision = "80d7692adaf8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "pool_stats",
+        sa.Column("cache_gets", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "pool_stats",
+        sa.Column("cache_hits", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("pool_stats", "cache_hits")
+    op.drop_column("pool_stats", "cache_gets")
@@ -0,0 +1,40 @@
+"""pool_stats_cgroup_usage
+
+Revision ID: b02c233e5ccc
+Revises: c4cb221cb58d
+Create Date: 2026-10-19 20:58:11.472930
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b02c233e5ccc"
+down_revision = "c4cb221cb58d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "pool_stats",
+        sa.Column(
+            "cpu_usage_usec", sa.BigInteger(), server_default="0", nullable=False
+        ),
+    )
+    op.add_column(
+        "pool_stats",
+        sa.Column("memory_bytes", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "pool_stats",
+        sa.Column(
+            "memory_high_events", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("pool_stats", "memory_high_events")
+    op.drop_column("pool_stats", "memory_bytes")
+    op.drop_column("pool_stats", "cpu_usage_usec")
@@ -0,0 +1,50 @@
+"""pool_stats
+
+Revision ID: c4cb221cb58d
+Revises: 0058e84b0a59
+Create Date: 2026-10-19 20:14:52.309871
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c4cb221cb58d"
+down_revision = "0058e84b0a59"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pool_stats",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("site_tag", sa.String(length=32), nullable=False),
+        sa.Column("start_since", sa.Integer(), nullable=False),
+        sa.Column("accepted_conn", sa.BigInteger(), nullable=False),
+        sa.Column("max_children_reached", sa.Integer(), nullable=False),
+        sa.Column("slow_requests", sa.Integer(), nullable=False),
+        sa.Column("listen_queue", sa.Integer(), nullable=False),
+        sa.Column("active_processes", sa.Integer(), nullable=False),
+        sa.Column("idle_processes", sa.Integer(), nullable=False),
+        sa.Column("max_active_processes", sa.Integer(), nullable=False),
+        sa.Column("cpu_pct", sa.Float(), nullable=False),
+        sa.Column(
+            "collected_at",
+            sa.DateTime(),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["site_tag"], ["sites.tag"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_pool_stats_tag_collected", "pool_stats", ["site_tag", "collected_at"]
+    )
+    op.create_index("ix_pool_stats_collected", "pool_stats", ["collected_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pool_stats_collected", table_name="pool_stats")
+    op.drop_index("ix_pool_stats_tag_collected", table_name="pool_stats")
+    op.drop_table("pool_stats")
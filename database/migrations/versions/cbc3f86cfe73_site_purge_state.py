@@ -0,0 +1,42 @@
+"""site_purge_state
+
+Revision ID: cbc3f86cfe73
+Revises: 349567f99014
+Create Date: 2026-10-19 15:21:07.318264
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "cbc3f86cfe73"
+down_revision = "349567f99014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sites", sa.Column("purged_at", sa.DateTime(), nullable=True))
+    op.add_column(
+        "sites",
+        sa.Column(
+            "purge_skip_backup", sa.Boolean(), server_default="0", nullable=False
+        ),
+    )
+    op.add_column(
+        "sites",
+        sa.Column("purge_notify", sa.Boolean(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "sites", sa.Column("purge_error", sa.String(length=255), nullable=True)
+    )
+
+    # sites removed so far were purged synchronously
+    op.execute("UPDATE sites SET purged_at = removed_at WHERE removed_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column("sites", "purge_error")
+    op.drop_column("sites", "purge_notify")
+    op.drop_column("sites", "purge_skip_backup")
+    op.drop_column("sites", "purged_at")
@@ -0,0 +1,54 @@
+"""site_stats_rollups
+
+Revision ID: efa6055a0b84
+Revises: 228a4c26a6ae
+Create Date: 2026-10-19 11:40:07.118254
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "efa6055a0b84"
+down_revision = "228a4c26a6ae"
+branch_labels = None
+depends_on = None
+
+
+def _stats_columns() -> list[sa.Column]:
+    return [
+        sa.Column("content_count", sa.Integer(), nullable=False),
+        sa.Column("user_count", sa.Integer(), nullable=False),
+        sa.Column("assets_mb", sa.Float(), nullable=False),
+        sa.Column("db_data_mb", sa.Float(), nullable=False),
+        sa.Column("db_index_mb", sa.Float(), nullable=False),
+        sa.Column("db_tables", sa.Integer(), nullable=False),
+        sa.Column("db_rows", sa.BigInteger(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "site_stats_daily",
+        sa.Column("site_tag", sa.String(length=32), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        *_stats_columns(),
+        sa.ForeignKeyConstraint(["site_tag"], ["sites.tag"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("site_tag", "day"),
+    )
+    op.create_table(
+        "site_stats_monthly",
+        sa.Column("site_tag", sa.String(length=32), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        *_stats_columns(),
+        sa.ForeignKeyConstraint(["site_tag"], ["sites.tag"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("site_tag", "month"),
+    )
+    op.create_index("ix_site_stats_collected", "site_stats", ["collected_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_site_stats_collected", table_name="site_stats")
+    op.drop_table("site_stats_monthly")
+    op.drop_table("site_stats_daily")
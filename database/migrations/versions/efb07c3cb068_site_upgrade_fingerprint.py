@@ -0,0 +1,28 @@
+"""site_upgrade_fingerprint
+
+Revision ID: efb07c3cb068
+Revises: cbc3f86cfe73
+Create Date: 2026-10-19 16:02:44.871530
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "efb07c3cb068"
+down_revision = "cbc3f86cfe73"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sites", sa.Column("upgraded_at", sa.DateTime(), nullable=True))
+    op.add_column(
+        "sites",
+        sa.Column("upgrade_fingerprint", sa.String(length=64), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("sites", "upgrade_fingerprint")
+    op.drop_column("sites", "upgraded_at")
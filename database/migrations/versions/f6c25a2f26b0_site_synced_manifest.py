@@ -0,0 +1,25 @@
+"""site_synced_manifest
+
+Revision ID: f6c25a2f26b0
+Revises: efb07c3cb068
+Create Date: 2026-10-19 16:48:19.204713
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "f6c25a2f26b0"
+down_revision = "efb07c3cb068"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sites", sa.Column("synced_manifest", sa.String(length=64), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("sites", "synced_manifest")
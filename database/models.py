@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import typing as t
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import ForeignKey, Index, String, func, or_, select
+from sqlalchemy import BigInteger, ForeignKey, Index, String, func, or_, select
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 if t.TYPE_CHECKING:
@@ -37,11 +37,27 @@ class Site(Base):
     site_type: Mapped[str] = mapped_column(String(length=30), nullable=False)
     hostname: Mapped[str] = mapped_column(String(length=255), nullable=False)
     installed_at: Mapped[datetime] = mapped_column(nullable=True)
+    upgraded_at: Mapped[datetime] = mapped_column(nullable=True)
+    upgrade_fingerprint: Mapped[str] = mapped_column(String(length=64), nullable=True)
+    """Skeleton fingerprint the site was last upgraded against (see `site_manager.skeleton`)"""
+    synced_manifest: Mapped[str] = mapped_column(String(length=64), nullable=True)
+    """Skeleton manifest version the site's files were last synced from"""
+    skeleton_release: Mapped[str] = mapped_column(String(length=64), nullable=True)
+    """Skeleton release the site runs on, None for the legacy (unversioned) layout"""
+
+    # hibernation
+    hibernated_at: Mapped[datetime] = mapped_column(nullable=True)
+    """When the site's PHP-FPM pool was scaled down for being idle (see `site_manager.hibernation`)"""
 
     # removal
     removal_reason: Mapped[str] = mapped_column(String(length=255), nullable=True)
     removed_at: Mapped[datetime] = mapped_column(nullable=True)
     removed_ip: Mapped[str] = mapped_column(String(length=45), nullable=True)
+    purged_at: Mapped[datetime] = mapped_column(nullable=True)
+    """When the tenant's resources were removed by the reaper (`removed_at` is only the soft delete)"""
+    purge_skip_backup: Mapped[bool] = mapped_column(default=False, server_default="0")
+    purge_notify: Mapped[bool] = mapped_column(default=True, server_default="1")
+    purge_error: Mapped[str] = mapped_column(String(length=255), nullable=True)
 
     # IPs
     created_ip: Mapped[str] = mapped_column(String(length=45), nullable=True)
@@ -73,6 +89,14 @@ class Site(Base):
         last_2_parts = self.hostname.split(".")[-2:]
         return ".".join(last_2_parts)
 
+    def is_pending_purge(self) -> bool:
+        """Returns whether the site was removed, but its resources still exist"""
+        return self.removed_at is not None and self.purged_at is None
+
+    def is_hibernated(self) -> bool:
+        """Returns whether the site's PHP-FPM pool is currently scaled down"""
+        return self.hibernated_at is not None
+
     def is_donor(self) -> bool:
         """Returns whether the site admin has donated"""
         return (self.donated_amount or 0) > 0.0
@@ -160,7 +184,10 @@ class SiteStats(Base):
     """Historical resource usage snapshot for a tenant site."""
 
     __tablename__ = "site_stats"
-    __table_args__ = (Index("ix_site_stats_tag_collected", "site_tag", "collected_at"),)
+    __table_args__ = (
+        Index("ix_site_stats_tag_collected", "site_tag", "collected_at"),
+        Index("ix_site_stats_collected", "collected_at"),  # retention
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     site_tag: Mapped[str] = mapped_column(
@@ -169,6 +196,143 @@ class SiteStats(Base):
     content_count: Mapped[int] = mapped_column(default=0)
     user_count: Mapped[int] = mapped_column(default=0)
     assets_mb: Mapped[float] = mapped_column(default=0.0)
+
+    # tenant database footprint (from information_schema, row counts are estimates)
+    db_data_mb: Mapped[float] = mapped_column(default=0.0, server_default="0")
+    db_index_mb: Mapped[float] = mapped_column(default=0.0, server_default="0")
+    db_tables: Mapped[int] = mapped_column(default=0, server_default="0")
+    db_rows: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+
+    collected_at: Mapped[datetime] = mapped_column(
+        nullable=False, server_default=func.current_timestamp()
+    )
+
+
+class _StatsValues:
+    """Metric columns shared by the derived stats tables."""
+
+    content_count: Mapped[int] = mapped_column(default=0)
+    user_count: Mapped[int] = mapped_column(default=0)
+    assets_mb: Mapped[float] = mapped_column(default=0.0)
+    db_data_mb: Mapped[float] = mapped_column(default=0.0)
+    db_index_mb: Mapped[float] = mapped_column(default=0.0)
+    db_tables: Mapped[int] = mapped_column(default=0)
+    db_rows: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class SiteStatsDaily(_StatsValues, Base):
+    """Per-day rollup of `SiteStats` (max of each metric over the day)."""
+
+    __tablename__ = "site_stats_daily"
+
+    site_tag: Mapped[str] = mapped_column(
+        String(length=32),
+        ForeignKey("sites.tag", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+
+    samples: Mapped[int] = mapped_column(default=0)
+    """Number of snapshots aggregated into this row"""
+
+
+class SiteStatsMonthly(_StatsValues, Base):
+    """Per-month rollup of `SiteStatsDaily`, `month` is the first day of the month."""
+
+    __tablename__ = "site_stats_monthly"
+
+    site_tag: Mapped[str] = mapped_column(
+        String(length=32),
+        ForeignKey("sites.tag", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    month: Mapped[date] = mapped_column(primary_key=True)
+
+    samples: Mapped[int] = mapped_column(default=0)
+    """Number of snapshots aggregated into this row"""
+
+
+class SiteStatsLatest(_StatsValues, Base):
+    """Most recent `SiteStats` snapshot per site, upserted by collect_stats."""
+
+    __tablename__ = "site_stats_latest"
+
+    site_tag: Mapped[str] = mapped_column(
+        String(length=32),
+        ForeignKey("sites.tag", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    collected_at: Mapped[datetime] = mapped_column(nullable=False)
+
+
+class PoolStats(Base):
+    """PHP-FPM status snapshot of a tenant pool, counters are since the pool (re)started."""
+
+    __tablename__ = "pool_stats"
+    __table_args__ = (
+        Index("ix_pool_stats_tag_collected", "site_tag", "collected_at"),
+        Index("ix_pool_stats_collected", "collected_at"),  # retention
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    site_tag: Mapped[str] = mapped_column(
+        String(length=32), ForeignKey("sites.tag", ondelete="CASCADE"), nullable=False
+    )
+    start_since: Mapped[int] = mapped_column(default=0)
+    """Seconds since the pool started, a shorter uptime than the sampling interval means the counters were reset"""
+
+    accepted_conn: Mapped[int] = mapped_column(BigInteger, default=0)
+    max_children_reached: Mapped[int] = mapped_column(default=0)
+    slow_requests: Mapped[int] = mapped_column(default=0)
+    listen_queue: Mapped[int] = mapped_column(default=0)
+    active_processes: Mapped[int] = mapped_column(default=0)
+    idle_processes: Mapped[int] = mapped_column(default=0)
+    max_active_processes: Mapped[int] = mapped_column(default=0)
+    cpu_pct: Mapped[float] = mapped_column(default=0.0)
+    """Mean CPU usage of the workers' last requests"""
+
+    # from the tenant's cgroup (utils/cgroups.py), 0 without one
+    cpu_usage_usec: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0"
+    )
+    """CPU time of the tenant's workers since its cgroup was created"""
+    memory_bytes: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    memory_high_events: Mapped[int] = mapped_column(default=0, server_default="0")
+    """Times the workers were throttled at memory.high, since the cgroup was created"""
+
+    # from the stats of the tenant's memcached (utils/memcached.py), 0 without an object cache
+    cache_gets: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    """Object cache gets of the tenant since memcached started"""
+    cache_hits: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+
+    collected_at: Mapped[datetime] = mapped_column(
+        nullable=False, server_default=func.current_timestamp()
+    )
+
+
+class DbUsageStats(Base):
+    """A tenant's MariaDB workload between two samples (deltas of performance_schema counters)."""
+
+    __tablename__ = "db_usage_stats"
+    __table_args__ = (
+        Index("ix_db_usage_stats_tag_collected", "site_tag", "collected_at"),
+        Index("ix_db_usage_stats_collected", "collected_at"),  # retention
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    site_tag: Mapped[str] = mapped_column(
+        String(length=32), ForeignKey("sites.tag", ondelete="CASCADE"), nullable=False
+    )
+    statements: Mapped[int] = mapped_column(BigInteger, default=0)
+    latency_ms: Mapped[int] = mapped_column(BigInteger, default=0)
+    rows_examined: Mapped[int] = mapped_column(BigInteger, default=0)
+    rows_sent: Mapped[int] = mapped_column(BigInteger, default=0)
+    tmp_tables: Mapped[int] = mapped_column(default=0)
+    tmp_disk_tables: Mapped[int] = mapped_column(default=0)
+    busy_ms: Mapped[int] = mapped_column(BigInteger, default=0)
+    cpu_ms: Mapped[int] = mapped_column(BigInteger, default=0)
+    """From USER_STATISTICS, 0 without the userstat plugin"""
+
     collected_at: Mapped[datetime] = mapped_column(
         nullable=False, server_default=func.current_timestamp()
     )
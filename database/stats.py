@@ -0,0 +1,332 @@
+"""
+Downsampling, retention and trend queries for `SiteStats`.
+
+Raw snapshots are rolled up into `SiteStatsDaily` once a day is complete and
+deleted after `RAW_RETENTION_DAYS`. Daily rows older than
+`DAILY_RETENTION_DAYS` are rolled up into `SiteStatsMonthly` and deleted.
+Each rollup row keeps the max of every metric over its period (counters only
+grow in practice, so max ~= value at the end of the period).
+
+`PoolStats` (PHP-FPM status samples) aren't rolled up, their counters only
+mean something as deltas between samples; they are kept for
+`RAW_RETENTION_DAYS` and summarised per site by `get_pool_activity`. Same for
+`DbUsageStats` (already deltas), summed per site by `get_db_usage`.
+"""
+
+from __future__ import annotations
+
+import typing as t
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import mysql, sqlite
+
+from database.models import (
+    DbUsageStats,
+    PoolStats,
+    Site,
+    SiteStats,
+    SiteStatsDaily,
+    SiteStatsLatest,
+    SiteStatsMonthly,
+)
+
+if t.TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+RAW_RETENTION_DAYS = 14
+DAILY_RETENTION_DAYS = 180
+
+DB_USAGE_COUNTERS = (
+    "statements",
+    "latency_ms",
+    "rows_examined",
+    "rows_sent",
+    "tmp_tables",
+    "tmp_disk_tables",
+    "busy_ms",
+    "cpu_ms",
+)
+
+METRICS = (
+    "content_count",
+    "user_count",
+    "assets_mb",
+    "db_data_mb",
+    "db_index_mb",
+    "db_tables",
+    "db_rows",
+)
+
+
+async def upsert_latest(db: AsyncSession, rows: list[dict]) -> None:
+    """Insert or replace `SiteStatsLatest` rows (same dicts as the raw `SiteStats` insert)."""
+
+    if not rows:
+        return
+
+    columns = [*METRICS, "collected_at"]
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql.insert(SiteStatsLatest)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+    else:
+        stmt = sqlite.insert(SiteStatsLatest)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["site_tag"], set_={c: stmt.excluded[c] for c in columns}
+        )
+
+    await db.execute(stmt, rows)
+
+
+async def get_latest_stats(db: AsyncSession, *filters) -> dict[str, SiteStatsLatest]:
+    """Current usage per site tag, `filters` apply to the joined `Site`."""
+
+    result = await db.execute(
+        select(SiteStatsLatest)
+        .join(Site, Site.tag == SiteStatsLatest.site_tag)
+        .where(*filters)
+    )
+    return {row.site_tag: row for row in result.scalars()}
+
+
+async def rollup_daily(db: AsyncSession, today: date | None = None) -> int:
+    """Aggregate raw snapshots of all complete days not rolled up yet. Returns number of daily rows written."""
+
+    today = today or date.today()
+    last_day = await db.scalar(select(func.max(SiteStatsDaily.day)))
+
+    filters = [SiteStats.collected_at < _midnight(today)]
+    if last_day is not None:
+        filters.append(
+            SiteStats.collected_at >= _midnight(last_day + timedelta(days=1))
+        )
+
+    buckets: dict[tuple[str, date], dict] = {}
+    result = await db.stream(select(SiteStats).where(*filters))
+    async for row in result.scalars():
+        _merge(buckets, (row.site_tag, row.collected_at.date()), row, samples=1)
+
+    for (tag, day), values in buckets.items():
+        db.add(SiteStatsDaily(site_tag=tag, day=day, **values))
+    return len(buckets)
+
+
+async def rollup_monthly(db: AsyncSession, today: date | None = None) -> int:
+    """Fold daily rows past retention into monthly rows (whole months only). Returns number of months touched."""
+
+    today = today or date.today()
+    cutoff = (today - timedelta(days=DAILY_RETENTION_DAYS)).replace(day=1)
+
+    buckets: dict[tuple[str, date], dict] = {}
+    result = await db.stream(select(SiteStatsDaily).where(SiteStatsDaily.day < cutoff))
+    async for row in result.scalars():
+        _merge(buckets, (row.site_tag, row.day.replace(day=1)), row, row.samples)
+
+    for (tag, month), values in buckets.items():
+        existing = await db.get(SiteStatsMonthly, (tag, month))
+        if existing is None:
+            db.add(SiteStatsMonthly(site_tag=tag, month=month, **values))
+            continue
+        for metric in METRICS:
+            setattr(existing, metric, max(getattr(existing, metric), values[metric]))
+        existing.samples += values["samples"]
+
+    await db.execute(delete(SiteStatsDaily).where(SiteStatsDaily.day < cutoff))
+    return len(buckets)
+
+
+async def purge_raw(db: AsyncSession, today: date | None = None) -> int:
+    """Delete raw snapshots past retention. Returns number of deleted rows."""
+
+    today = today or date.today()
+    cutoff = _midnight(today - timedelta(days=RAW_RETENTION_DAYS))
+
+    # never drop raw rows that haven't been rolled up yet
+    last_day = await db.scalar(select(func.max(SiteStatsDaily.day)))
+    if last_day is None:
+        return 0
+    cutoff = min(cutoff, _midnight(last_day + timedelta(days=1)))
+
+    result = await db.execute(delete(SiteStats).where(SiteStats.collected_at < cutoff))
+    return result.rowcount or 0
+
+
+async def get_weekly_growth(
+    db: AsyncSession, *filters, weeks: int = 4, today: date | None = None
+) -> dict[str, dict[str, float]]:
+    """
+    Average growth per week of every metric over the last `weeks` weeks, from daily rollups.
+
+    Returns {tag: {metric: growth_per_week}}; sites with less than two days of data are omitted.
+    """
+
+    today = today or date.today()
+    since = today - timedelta(weeks=weeks)
+
+    first: dict[str, SiteStatsDaily] = {}
+    last: dict[str, SiteStatsDaily] = {}
+    result = await db.stream(
+        select(SiteStatsDaily)
+        .where(SiteStatsDaily.day >= since, *filters)
+        .order_by(SiteStatsDaily.site_tag, SiteStatsDaily.day)
+    )
+    async for row in result.scalars():
+        first.setdefault(row.site_tag, row)
+        last[row.site_tag] = row
+
+    growth = {}
+    for tag, newest in last.items():
+        oldest = first[tag]
+        days = (newest.day - oldest.day).days
+        if days <= 0:
+            continue
+        growth[tag] = {
+            metric: (getattr(newest, metric) - getattr(oldest, metric)) * 7 / days
+            for metric in METRICS
+        }
+    return growth
+
+
+async def purge_pool_stats(db: AsyncSession, today: date | None = None) -> int:
+    """Delete pool status samples past retention. Returns number of deleted rows."""
+
+    cutoff = _midnight((today or date.today()) - timedelta(days=RAW_RETENTION_DAYS))
+    result = await db.execute(delete(PoolStats).where(PoolStats.collected_at < cutoff))
+    return result.rowcount or 0
+
+
+async def purge_db_usage(db: AsyncSession, today: date | None = None) -> int:
+    """Delete database workload samples past retention. Returns number of deleted rows."""
+
+    cutoff = _midnight((today or date.today()) - timedelta(days=RAW_RETENTION_DAYS))
+    result = await db.execute(
+        delete(DbUsageStats).where(DbUsageStats.collected_at < cutoff)
+    )
+    return result.rowcount or 0
+
+
+async def get_db_usage(
+    db: AsyncSession, *filters, hours: int = 24, now: datetime | None = None
+) -> dict[str, dict[str, int]]:
+    """MariaDB workload per site over the last `hours`, {tag: {counter: sum}}."""
+
+    now = now or datetime.now()
+    result = await db.execute(
+        select(
+            DbUsageStats.site_tag,
+            *(func.sum(getattr(DbUsageStats, c)) for c in DB_USAGE_COUNTERS),
+        )
+        .join(Site, Site.tag == DbUsageStats.site_tag)
+        .where(DbUsageStats.collected_at >= now - timedelta(hours=hours), *filters)
+        .group_by(DbUsageStats.site_tag)
+    )
+    return {
+        tag: dict(zip(DB_USAGE_COUNTERS, (int(v or 0) for v in values)))
+        for tag, *values in result.all()
+    }
+
+
+async def get_pool_activity(
+    db: AsyncSession, *filters, hours: int = 24, now: datetime | None = None
+) -> dict[str, dict[str, float]]:
+    """
+    PHP-FPM activity per site over the last `hours`, from consecutive pool samples.
+
+    Returns {tag: {requests, requests_per_min, max_children_reached,
+    slow_requests, peak_active, cpu_pct, cpu_s, memory_high_events,
+    peak_memory_mb, cache_gets, cache_hits, cache_hit_pct}}; counters are
+    summed over the deltas between samples, a pool restart (reload), recreated
+    cgroup or restarted memcached in between counts from zero.
+    Sites with less than two samples are omitted.
+    """
+
+    now = now or datetime.now()
+    result = await db.stream(
+        select(PoolStats)
+        .join(Site, Site.tag == PoolStats.site_tag)
+        .where(PoolStats.collected_at >= now - timedelta(hours=hours), *filters)
+        .order_by(PoolStats.site_tag, PoolStats.collected_at)
+    )
+
+    activity: dict[str, dict[str, float]] = {}
+    first: dict[str, datetime] = {}
+    cpu: dict[str, list[float]] = {}
+    prev: PoolStats | None = None
+    async for row in result.scalars():
+        tag = row.site_tag
+        cpu.setdefault(tag, []).append(row.cpu_pct)
+        if prev is None or prev.site_tag != tag:
+            first[tag] = row.collected_at
+            prev = row
+            continue
+
+        elapsed = (row.collected_at - prev.collected_at).total_seconds()
+        restarted = row.start_since < elapsed or row.accepted_conn < prev.accepted_conn
+        entry = activity.setdefault(
+            tag,
+            {
+                "requests": 0,
+                "max_children_reached": 0,
+                "slow_requests": 0,
+                "peak_active": prev.active_processes,
+                "cpu_s": 0.0,
+                "memory_high_events": 0,
+                "peak_memory_mb": prev.memory_bytes / 1024 / 1024,
+                "cache_gets": 0,
+                "cache_hits": 0,
+            },
+        )
+        for counter in ("max_children_reached", "slow_requests"):
+            entry[counter] += getattr(row, counter) - (
+                0 if restarted else getattr(prev, counter)
+            )
+        entry["requests"] += row.accepted_conn - (
+            0 if restarted else prev.accepted_conn
+        )
+        entry["peak_active"] = max(entry["peak_active"], row.active_processes)
+
+        # cgroup counters, reset when the cgroup is recreated (reboot), and
+        # object cache counters, reset when memcached restarts
+        for counter, key, scale in (
+            ("cpu_usage_usec", "cpu_s", 1_000_000),
+            ("memory_high_events", "memory_high_events", 1),
+            ("cache_gets", "cache_gets", 1),
+            ("cache_hits", "cache_hits", 1),
+        ):
+            value, before = getattr(row, counter), getattr(prev, counter)
+            entry[key] += (value - (before if value >= before else 0)) / scale
+        entry["peak_memory_mb"] = max(
+            entry["peak_memory_mb"], row.memory_bytes / 1024 / 1024
+        )
+        entry["minutes"] = (row.collected_at - first[tag]).total_seconds() / 60
+        prev = row
+
+    for tag, entry in activity.items():
+        entry["requests_per_min"] = entry["requests"] / max(entry.pop("minutes"), 1)
+        entry["cpu_pct"] = sum(cpu[tag]) / len(cpu[tag])
+        entry["cache_hit_pct"] = (
+            entry["cache_hits"] / entry["cache_gets"] * 100
+            if entry["cache_gets"]
+            else None
+        )
+    return activity
+
+
+def disk_growth_mb(growth: dict[str, float]) -> float:
+    """Uploads + database growth, from a single site's `get_weekly_growth` entry."""
+    return growth["assets_mb"] + growth["db_data_mb"] + growth["db_index_mb"]
+
+
+def _merge(buckets: dict, key: tuple[str, date], row, samples: int) -> None:
+    bucket = buckets.get(key)
+    if bucket is None:
+        buckets[key] = {m: getattr(row, m) or 0 for m in METRICS} | {"samples": samples}
+        return
+
+    for metric in METRICS:
+        bucket[metric] = max(bucket[metric], getattr(row, metric) or 0)
+    bucket["samples"] += samples
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
@@ -24,6 +24,8 @@ VARS = {
         "backup_system_root": environ["BACKUP_SYSTEM_ROOT"],
         "backup_host_root": environ["BACKUP_HOST_ROOT"],
         "backup_attic_root": environ["BACKUP_ATTIC_ROOT"],
+        # persisted backend state (indexes, caches) that isn't worth a DB table
+        "state_root": environ.get("STATE_ROOT", "/var/lib/nocost"),
     },
     "info_mail": environ["MAILTO"],
     "kofi_verification_token": environ["KOFI_VERIFICATION_TOKEN"],
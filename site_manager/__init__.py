@@ -1,3 +1,4 @@
+import asyncio
 import tempfile
 from pathlib import Path
 
@@ -10,7 +11,21 @@ from site_manager.runner import (
     restore_tenant,
     sync_tenant_files,
 )
+from site_manager.backup_filters import get_backup_filters
+from site_manager.hibernation import forget_hibernation
+from site_manager.l10n_cache import has_shared_l10n_cache
+from site_manager.object_cache import (
+    flush_object_cache,
+    object_cache_config,
+    uses_object_cache,
+)
+from site_manager.releases import get_default_release
+from site_manager.scheduler import forget_scheduler
+from site_manager.skeleton import get_changed_paths
+from site_manager.templates import get_template
+from utils.cgroups import cgroups_enabled, get_limits
 from utils.cmd import run_cmd, run_cmd_as_tenant
+from utils.dirsize import forget_tenant
 
 
 def provision_site(
@@ -19,7 +34,11 @@ def provision_site(
     force: bool = False,
     send_email: bool = True,
 ):
-    return provision_tenant(
+    """Provision on the type's default skeleton release (sets `skeleton_release`, caller commits)."""
+
+    release = get_default_release(site.site_type)
+    template = get_template(site.site_type, release)
+    runner = provision_tenant(
         tenant_tag=site.tag,
         service_type=site.site_type,
         hostname=site.hostname,
@@ -27,12 +46,22 @@ def provision_site(
         reset_token=reset_token,
         force=force,
         send_email=send_email,
+        release=release,
+        template=template,
+        cgroup_limits=get_limits(site.is_donor()) if cgroups_enabled() else None,
+        object_cache=(
+            object_cache_config(site.tag) if uses_object_cache(site.site_type) else None
+        ),
     )
+    site.skeleton_release = release
+    return runner
 
 
 async def upgrade_site(
     site: Site,
     sync_files: bool = False,
+    migrate: bool = True,
+    full_sync: bool = False,
 ):
     tenant_root = Path(VARS["paths"]["tenants"]["root"]) / site.tag
     tenant_pub_dir = tenant_root / "public"
@@ -40,7 +69,25 @@ async def upgrade_site(
 
     result = None
     if sync_files:
-        result = sync_tenant_files(tenant_tag=site.tag, service_type=site.site_type)
+        # only what changed since the tenant's last sync, unless forced/unknown
+        changed_paths = None if full_sync else get_changed_paths(site)
+        if changed_paths != []:
+            # in a thread, rolling upgrades run many of these concurrently
+            result = await asyncio.to_thread(
+                sync_tenant_files,
+                tenant_tag=site.tag,
+                service_type=site.site_type,
+                changed_paths=changed_paths,
+                release=site.skeleton_release,
+            )
+
+    if not migrate:
+        return result
+
+    if uses_object_cache(site.site_type):
+        # before migrating, so nothing runs on stale cached options; a no-op for
+        # tenants without an object cache, it's only enabled explicitly
+        await flush_object_cache(site)
 
     match site.site_type:
         case "flarum":
@@ -48,13 +95,26 @@ async def upgrade_site(
             await run_cmd_as_tenant(tenant_user, "php flarum migrate", cwd=app_dir)
             await run_cmd_as_tenant(tenant_user, "php flarum cache:clear", cwd=app_dir)
         case "mediawiki":
-            await run_cmd_as_tenant(
-                tenant_user,
-                "php maintenance/run.php update --quick",
-                cwd=tenant_pub_dir,
-            )
+            if has_shared_l10n_cache(site):
+                # update.php's purge would rebuild the l10n cache (manualRecache) per
+                # tenant, the shared one is current; only the message blobs need purging
+                await run_cmd_as_tenant(
+                    tenant_user,
+                    "php maintenance/run.php update --quick --nopurge",
+                    cwd=tenant_pub_dir,
+                )
+                await run_cmd_as_tenant(
+                    tenant_user,
+                    "php maintenance/run.php purgeMessageBlobStore",
+                    cwd=tenant_pub_dir,
+                )
+            else:
+                await run_cmd_as_tenant(
+                    tenant_user,
+                    "php maintenance/run.php update --quick",
+                    cwd=tenant_pub_dir,
+                )
         case "wordpress":
-            await run_cmd_as_tenant(tenant_user, "wp cache flush", cwd=tenant_pub_dir)
             await run_cmd_as_tenant(
                 tenant_user, "wp core update-db", cwd=tenant_pub_dir
             )
@@ -67,8 +127,10 @@ def remove_site(
     skip_backup: bool = False,
     send_email: bool = True,
     reason: str | None = None,
+    reload: bool = True,
+    mounts: list[str] | None = None,
 ):
-    return remove_tenant(
+    runner = remove_tenant(
         tenant_tag=site.tag,
         service_type=site.site_type,
         skip_backup=skip_backup,
@@ -76,7 +138,14 @@ def remove_site(
         admin_email=site.admin_email,
         hostname=site.hostname,
         reason=reason,
+        reload=reload,
+        mounts=mounts,
+        backup_filters=get_backup_filters(site.site_type),
     )
+    forget_tenant(site.tag)
+    forget_hibernation(site.tag)
+    forget_scheduler(site.tag)
+    return runner
 
 
 def backup_site(
@@ -86,6 +155,7 @@ def backup_site(
     additional_excludes: list[str] = [],
     backup_dir: str | None = None,
     include_readme: bool = False,
+    mounts: list[str] | None = None,
 ):
     return backup_tenant(
         tenant_tag=site.tag,
@@ -95,6 +165,8 @@ def backup_site(
         additional_excludes=additional_excludes,
         backup_dir=backup_dir,
         include_readme=include_readme,
+        mounts=mounts,
+        backup_filters=get_backup_filters(site.site_type),
     )
 
 
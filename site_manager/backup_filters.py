@@ -0,0 +1,81 @@
+"""
+Precomputed rsync filters for tenant backups.
+
+What a backup has to leave out - the shared trees bind-mounted into every
+tenant and the files hardlinked from the skeleton - is the same for all
+tenants of a site type and follows from `vars/<type>_files.yml`. The filters
+are rendered once per site type into state files that `_backup.yml` merges
+(`--filter=merge`), instead of rediscovering them per tenant with a mount
+table scan and a `find -links +1` walk of the tenant tree.
+"""
+
+from functools import cache
+
+from site_manager.skeleton import load_file_vars
+from utils.state import state_path, write_atomic
+
+FILTER_ROOT = state_path("backup-filters")
+
+# what a backup contains, evaluated after the excludes (first match wins)
+BACKUP_INCLUDES = (
+    "+ /app/",
+    "+ /app/public/",
+    "+ /app/public/**",
+    "+ /etc/",
+    "+ /etc/config.json",
+    "+ /logs/",
+    "+ /logs/**",
+    "- *",
+)
+
+
+def render_backup_filters(site_type: str) -> dict[str, str]:
+    """
+    {layout: rsync filter rules} for the tenant dir of bind and overlay layout
+    tenants, plus "upper" for the upper dir of overlay tenants.
+    """
+
+    file_vars = load_file_vars(site_type)
+    # skeleton files tenants only have a hardlink of
+    shared = [
+        *file_vars.get("hardlink_paths", []),
+        *(link["dest"] for link in file_vars.get("renamed_hardlinks") or []),
+    ]
+
+    filters = {
+        "bind": [
+            *(f"- /{path}" for path in file_vars.get("mount_paths", [])),
+            *(f"- /{path}" for path in shared),
+            *BACKUP_INCLUDES,
+        ]
+    }
+
+    overlay_root = file_vars.get("overlay_root")
+    if overlay_root:
+        # the whole overlay is a mount, its upper dir is backed up separately
+        filters["overlay"] = [f"- /{overlay_root}", *BACKUP_INCLUDES]
+        prefix = f"{overlay_root}/"
+        filters["upper"] = [
+            f"- /{path.removeprefix(prefix)}"
+            for path in shared
+            if path.startswith(prefix)
+        ]
+
+    return {layout: "\n".join(rules) + "\n" for layout, rules in filters.items()}
+
+
+@cache
+def get_backup_filters(site_type: str) -> dict[str, str]:
+    """{layout: filter file path} of `site_type`, written once per process."""
+
+    paths = {}
+    for layout, rules in render_backup_filters(site_type).items():
+        path = FILTER_ROOT / f"{site_type}.{layout}.filter"
+        try:
+            current = path.read_text()
+        except OSError:
+            current = None
+        if current != rules:
+            write_atomic(path, rules)
+        paths[layout] = str(path)
+    return paths
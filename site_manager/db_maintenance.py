@@ -0,0 +1,214 @@
+"""
+Tenant database maintenance.
+
+Tenant databases fragment with churn (WordPress revisions and transients,
+MediaWiki objectcache, Flarum sessions) and nothing rebuilds them. One pass
+over `information_schema.TABLES` finds every tenant table with enough
+reclaimable space (`DATA_FREE`) to be worth an `OPTIMIZE` (a table rebuild
+for InnoDB), and the tables whose row count moved enough since the last run
+to be worth an `ANALYZE` (fresh index statistics, cheap).
+
+Statements run through a `utils.throttle.Throttle` with a concurrency of one
+or two, so rebuilds wait for quiet periods and never pile up. The size of
+every optimized table is measured again afterwards and the reclaimed space is
+appended to a JSONL log under the state root.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from os import environ
+
+import aiomysql
+
+from utils.state import load_json, save_json, state_path
+from utils.throttle import Throttle
+
+OPTIMIZE_MIN_FREE_MB = float(environ.get("OPTIMIZE_MIN_FREE_MB", "16"))
+# share of the table's on-disk size that is free space
+OPTIMIZE_MIN_FREE_RATIO = float(environ.get("OPTIMIZE_MIN_FREE_RATIO", "0.2"))
+# relative change of the (estimated) row count since the last ANALYZE
+ANALYZE_MIN_CHANGE = float(environ.get("ANALYZE_MIN_CHANGE", "0.1"))
+ANALYZE_MIN_ROWS = 1000
+
+LOG_PATH = state_path("db-maintenance", "log.jsonl")
+# {"schema.table": row count at the last ANALYZE}
+ANALYZED_PATH = state_path("db-maintenance", "analyzed.json")
+
+# one pass over all tenant schemas (`_` is a LIKE wildcard, hence the escape)
+TABLES_QUERY = """
+    SELECT TABLE_SCHEMA, TABLE_NAME, ENGINE,
+           COALESCE(DATA_LENGTH, 0), COALESCE(INDEX_LENGTH, 0),
+           COALESCE(DATA_FREE, 0), COALESCE(TABLE_ROWS, 0)
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA LIKE %s AND TABLE_TYPE = 'BASE TABLE'
+"""
+TABLE_SIZE_QUERY = """
+    SELECT COALESCE(DATA_LENGTH, 0) + COALESCE(INDEX_LENGTH, 0), COALESCE(DATA_FREE, 0)
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+"""
+
+
+async def query_tables(pool: aiomysql.Pool) -> list[dict]:
+    """All tenant tables with their sizes in MB and estimated rows."""
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(TABLES_QUERY, ("tenant\\_%",))
+            rows = await cur.fetchall()
+
+    return [
+        {
+            "schema": schema,
+            "table": table,
+            "engine": engine,
+            "size_mb": (int(data) + int(index)) / 1024 / 1024,
+            "free_mb": int(free) / 1024 / 1024,
+            "rows": int(table_rows),
+        }
+        for schema, table, engine, data, index, free, table_rows in rows
+    ]
+
+
+def plan_maintenance(
+    tables: list[dict],
+    analyzed: dict[str, int] | None = None,
+    min_free_mb: float = OPTIMIZE_MIN_FREE_MB,
+    min_free_ratio: float = OPTIMIZE_MIN_FREE_RATIO,
+) -> list[tuple[str, dict]]:
+    """
+    [(OPTIMIZE|ANALYZE, table)], most reclaimable space first. A table that
+    gets optimized isn't analyzed separately, the rebuild updates its statistics.
+    `analyzed` defaults to the row counts stored by the last run.
+    """
+
+    if analyzed is None:
+        analyzed = load_json(ANALYZED_PATH, default={})
+    optimize, analyze = [], []
+    for table in tables:
+        if table["engine"] not in ("InnoDB", "Aria", "MyISAM"):
+            continue  # MEMORY tables, views of other engines etc.
+
+        on_disk = table["size_mb"] + table["free_mb"]
+        if (
+            table["free_mb"] >= min_free_mb
+            and table["free_mb"] >= on_disk * min_free_ratio
+        ):
+            optimize.append(("OPTIMIZE", table))
+            continue
+
+        last_rows = analyzed.get(_key(table))
+        if table["rows"] >= ANALYZE_MIN_ROWS and (
+            last_rows is None
+            or abs(table["rows"] - last_rows) > max(last_rows, 1) * ANALYZE_MIN_CHANGE
+        ):
+            analyze.append(("ANALYZE", table))
+
+    optimize.sort(key=lambda item: item[1]["free_mb"], reverse=True)
+    return optimize + analyze
+
+
+def check_result(rows: list[tuple]) -> None:
+    """
+    Raise on a failed `OPTIMIZE`/`ANALYZE TABLE`. MariaDB reports per-table
+    failures (lock wait timeout, corrupt or unsupported table) as result rows
+    (Table, Op, Msg_type, Msg_text) with `Msg_type = 'error'`, not as errors.
+    """
+
+    errors = [str(row[3]) for row in rows if len(row) >= 4 and row[2] == "error"]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+
+async def run_maintenance(
+    pool: aiomysql.Pool, plan: list[tuple[str, dict]], throttle: Throttle
+) -> list[dict]:
+    """Run the planned statements under `throttle`, returns (and logs) one entry per table."""
+
+    analyzed = load_json(ANALYZED_PATH, default={})
+
+    async def run(action: str, table: dict) -> dict:
+        async with throttle:
+            started = time.monotonic()
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    # names come from information_schema, backticks are all that needs escaping
+                    await cur.execute(
+                        f"{action} TABLE `{_escape(table['schema'])}`.`{_escape(table['table'])}`"
+                    )
+                    check_result(await cur.fetchall())
+                    await cur.execute(
+                        TABLE_SIZE_QUERY, (table["schema"], table["table"])
+                    )
+                    size = await cur.fetchone()
+
+        entry = {
+            "tag": table["schema"].removeprefix("tenant_"),
+            "table": table["table"],
+            "action": action.lower(),
+            "seconds": round(time.monotonic() - started, 1),
+        }
+        if action == "OPTIMIZE" and size:
+            before = table["size_mb"] + table["free_mb"]
+            after = (int(size[0]) + int(size[1])) / 1024 / 1024
+            entry["reclaimed_mb"] = round(max(before - after, 0), 2)
+        analyzed[_key(table)] = table["rows"]
+        _append_log(entry)
+        return entry
+
+    results = await asyncio.gather(
+        *(run(action, table) for action, table in plan), return_exceptions=True
+    )
+    save_json(ANALYZED_PATH, analyzed)
+
+    entries = []
+    for (action, table), result in zip(plan, results):
+        if isinstance(result, Exception):
+            entry = {
+                "tag": table["schema"].removeprefix("tenant_"),
+                "table": table["table"],
+                "action": action.lower(),
+                "error": str(result),
+            }
+            _append_log(entry)
+            entries.append(entry)
+        else:
+            entries.append(result)
+    return entries
+
+
+def get_reclaimed_mb() -> dict[str, float]:
+    """Total space reclaimed per tenant over the whole log."""
+
+    reclaimed: dict[str, float] = {}
+    try:
+        with open(LOG_PATH) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("reclaimed_mb"):
+                    reclaimed[entry["tag"]] = (
+                        reclaimed.get(entry["tag"], 0.0) + entry["reclaimed_mb"]
+                    )
+    except FileNotFoundError:
+        pass
+    return reclaimed
+
+
+def _key(table: dict) -> str:
+    return f"{table['schema']}.{table['table']}"
+
+
+def _escape(name: str) -> str:
+    return name.replace("`", "``")
+
+
+def _append_log(entry: dict) -> None:
+    entry["at"] = datetime.now().isoformat(timespec="seconds")
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
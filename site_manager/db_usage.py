@@ -0,0 +1,172 @@
+"""
+Per-tenant MariaDB workload accounting.
+
+Every tenant connects as its own `tenant_<tag>` user, so MariaDB already
+attributes load per tenant: `performance_schema` keeps statement summaries per
+user (counts, latency, rows examined, temporary tables) and, with
+`userstat = 1`, `information_schema.USER_STATISTICS` adds busy and CPU time.
+Both are counters since the server started, so the collector keeps the last
+snapshot under the state root and stores the deltas (`DbUsageStats`); a
+counter that went backwards (restart, truncated summaries) counts from zero.
+
+Tenants that take more than `DB_OUTLIER_SHARE` of the statement latency of a
+sampling window get `MAX_USER_CONNECTIONS` / `MAX_QUERIES_PER_HOUR` limits,
+which are lifted again once their share has dropped below half of that.
+Donors are never limited.
+"""
+
+from datetime import datetime
+from os import environ
+
+import aiomysql
+
+from database.stats import DB_USAGE_COUNTERS
+from utils.state import load_json, save_json, state_path
+
+DB_OUTLIER_SHARE = float(environ.get("DB_OUTLIER_SHARE", "0.25"))
+# don't limit anyone on an idle server, where any tenant can be "the top one"
+DB_OUTLIER_MIN_LATENCY_S = float(environ.get("DB_OUTLIER_MIN_LATENCY_S", "60"))
+DB_LIMIT_CONNECTIONS = int(environ.get("DB_LIMIT_CONNECTIONS", "5"))
+DB_LIMIT_QUERIES_PER_HOUR = int(environ.get("DB_LIMIT_QUERIES_PER_HOUR", "36000"))
+
+SNAPSHOT_PATH = state_path("db-usage", "snapshot.json")
+# {tag: limited since (iso)}
+LIMITED_PATH = state_path("db-usage", "limited.json")
+
+# timers are in picoseconds
+STATEMENTS_QUERY = """
+    SELECT USER,
+           SUM(COUNT_STAR),
+           SUM(SUM_TIMER_WAIT) DIV 1000000000,
+           SUM(SUM_ROWS_EXAMINED),
+           SUM(SUM_ROWS_SENT),
+           SUM(SUM_CREATED_TMP_TABLES),
+           SUM(SUM_CREATED_TMP_DISK_TABLES)
+    FROM performance_schema.events_statements_summary_by_user_by_event_name
+    WHERE USER LIKE %s
+    GROUP BY USER
+"""
+USER_STATISTICS_QUERY = """
+    SELECT USER, BUSY_TIME, CPU_TIME
+    FROM information_schema.USER_STATISTICS
+    WHERE USER LIKE %s
+"""
+
+
+async def query_counters(pool: aiomysql.Pool) -> dict[str, dict[str, int]]:
+    """Cumulative counters per tenant tag, {tag: {counter: value}}."""
+
+    counters: dict[str, dict[str, int]] = {}
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(STATEMENTS_QUERY, ("tenant\\_%",))
+            for user, *values in await cur.fetchall():
+                counters[user.removeprefix("tenant_")] = dict(
+                    zip(DB_USAGE_COUNTERS[:6], (int(v or 0) for v in values))
+                )
+
+            try:
+                await cur.execute(USER_STATISTICS_QUERY, ("tenant\\_%",))
+                rows = await cur.fetchall()
+            except aiomysql.Error:
+                rows = []  # not a MariaDB with the userstat plugin
+            for user, busy_s, cpu_s in rows:
+                entry = counters.setdefault(user.removeprefix("tenant_"), {})
+                entry["busy_ms"] = int(float(busy_s or 0) * 1000)
+                entry["cpu_ms"] = int(float(cpu_s or 0) * 1000)
+    return counters
+
+
+def compute_deltas(
+    current: dict[str, dict[str, int]], previous: dict[str, dict[str, int]]
+) -> dict[str, dict[str, int]]:
+    """Per tenant counter deltas, tenants without any activity are left out."""
+
+    deltas = {}
+    for tag, counters in current.items():
+        before = previous.get(tag, {})
+        delta = {}
+        for counter in DB_USAGE_COUNTERS:
+            value = counters.get(counter, 0)
+            last = before.get(counter, 0)
+            delta[counter] = value - last if value >= last else value
+        if any(delta.values()):
+            deltas[tag] = delta
+    return deltas
+
+
+def take_deltas(current: dict[str, dict[str, int]]) -> dict[str, dict[str, int]]:
+    """Deltas against the stored snapshot, which is replaced by `current`."""
+
+    previous = load_json(SNAPSHOT_PATH, default=None)
+    save_json(SNAPSHOT_PATH, current)
+    if previous is None:
+        return {}  # first run, nothing to compare with
+    return compute_deltas(current, previous)
+
+
+def find_outliers(
+    deltas: dict[str, dict[str, int]],
+    share: float = DB_OUTLIER_SHARE,
+    min_latency_s: float = DB_OUTLIER_MIN_LATENCY_S,
+) -> set[str]:
+    """Tenants with more than `share` of the window's statement latency."""
+
+    total_ms = sum(delta["latency_ms"] for delta in deltas.values())
+    if total_ms < min_latency_s * 1000:
+        return set()
+    return {
+        tag for tag, delta in deltas.items() if delta["latency_ms"] / total_ms > share
+    }
+
+
+async def update_limits(
+    pool: aiomysql.Pool,
+    deltas: dict[str, dict[str, int]],
+    active: set[str],
+    exempt: set[str],
+    dry_run: bool = False,
+) -> tuple[list[str], list[str]]:
+    """
+    Limit new outliers among the `active` tenants and lift the limits of
+    tenants that calmed down (or became `exempt`). Returns (limited, lifted).
+    """
+
+    limited = {
+        tag: since
+        for tag, since in load_json(LIMITED_PATH, default={}).items()
+        if tag in active  # removed tenants took their database user with them
+    }
+    outliers = find_outliers(deltas) & active - exempt
+    still_busy = find_outliers(deltas, share=DB_OUTLIER_SHARE / 2) - exempt
+
+    to_limit = sorted(outliers - set(limited))
+    to_lift = sorted(set(limited) - still_busy)
+    if dry_run:
+        return to_limit, to_lift
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for tag in to_limit:
+                await _alter_user(
+                    cur, tag, DB_LIMIT_CONNECTIONS, DB_LIMIT_QUERIES_PER_HOUR
+                )
+                limited[tag] = datetime.now().isoformat(timespec="seconds")
+            for tag in to_lift:
+                await _alter_user(cur, tag, 0, 0)  # 0 = unlimited
+                del limited[tag]
+    save_json(LIMITED_PATH, limited)
+    return to_limit, to_lift
+
+
+def get_limited() -> dict[str, str]:
+    """{tag: limited since} of the tenants currently running with DB limits."""
+    return load_json(LIMITED_PATH, default={})
+
+
+async def _alter_user(cur, tag: str, connections: int, queries_per_hour: int):
+    # limits only apply to new connections, existing ones keep running
+    await cur.execute(
+        "ALTER USER %s@'127.0.0.1' WITH MAX_USER_CONNECTIONS %s MAX_QUERIES_PER_HOUR %s",
+        (f"tenant_{tag}", connections, queries_per_hour),
+    )
@@ -0,0 +1,233 @@
+"""
+Idle tenant hibernation.
+
+Every tenant has its own PHP-FPM pool, most of them serve next to no
+traffic. Tenants whose access log has no request in the last
+`HIBERNATE_AFTER_DAYS` get their pool rewritten to `pm = ondemand` with a
+couple of children and a short idle timeout, so they hold no workers until a
+request comes in - PHP-FPM spawns one for the first request, that's the
+wake-up. Once a hibernated tenant shows traffic again (or its admin donates),
+the next run restores its regular pool.
+
+Pools are rewritten in one playbook run per batch, followed by a single
+coalesced PHP-FPM reload. Every transition is appended to a JSONL log under
+the state root, with the pool's RSS when it went to sleep (memory saved) and
+the duration of the first request after it (wake latency, from the tenant's
+JSON access log).
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from os import environ
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Site
+from settings import VARS
+from site_manager.pool_sizing import get_pool_sizes, get_pool_workers
+from site_manager.runner import set_tenant_pools_hibernated
+from utils.access_log import entry_time
+from utils.reload import PHP_FPM, request_reload
+from utils.state import load_json, save_json, state_path
+
+TENANTS_ROOT = Path(VARS["paths"]["tenants"]["root"])
+
+HIBERNATE_AFTER_DAYS = int(environ.get("HIBERNATE_AFTER_DAYS", "14"))
+HIBERNATE_MAX_CHILDREN = int(environ.get("HIBERNATE_MAX_CHILDREN", "2"))
+HIBERNATE_IDLE_TIMEOUT = environ.get("HIBERNATE_IDLE_TIMEOUT", "10s")
+# new tenants haven't had a chance to get traffic yet
+MIN_AGE_DAYS = 7
+# enough of the access log's end to hold its last entry
+LAST_ENTRY_BYTES = 64 * 1024
+
+LOG_PATH = state_path("hibernation", "events.jsonl")
+# {tag: [access log size when hibernated, pool RSS in KiB]}
+STATE_PATH = state_path("hibernation", "sleeping.json")
+
+
+def access_log_path(tag: str) -> Path:
+    return TENANTS_ROOT / tag / "logs" / "access.log"
+
+
+def get_last_access(tag: str) -> datetime | None:
+    """
+    Time of the last request in the tenant's access log, None if no entry
+    has one. Not the log's mtime, which rotation bumps without traffic;
+    a freshly rotated log falls back to the rotated one.
+    """
+
+    path = access_log_path(tag)
+    for log in (path, path.with_name(path.name + ".1")):
+        try:
+            with open(log, "rb") as f:
+                f.seek(max(0, os.fstat(f.fileno()).st_size - LAST_ENTRY_BYTES))
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        for line in reversed(lines):
+            try:
+                ts = entry_time(json.loads(line))
+            except ValueError:
+                continue  # cut off by the seek
+            if ts is not None:
+                return ts
+    return None
+
+
+def is_idle(site: Site, now: datetime, idle_days: int = HIBERNATE_AFTER_DAYS) -> bool:
+    """Whether an active site should be hibernated."""
+
+    if site.is_hibernated() or site.is_donor() or not site.is_installed():
+        return False
+    if site.installed_at > now - timedelta(days=MIN_AGE_DAYS):
+        return False
+    last_access = get_last_access(site.tag)
+    if last_access is None:
+        # entries we can't date are no evidence of idleness, only no log at all is
+        return not _access_log_size(site.tag)
+    return last_access < now - timedelta(days=idle_days)
+
+
+def should_wake(site: Site) -> bool:
+    """Whether a hibernated site got traffic (or donated) since it went to sleep."""
+
+    if not site.is_hibernated():
+        return False
+    if site.is_donor():
+        return True
+    last_access = get_last_access(site.tag)
+    if last_access is not None:
+        return last_access > site.hibernated_at
+    # no dated entries: anything logged since it went to sleep is traffic
+    log_offset = load_json(STATE_PATH, default={}).get(site.tag, [None])[0]
+    size = _access_log_size(site.tag)
+    return log_offset is not None and size is not None and size > log_offset
+
+
+async def hibernate_sites(db: AsyncSession, sites: list[Site]) -> None:
+    """Scale down the pools of `sites` and commit, one PHP-FPM reload for all."""
+
+    if not sites:
+        return
+
+    # RSS counts shared pages (opcache, libraries) in every worker, so this
+    # overstates what a pool really costs
+    rss = {pool: rss_kb for pool, (_, rss_kb) in get_pool_workers().items()}
+    await asyncio.to_thread(
+        set_tenant_pools_hibernated,
+        [site.tag for site in sites],
+        hibernated=True,
+        max_children=HIBERNATE_MAX_CHILDREN,
+        idle_timeout=HIBERNATE_IDLE_TIMEOUT,
+    )
+    await request_reload(PHP_FPM)
+
+    now = datetime.now()
+    sleeping = load_json(STATE_PATH, default={})
+    for site in sites:
+        site.hibernated_at = now
+        sleeping[site.tag] = [_access_log_size(site.tag), rss.get(site.tag, 0)]
+        _append_log(site.tag, "hibernate", rss_kb=rss.get(site.tag, 0))
+    save_json(STATE_PATH, sleeping)
+    await db.commit()
+
+
+async def wake_sites(db: AsyncSession, sites: list[Site]) -> None:
+    """Restore the regular pools of `sites` and commit, one PHP-FPM reload for all."""
+
+    if not sites:
+        return
+
+    tags = [site.tag for site in sites]
+    pool_sizes = get_pool_sizes()
+    await asyncio.to_thread(
+        set_tenant_pools_hibernated,
+        tags,
+        hibernated=False,
+        pool_sizes={tag: pool_sizes[tag] for tag in tags if tag in pool_sizes},
+    )
+    await request_reload(PHP_FPM)
+
+    sleeping = load_json(STATE_PATH, default={})
+    for site in sites:
+        log_offset, rss_kb = sleeping.pop(site.tag, [None, 0])
+        _append_log(
+            site.tag,
+            "wake",
+            rss_kb=rss_kb,
+            slept_s=int((datetime.now() - site.hibernated_at).total_seconds()),
+            wake_ms=_first_request_ms(site.tag, log_offset),
+        )
+        site.hibernated_at = None
+    save_json(STATE_PATH, sleeping)
+    await db.commit()
+
+
+def get_hibernation_stats() -> dict:
+    """Totals over the event log: memory saved by sleeping pools, wake latencies."""
+
+    sleeping = load_json(STATE_PATH, default={})
+    wake_ms = []
+    try:
+        with open(LOG_PATH) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event["action"] == "wake" and event.get("wake_ms") is not None:
+                    wake_ms.append(event["wake_ms"])
+    except FileNotFoundError:
+        pass
+
+    return {
+        "sleeping": len(sleeping),
+        "saved_mb": sum(rss_kb for _, rss_kb in sleeping.values()) / 1024,
+        "wake_ms": wake_ms,
+    }
+
+
+def forget_hibernation(tag: str) -> None:
+    """Drop a removed tenant from the sleeping state."""
+
+    sleeping = load_json(STATE_PATH, default={})
+    if sleeping.pop(tag, None) is not None:
+        save_json(STATE_PATH, sleeping)
+
+
+def _access_log_size(tag: str) -> int | None:
+    try:
+        return access_log_path(tag).stat().st_size
+    except OSError:
+        return None
+
+
+def _first_request_ms(tag: str, log_offset: int | None) -> int | None:
+    """`request_time` of the first access log entry written after `log_offset`."""
+
+    path = access_log_path(tag)
+    try:
+        with open(path, "rb") as f:
+            # the log was rotated (or truncated) in between, the first entry is the oldest one left
+            if log_offset is None or log_offset > os.fstat(f.fileno()).st_size:
+                log_offset = 0
+            f.seek(log_offset)
+            line = f.readline()
+        return round(float(json.loads(line)["request_time"]) * 1000)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _append_log(tag: str, action: str, **fields) -> None:
+    entry = {
+        "tag": tag,
+        "action": action,
+        **fields,
+        "at": datetime.now().isoformat(timespec="seconds"),
+    }
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,94 @@
+"""
+Shared MediaWiki localisation cache.
+
+Every wiki runs the same `languages`/`extensions` trees from the skeleton, yet
+MediaWiki would rebuild its localisation cache per tenant - on the first
+requests after an upgrade, and again in `update.php`. Tenants can only pick
+from `ALLOWED_LANGUAGES`, so the cache for all of them is built once per
+skeleton version with `rebuildLocalisationCache` (CDB files) into
+`app/public/cache/l10n` of the skeleton, during `prepare_skeleton`. That path
+is one of the read-only mount paths (`vars/mediawiki_files.yml`), so every
+tenant sees the cache of its own skeleton or release, and the shared
+`LocalSettings.php` uses it with `manualRecache` whenever it's there.
+
+A stamp file next to the cache records what it was built from (upgrade
+fingerprint and language set), an unchanged skeleton is never rebuilt.
+"""
+
+import hashlib
+import os
+from os import environ
+from pathlib import Path
+
+from database.models import Site
+from site_manager.mediawiki import ALLOWED_LANGUAGES
+from site_manager.releases import release_dir
+from site_manager.skeleton import SKELETON_ROOT, get_upgrade_fingerprint
+from utils.cmd import run_cmd
+
+# relative to the skeleton (or release) root, one of the mediawiki mount_paths
+L10N_CACHE_PATH = "app/public/cache/l10n"
+STAMP_NAME = ".stamp"
+L10N_THREADS = int(environ.get("L10N_THREADS", str(os.cpu_count() or 1)))
+
+
+def cache_stamp(
+    fingerprint: str | None, languages: set[str] = ALLOWED_LANGUAGES
+) -> str | None:
+    """What a cache built from the skeleton with `fingerprint` is identified by."""
+
+    if fingerprint is None:
+        return None
+    # English is the fallback of every language, it's always needed
+    codes = ",".join(sorted(languages | {"en"}))
+    return hashlib.sha256(f"{fingerprint}\0{codes}".encode()).hexdigest()
+
+
+def read_stamp(skeleton_dir: Path) -> str | None:
+    try:
+        return (skeleton_dir / L10N_CACHE_PATH / STAMP_NAME).read_text().strip()
+    except OSError:
+        return None
+
+
+def has_shared_l10n_cache(site: Site) -> bool:
+    """Whether the skeleton (or release) the site runs on comes with a built cache."""
+
+    if site.skeleton_release is not None:
+        skeleton_dir = release_dir(site.site_type, site.skeleton_release)
+    else:
+        skeleton_dir = SKELETON_ROOT / site.site_type
+    return read_stamp(skeleton_dir) is not None
+
+
+async def build_l10n_cache(force: bool = False) -> bool:
+    """
+    Build the cache of the current mediawiki skeleton, if it's not current
+    already. Returns whether it was (re)built.
+    """
+
+    skeleton_dir = SKELETON_ROOT / "mediawiki"
+    stamp = cache_stamp(get_upgrade_fingerprint("mediawiki"))
+    if stamp is None:
+        raise RuntimeError(f"No mediawiki skeleton at {skeleton_dir}")
+    if not force and read_stamp(skeleton_dir) == stamp:
+        return False
+
+    dest = skeleton_dir / L10N_CACHE_PATH
+    tmp = dest.with_name(".l10n.tmp")
+    languages = ",".join(sorted(ALLOWED_LANGUAGES | {"en"}))
+    await run_cmd(f"sudo rm -rf {tmp}")
+    await run_cmd(f"sudo mkdir -p {tmp} {dest}")
+    await run_cmd(
+        "sudo php maintenance/run.php rebuildLocalisationCache"
+        f" --conf=LocalSettings.common.php --force --store-class=LCStoreCDB"
+        f" --outdir={tmp} --lang={languages} --threads={L10N_THREADS}",
+        cwd=skeleton_dir / "app" / "public",
+    )
+    # tenants read it through their (mounted) copy of the dir, so files are
+    # renamed into it one by one instead of swapping the dir under the mounts
+    await run_cmd(f"sudo chmod -R a+rX {tmp}")
+    await run_cmd(f"sudo find {tmp} -maxdepth 1 -type f -exec mv -f {{}} {dest}/ \\;")
+    await run_cmd(f"sudo rm -rf {tmp}")
+    await run_cmd(f"echo {stamp} | sudo tee {dest / STAMP_NAME} > /dev/null")
+    return True
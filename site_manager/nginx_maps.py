@@ -0,0 +1,262 @@
+"""
+Incremental nginx map management.
+
+The current map state ({tag: [hostname, site_type]}) is persisted next to the
+rendered files, so a single site change doesn't need to stream every active
+site from the database. Files are written atomically and nginx is only
+reloaded when the rendered content actually changed.
+
+`write_nginx_maps` rebuilds the state from the database and is the
+reconciliation path (`sync_nginx_maps` CLI).
+
+`NGINX_MAP_MODE=compact` switches to a regex based map that doesn't grow with
+the number of parent domains (see `benchmarks/nginx_maps.py`).
+"""
+
+import hashlib
+import re
+from os import environ
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Site
+from settings import VARS
+from utils.reload import NGINX, request_reload
+from utils.state import file_lock, load_json, save_json, state_path, write_atomic
+
+NGINX_MAP_PATH = Path("/etc/nginx/maps/sites.conf")
+CUSTOM_SERVER_NAMES_PATH = Path("/etc/nginx/snippets/custom-server-names.conf")
+STATE_PATH = state_path("nginx-maps.json")
+
+# full: every {tag}.{domain} listed explicitly
+# compact: internal hosts resolved by regex, only custom domains listed
+MAP_MODES = ("full", "compact")
+NGINX_MAP_MODE = environ.get("NGINX_MAP_MODE", "full")
+
+type map_entries = dict[str, list[str]]
+
+
+async def update_nginx_maps(db: AsyncSession, *sites: Site) -> bool:
+    """
+    Add or update the given sites in the nginx maps (removed sites are dropped).
+
+    Returns whether nginx was reloaded.
+    """
+
+    def apply(entries: map_entries) -> None:
+        for site in sites:
+            if site.removed_at is None and site.hostname is not None:
+                entries[site.tag] = [site.hostname, site.site_type]
+            else:
+                entries.pop(site.tag, None)
+
+    return await _apply(db, apply)
+
+
+async def remove_from_nginx_maps(db: AsyncSession, *tags: str) -> bool:
+    """Remove sites from the nginx maps. Returns whether nginx was reloaded."""
+
+    def apply(entries: map_entries) -> None:
+        for tag in tags:
+            entries.pop(tag, None)
+
+    return await _apply(db, apply)
+
+
+async def write_nginx_maps(db: AsyncSession, force: bool = False) -> bool:
+    """
+    Rebuild nginx maps for all tenants from the database.
+
+    generates two files:
+    - sites.conf: hostname/site_id/service_type maps
+    - custom-server-names.conf: server_name directive for custom domain TLS matching
+
+    With `force`, files are rewritten and nginx reloaded even if nothing changed.
+    Returns whether nginx was reloaded.
+    """
+
+    async with file_lock("nginx-maps"):
+        state = load_json(STATE_PATH, default={})
+        entries = await _load_entries_from_db(db)
+        return await _write(entries, state.get("hash"), force=force)
+
+
+def render_nginx_maps(entries: map_entries, mode: str | None = None) -> tuple[str, str]:
+    """Returns (sites_config, server_names_config) for the given map state."""
+
+    mode = mode or NGINX_MAP_MODE
+    if mode not in MAP_MODES:
+        raise ValueError(f"Unknown nginx map mode: {mode}")
+
+    # sorted so that the same state always renders to the same bytes
+    entries = dict(sorted(entries.items()))
+    custom_entries = [
+        f"    {hostname}    {tag};"
+        for tag, (hostname, _) in entries.items()
+        if not _is_internal_domain(hostname)
+    ]
+
+    if mode == "compact":
+        sites_config = _render_compact(entries, custom_entries)
+    else:
+        sites_config = _render_full(entries, custom_entries)
+
+    # custom domain server_name entries (included in the tenant server block
+    # so custom domains pass TLS instead of hitting ssl_reject_handshake)
+    custom_hostnames = [e.split()[0] for e in custom_entries]
+    server_names_config = (
+        "# auto-generated by: site_manager/nginx_maps.py:write_nginx_maps\n"
+    )
+    if custom_hostnames:
+        server_names_config += f"server_name {' '.join(custom_hostnames)};\n"
+
+    return sites_config, server_names_config
+
+
+def _render_full(entries: map_entries, custom_entries: list[str]) -> str:
+    # hostnames -> site_id
+    internal_entries: list[str] = []
+    # site_id -> canonical hostname
+    canonical_entries: list[str] = []
+    # site_id -> service_type
+    type_entries: list[str] = []
+
+    for tag, (hostname, site_type) in entries.items():
+        # internal hosts: {tag}.{domain} permutations
+        for domain in VARS["allowed_domains"]:
+            internal_entries.append(f"    {tag}.{domain}    {tag};")
+        canonical_entries.append(f"    {tag}    {hostname};")
+        type_entries.append(f"    {tag}    {site_type};")
+
+    return f"""\
+# auto-generated by: site_manager/nginx_maps.py:write_nginx_maps
+# hostnames -> site_id
+map $host $site_id {{
+    hostnames;
+
+    # internal hosts
+{"\n".join(internal_entries) if internal_entries else "    # (none)"}
+
+    # user domains/CNAMEs
+{"\n".join(custom_entries) if custom_entries else "    # (none)"}
+
+    default "";
+}}
+
+# site_id -> canonical hostname
+map $site_id $canonical_host {{
+{"\n".join(canonical_entries) if canonical_entries else "    # (none)"}
+
+    default "";
+}}
+
+# site_id -> service type
+map $site_id $service_type {{
+{"\n".join(type_entries) if type_entries else "    # (none)"}
+
+    default "";
+}}
+"""
+
+
+def _render_compact(entries: map_entries, custom_entries: list[str]) -> str:
+    """
+    Same variables as the full mode, but internal hosts are resolved by a single
+    regex and every site is one "<service_type> <canonical_host>" line that the
+    other maps split up, so the config grows by ~1 line per site instead of
+    len(allowed_domains) + 2.
+    """
+
+    domains = "|".join(re.escape(domain) for domain in VARS["allowed_domains"])
+    site_entries = [
+        f'    {tag}    "{site_type} {hostname}";'
+        for tag, (hostname, site_type) in entries.items()
+    ]
+
+    return f"""\
+# auto-generated by: site_manager/nginx_maps.py:write_nginx_maps (compact)
+# hostnames -> tag candidate, not yet checked against the site list
+map $host $site_candidate {{
+    hostnames;
+
+    # user domains/CNAMEs (exact names take precedence over the regex)
+{"\n".join(custom_entries) if custom_entries else "    # (none)"}
+
+    # internal hosts
+    "~^(?<nocost_tag>[a-z0-9_]+)\\.(?:{domains})$"    $nocost_tag;
+
+    default "";
+}}
+
+# tag candidate -> "<service_type> <canonical_host>"
+map $site_candidate $site_entry {{
+{"\n".join(site_entries) if site_entries else "    # (none)"}
+
+    default "";
+}}
+
+# unknown tags resolve to no site, same as in the full mode
+map $site_entry $site_id {{
+    "" "";
+    default $site_candidate;
+}}
+
+# site_id -> canonical hostname
+map $site_entry $canonical_host {{
+    "~ (?<nocost_host>\\S+)$"    $nocost_host;
+    default "";
+}}
+
+# site_id -> service type
+map $site_entry $service_type {{
+    "~^(?<nocost_type>\\S+) "    $nocost_type;
+    default "";
+}}
+"""
+
+
+async def _apply(db: AsyncSession, apply) -> bool:
+    async with file_lock("nginx-maps"):
+        state = load_json(STATE_PATH)
+        if state is None:
+            # first run (or lost state): fall back to a full rebuild
+            return await _write(await _load_entries_from_db(db), None)
+
+        entries = state["sites"]
+        apply(entries)
+        return await _write(entries, state["hash"])
+
+
+async def _load_entries_from_db(db: AsyncSession) -> map_entries:
+    return {
+        site.tag: [site.hostname, site.site_type]
+        async for site in Site.get_all_active(db, Site.hostname.isnot(None))
+    }
+
+
+async def _write(
+    entries: map_entries, previous_hash: str | None, force: bool = False
+) -> bool:
+    sites_config, server_names_config = render_nginx_maps(entries)
+    digest = hashlib.sha256(
+        f"{sites_config}\0{server_names_config}".encode()
+    ).hexdigest()
+
+    if digest == previous_hash and not force:
+        save_json(STATE_PATH, {"hash": digest, "sites": entries})
+        return False
+
+    write_atomic(NGINX_MAP_PATH, sites_config)
+    write_atomic(CUSTOM_SERVER_NAMES_PATH, server_names_config)
+    # no hash until nginx has reloaded, so a failed reload is retried next time
+    save_json(STATE_PATH, {"hash": None, "sites": entries})
+
+    # do not run nginx -t as nocost can't read nginx conf files
+    await request_reload(NGINX)
+    save_json(STATE_PATH, {"hash": digest, "sites": entries})
+    return True
+
+
+def _is_internal_domain(hostname: str) -> bool:
+    return any(hostname.endswith(f".{domain}") for domain in VARS["allowed_domains"])
@@ -0,0 +1,102 @@
+"""
+Per-tenant object cache.
+
+WordPress and MediaWiki fall back to the database for their object cache
+(options, messages, sessions), so every page view queries MariaDB for data
+that hardly ever changes. They get a memcached instead: APCu lives in the
+PHP-FPM master's shared memory, which all pools share, so it could neither be
+limited nor accounted per tenant. Flarum's cache stays on files, core has no
+memcached store.
+
+memcached has no notion of users or per-user keyspaces, so a shared instance
+would let any tenant's PHP read, overwrite or flush everyone's keys, sessions
+included. Every tenant gets its own small instance instead
+(`memcached-tenant@<tag>`, see `helpers/object_cache.yml`), running as the
+tenant user on a socket that only the tenant and `OBJECT_CACHE_GROUP` (the
+backend, for stats) can open (`utils/memcached.py`).
+
+The socket and a key prefix `tenant_<tag>:<generation>:` are rendered into
+`etc/config.json` (`object_cache`), where the shared `wp-config.php` and
+`LocalSettings.php` pick them up. A flush bumps the generation, so it only
+needs the tenant's config, not a connection: the old keys are never read
+again and age out of the LRU.
+
+New tenants get the cache at provisioning, existing ones only when it's
+enabled explicitly (`upgrade_site --enable-object-cache`).
+"""
+
+import asyncio
+
+from database.models import Site
+from site_manager.runner import start_tenant_object_cache
+from site_manager.tenant_config import load_config, update_config
+from utils.memcached import get_stats, tenant_socket
+
+OBJECT_CACHE_TYPES = {"mediawiki", "wordpress"}
+
+
+def uses_object_cache(site_type: str) -> bool:
+    return site_type in OBJECT_CACHE_TYPES
+
+
+def cache_prefix(tag: str, generation: int = 0) -> str:
+    return f"tenant_{tag}:{generation}:"
+
+
+def object_cache_config(tag: str, generation: int = 0) -> dict:
+    """The `object_cache` entry of a tenant's config.json."""
+
+    return {
+        "backend": "memcached",
+        "servers": [str(tenant_socket(tag))],
+        "prefix": cache_prefix(tag, generation),
+        "generation": generation,
+    }
+
+
+async def flush_object_cache(site: Site) -> int | None:
+    """
+    Invalidate the site's cache by bumping its generation, returns the new
+    one. None if the site has no object cache, it isn't enabled by a flush.
+    """
+
+    config = await load_config(site)
+    if not config.get("object_cache"):
+        return None
+
+    generation = int(config["object_cache"].get("generation", 0)) + 1
+    await update_config(
+        site, {"object_cache": object_cache_config(site.tag, generation)}
+    )
+    return generation
+
+
+async def enable_object_cache(site: Site) -> int:
+    """
+    Start the site's memcached and point its config at it, returns the
+    generation (bumped if it was enabled already, which flushes it).
+    """
+
+    if not uses_object_cache(site.site_type):
+        raise ValueError(f"{site.site_type} sites have no object cache")
+
+    await asyncio.to_thread(start_tenant_object_cache, site.tag)
+    config = await load_config(site)
+    generation = (
+        int(config["object_cache"].get("generation", 0)) + 1
+        if config.get("object_cache")
+        else 0
+    )
+    await update_config(
+        site, {"object_cache": object_cache_config(site.tag, generation)}
+    )
+    return generation
+
+
+async def get_cache_stats(tag: str, timeout: float = 2.0) -> dict[str, int] | None:
+    """`stats` counters of the tenant's memcached, None if it has none running."""
+
+    socket_path = tenant_socket(tag)
+    if not socket_path.exists():
+        return None
+    return await get_stats(socket_path, timeout)
@@ -0,0 +1,324 @@
+"""
+Per-tenant PHP-FPM pool sizing.
+
+Every pool includes the same base-pool.conf, so a busy forum and a wiki
+nobody visits get identical `pm` settings. The generator sizes each pool
+from what its tenant actually does:
+
+- demand: the busiest minute in the last `POOL_SIZING_WINDOW_HOURS` of the
+  tenant's JSON access log, as average concurrency (summed `request_time` /
+  60s, Little's law), or the most busy workers seen in the pool's status
+  samples (`collect_pool_stats`) if that's higher, times `POOL_HEADROOM`
+- memory per worker: the RSS of the pool's running workers (/proc), or
+  `POOL_WORKER_MB` if none are running
+- size: tenants with many users (latest SiteStats) keep a second child for
+  crawlers and bursts even when their log is quiet
+
+Quiet pools get `pm = ondemand` (no idle workers, short idle timeout, workers
+recycled early), busy ones `pm = dynamic` with spare servers around their
+average concurrency. The sum of `max_children * worker memory` is then fit
+into `POOL_MEMORY_BUDGET_MB`, scaling the biggest pools down first; it's the
+worst case of every pool peaking at once, so the budget can be set close to
+what the host has for PHP. Hibernated pools (site_manager/hibernation.py)
+keep their ondemand limits and only count against the budget.
+
+Meant to run from cron (`size_pools`): only pools whose settings changed are
+rewritten, in one playbook run per batch and a single coalesced PHP-FPM
+reload. The last plan is kept under the state root, so woken tenants get
+their size back. A pool with neither datable log entries nor status samples
+keeps its current size, rather than being sized as if it had no traffic.
+"""
+
+import asyncio
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from os import environ
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Site
+from database.stats import get_latest_stats, get_pool_activity
+from settings import VARS
+from site_manager.runner import render_tenant_pools
+from utils.access_log import entry_time
+from utils.reload import PHP_FPM, request_reload
+from utils.state import load_json, save_json, state_path
+
+TENANTS_ROOT = Path(VARS["paths"]["tenants"]["root"])
+
+POOL_MEMORY_BUDGET_MB = int(environ.get("POOL_MEMORY_BUDGET_MB", "8192"))
+POOL_WORKER_MB = int(environ.get("POOL_WORKER_MB", "64"))
+POOL_MAX_CHILDREN = int(environ.get("POOL_MAX_CHILDREN", "16"))
+POOL_HEADROOM = float(environ.get("POOL_HEADROOM", "1.5"))
+POOL_SIZING_WINDOW_HOURS = int(environ.get("POOL_SIZING_WINDOW_HOURS", "24"))
+# pools averaging at least this many requests per minute get `pm = dynamic`
+BUSY_REQUESTS_PER_MINUTE = 30
+# sites this big get a second child even without logged traffic
+LARGE_SITE_USERS = 50
+# only the end of huge access logs is read, that's the recent part anyway
+LOG_TAIL_BYTES = 16 * 1024 * 1024
+
+PLAN_PATH = state_path("pool-sizing", "pools.json")
+
+
+def get_pool_workers(proc: Path = Path("/proc")) -> dict[str, tuple[int, int]]:
+    """{pool name: (running workers, summed RSS in KiB)}, one pass over /proc."""
+
+    pools: dict[str, tuple[int, int]] = {}
+    for pid_dir in proc.iterdir():
+        if not pid_dir.name.isdigit():
+            continue
+        try:
+            cmdline = (pid_dir / "cmdline").read_bytes()
+            if not cmdline.startswith(b"php-fpm: pool "):
+                continue
+            pool = cmdline[len(b"php-fpm: pool ") :].split(b"\0")[0].decode().strip()
+            for line in (pid_dir / "status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    workers, rss_kb = pools.get(pool, (0, 0))
+                    pools[pool] = (workers + 1, rss_kb + int(line.split()[1]))
+                    break
+        except (OSError, ValueError):
+            continue  # exited while we were looking
+    return pools
+
+
+def get_pool_sizes() -> dict[str, dict]:
+    """Last rendered plan, {tag: pm settings}."""
+    return load_json(PLAN_PATH, default={})
+
+
+def get_log_usage(tag: str, since: datetime) -> dict | None:
+    """
+    Traffic of the tenant since `since`, from its JSON access log:
+    {requests, per_minute (average), peak_concurrency, mean_concurrency}.
+    None if the log has entries but none of them can be dated.
+    """
+
+    path = TENANTS_ROOT / tag / "logs" / "access.log"
+    since_ts = since.timestamp()
+    busy_s: dict[int, float] = {}  # minute -> summed request time
+    requests = 0
+    first_ts = None
+    dated = undated = 0
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > LOG_TAIL_BYTES:
+                f.seek(size - LOG_TAIL_BYTES)
+                f.readline()  # partial line
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    time = entry_time(entry)
+                    request_time = float(entry["request_time"])
+                except (ValueError, KeyError, TypeError):
+                    time = None
+                if time is None:
+                    undated += 1
+                    continue
+                dated += 1
+                ts = time.timestamp()
+                if ts < since_ts:
+                    continue
+                first_ts = ts if first_ts is None else first_ts
+                requests += 1
+                minute = int(ts // 60)
+                busy_s[minute] = busy_s.get(minute, 0.0) + request_time
+    except OSError:
+        pass
+    if undated and not dated:
+        return None
+
+    # a log younger than the window (rotated, new tenant) only covers its own span
+    minutes = max((datetime.now().timestamp() - (first_ts or since_ts)) / 60, 1)
+    return {
+        "requests": requests,
+        "per_minute": requests / minutes,
+        "peak_concurrency": max(busy_s.values(), default=0.0) / 60,
+        "mean_concurrency": sum(busy_s.values()) / minutes / 60,
+    }
+
+
+def size_pool(usage: dict, users: int = 0) -> dict:
+    """pm settings for a pool with the given `get_log_usage` traffic, before the budget."""
+
+    floor = 2 if users >= LARGE_SITE_USERS else 1
+    max_children = min(
+        max(math.ceil(usage["peak_concurrency"] * POOL_HEADROOM), floor),
+        POOL_MAX_CHILDREN,
+    )
+
+    if usage["per_minute"] < BUSY_REQUESTS_PER_MINUTE:
+        # occasional requests: no idle workers, recycle often to keep RSS down
+        return {
+            "pm": "ondemand",
+            "max_children": max_children,
+            "max_requests": 200,
+            "idle_timeout": "10s" if usage["per_minute"] < 1 else "60s",
+        }
+
+    max_children = max(max_children, 2)
+    return _dynamic(max_children, usage["mean_concurrency"])
+
+
+def fit_budget(
+    pools: dict[str, dict],
+    worker_mb: dict[str, float],
+    budget_mb: float,
+    reserved_mb: float = 0.0,
+) -> dict[str, dict]:
+    """
+    Scale `max_children` down until all pools fit into `budget_mb`, biggest
+    pools first. Every pool keeps at least one child, even over budget.
+    """
+
+    fitted = {tag: dict(pool) for tag, pool in pools.items()}
+
+    def used() -> float:
+        return reserved_mb + sum(
+            pool["max_children"] * worker_mb[tag] for tag, pool in fitted.items()
+        )
+
+    # lower a common ceiling until the sum fits, so only the biggest pools shrink
+    ceiling = max((pool["max_children"] for pool in fitted.values()), default=1)
+    while ceiling > 1 and used() > budget_mb:
+        ceiling -= 1
+        for tag, pool in fitted.items():
+            if pool["max_children"] > ceiling:
+                if pool["pm"] == "dynamic":
+                    fitted[tag] = _dynamic(ceiling, pool["min_spare_servers"])
+                else:
+                    pool["max_children"] = ceiling
+    return fitted
+
+
+def get_usage(tag: str, since: datetime, activity: dict | None) -> dict | None:
+    """
+    `get_log_usage`, with the peak raised to the busiest workers seen in the
+    pool's status samples (`get_pool_activity` entry). Only the samples if the
+    log can't be dated, None without either.
+    """
+
+    usage = get_log_usage(tag, since)
+    if activity is None:
+        return usage
+    if usage is None:
+        # no request times without the log, spare servers stay at the minimum
+        return {
+            "requests": activity["requests"],
+            "per_minute": activity["requests_per_min"],
+            "peak_concurrency": float(activity["peak_active"]),
+            "mean_concurrency": 0.0,
+        }
+    usage["peak_concurrency"] = max(
+        usage["peak_concurrency"], float(activity["peak_active"])
+    )
+    return usage
+
+
+def plan_pools(
+    sites: list[Site],
+    users: dict[str, int],
+    workers: dict[str, tuple[int, int]],
+    now: datetime,
+    budget_mb: float = POOL_MEMORY_BUDGET_MB,
+    hibernated_children: int = 2,
+    activity: dict[str, dict] | None = None,
+    previous: dict[str, dict] | None = None,
+) -> dict[str, dict]:
+    """
+    {tag: pm settings} for the not hibernated `sites`, hibernated ones only
+    reserve `hibernated_children` workers of the budget. Sites without usage
+    (`get_usage`) are left out of the plan and reserve their `previous` size.
+    """
+
+    since = now - timedelta(hours=POOL_SIZING_WINDOW_HOURS)
+    pools: dict[str, dict] = {}
+    worker_mb: dict[str, float] = {}
+    reserved_mb = 0.0
+    for site in sites:
+        running, rss_kb = workers.get(site.tag, (0, 0))
+        worker_mb[site.tag] = rss_kb / running / 1024 if running else POOL_WORKER_MB
+        if site.is_hibernated():
+            reserved_mb += hibernated_children * worker_mb[site.tag]
+            continue
+        usage = get_usage(site.tag, since, (activity or {}).get(site.tag))
+        if usage is None:
+            pool = (previous or {}).get(site.tag, {})
+            reserved_mb += (
+                pool.get("max_children", max(running, 1)) * worker_mb[site.tag]
+            )
+            continue
+        pools[site.tag] = size_pool(usage, users.get(site.tag, 0))
+
+    return fit_budget(pools, worker_mb, budget_mb, reserved_mb=reserved_mb)
+
+
+async def apply_pool_sizes(
+    db: AsyncSession,
+    budget_mb: float = POOL_MEMORY_BUDGET_MB,
+    hibernated_children: int = 2,
+    batch_size: int = 500,
+    dry_run: bool = False,
+) -> dict[str, dict]:
+    """Plan all pools and rewrite the changed ones. Returns {tag: settings} of the changed pools."""
+
+    sites = [site async for site in Site.get_all_active(db) if site.is_installed()]
+    users = {
+        tag: stats.user_count
+        for tag, stats in (
+            await get_latest_stats(db, Site.removed_at.is_(None))
+        ).items()
+    }
+    activity = await get_pool_activity(
+        db, Site.removed_at.is_(None), hours=POOL_SIZING_WINDOW_HOURS
+    )
+    workers = await asyncio.to_thread(get_pool_workers)
+    previous = get_pool_sizes()
+    plan = plan_pools(
+        sites,
+        users,
+        workers,
+        datetime.now(),
+        budget_mb=budget_mb,
+        hibernated_children=hibernated_children,
+        activity=activity,
+        previous=previous,
+    )
+
+    changed = {tag: pool for tag, pool in plan.items() if previous.get(tag) != pool}
+    if dry_run:
+        return changed
+
+    tags = list(changed)
+    for i in range(0, len(tags), batch_size):
+        batch = {tag: changed[tag] for tag in tags[i : i + batch_size]}
+        await asyncio.to_thread(render_tenant_pools, batch)
+    if changed:
+        await request_reload(PHP_FPM)
+
+    # removed tenants drop out, hibernated and unsized ones keep their last size
+    kept_tags = {
+        site.tag for site in sites if site.is_hibernated() or site.tag not in plan
+    }
+    kept = {tag: pool for tag, pool in previous.items() if tag in kept_tags}
+    save_json(PLAN_PATH, {**kept, **plan})
+    return changed
+
+
+def _dynamic(max_children: int, mean_concurrency: float) -> dict:
+    min_spare = min(max(math.ceil(mean_concurrency), 1), max_children)
+    max_spare = min(max(min_spare + 1, max_children // 2), max_children)
+    return {
+        "pm": "dynamic",
+        "max_children": max_children,
+        # busy workers are warm, recycling them costs more than the leaks
+        "max_requests": 1000,
+        "start_servers": min_spare,
+        "min_spare_servers": min_spare,
+        "max_spare_servers": max_spare,
+    }
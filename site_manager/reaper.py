@@ -0,0 +1,109 @@
+"""
+Batched removal of soft-deleted tenants.
+
+Removing a site only marks the row (`removed_at`); the reaper later removes
+the tenant's resources for every pending site with bounded parallelism, then
+does a single nginx map rewrite and PHP-FPM reload for the whole batch.
+Completion (or the last error) is recorded per tenant, failed sites are
+retried by the next run.
+"""
+
+import asyncio
+from datetime import datetime
+from os import environ
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Site
+from database.session import async_session_factory
+from site_manager import remove_site
+from site_manager.nginx_maps import remove_from_nginx_maps
+from utils.mounts import MountIndex
+from utils.reload import PHP_FPM, request_reload
+from utils.state import file_lock
+
+REAPER_CONCURRENCY = int(environ.get("REAPER_CONCURRENCY", "4"))
+REAPER_BATCH_SIZE = int(environ.get("REAPER_BATCH_SIZE", "50"))
+
+
+async def get_pending_sites(
+    db: AsyncSession, *tags: str, limit: int = REAPER_BATCH_SIZE
+) -> list[Site]:
+    """Removed sites whose resources still exist, oldest removal first."""
+
+    filters = [Site.removed_at.is_not(None), Site.purged_at.is_(None)]
+    if tags:
+        filters.append(Site.tag.in_(tags))
+
+    result = await db.execute(
+        select(Site).where(*filters).order_by(Site.removed_at).limit(limit)
+    )
+    return list(result.scalars())
+
+
+async def reap_sites(
+    db: AsyncSession,
+    *tags: str,
+    limit: int = REAPER_BATCH_SIZE,
+    concurrency: int = REAPER_CONCURRENCY,
+) -> dict[str, str | None]:
+    """
+    Purge pending sites (optionally only `tags`), at most `limit` of them.
+
+    Returns {tag: error}, error is None for purged sites.
+    """
+
+    # one reaper at a time, concurrent triggers just wait and find less work
+    async with file_lock("reaper"):
+        sites = await get_pending_sites(db, *tags, limit=limit)
+        if not sites:
+            return {}
+
+        # one mount table scan for the whole batch instead of one per tenant
+        mount_index = MountIndex.load()
+        semaphore = asyncio.Semaphore(concurrency)
+        commit_lock = asyncio.Lock()
+        results: dict[str, str | None] = {}
+
+        async def reap(site: Site) -> None:
+            error = None
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(
+                        remove_site,
+                        site,
+                        skip_backup=site.purge_skip_backup,
+                        send_email=site.purge_notify,
+                        reason=site.removal_reason,
+                        reload=False,
+                        mounts=mount_index.get(site.tag),
+                    )
+                except Exception as e:
+                    error = str(e)[:255]
+
+            results[site.tag] = error
+            # the session isn't safe for concurrent use (changes made during
+            # another task's flush are lost), so mark tenants one by one
+            async with commit_lock:
+                if error is None:
+                    site.purged_at = datetime.now()
+                site.purge_error = error
+                await db.commit()
+
+        await asyncio.gather(*(reap(site) for site in sites))
+
+        purged = [tag for tag, error in results.items() if error is None]
+        if purged:
+            # nginx is reloaded by the map update (if anything changed)
+            await remove_from_nginx_maps(db, *purged)
+            await request_reload(PHP_FPM)
+
+        return results
+
+
+async def reap_sites_in_background(*tags: str) -> None:
+    """Entry point for API background tasks, which can't reuse the request's session."""
+
+    async with async_session_factory() as db:
+        await reap_sites(db, *tags)
@@ -0,0 +1,102 @@
+"""
+Versioned skeleton releases.
+
+A release is an immutable copy of skeleton_root/<type> (the staging tree that
+prepare_skeleton works on) under skeleton_root/releases/<type>/<release>,
+named after its manifest version. Tenants on a release reach it through a
+per-tenant pointer symlink (skeleton_root/pointers/<tag>) that their bind
+mounts and hardlinks go through, so switching a tenant - or rolling it back -
+is a pointer swap plus remount instead of a re-copy. The `current` link
+of a site type is the release new tenants are provisioned on.
+
+Sites without a release (`Site.skeleton_release` is None) still use the
+legacy layout straight from skeleton_root/<type>.
+"""
+
+import asyncio
+
+from ansible_runner import Runner
+
+from database.models import Site
+from site_manager.runner import switch_tenant_release
+from site_manager.skeleton import (
+    RELEASES_ROOT,
+    SKELETON_ROOT,
+    get_current_manifest,
+    release_dir,
+)
+from utils.cmd import run_cmd
+from utils.reload import PHP_FPM, request_reload
+
+
+def list_releases(site_type: str) -> list[str]:
+    """Releases of `site_type`, oldest first."""
+
+    root = RELEASES_ROOT / site_type
+    if not root.is_dir():
+        return []
+    releases = [p for p in root.iterdir() if p.is_dir() and not p.is_symlink()]
+    releases = [p for p in releases if not p.name.startswith(".")]
+    return [p.name for p in sorted(releases, key=lambda p: p.stat().st_mtime)]
+
+
+def get_default_release(site_type: str) -> str | None:
+    """Release new tenants of `site_type` are provisioned on (None: legacy layout)."""
+
+    current = RELEASES_ROOT / site_type / "current"
+    return current.readlink().name if current.is_symlink() else None
+
+
+async def create_release(site_type: str) -> str:
+    """Snapshot the current skeleton as a release (no-op if it already exists)."""
+
+    release = get_current_manifest(site_type)["version"][:12]
+    dest = release_dir(site_type, release)
+    if dest.exists():
+        return release
+
+    # copy next to the final path and rename, a half-copied release is never visible
+    tmp = dest.with_name(f".{release}.tmp")
+    await run_cmd(f"sudo mkdir -p {dest.parent}")
+    await run_cmd(f"sudo rm -rf {tmp}")
+    await run_cmd(f"sudo cp -a --reflink=auto {SKELETON_ROOT / site_type} {tmp}")
+    await run_cmd(f"sudo mv -T {tmp} {dest}")
+    return release
+
+
+async def promote_release(site_type: str, release: str) -> None:
+    """Make `release` the default for newly provisioned tenants."""
+
+    if not release_dir(site_type, release).is_dir():
+        raise ValueError(f"Release {release} of {site_type} does not exist")
+
+    current = RELEASES_ROOT / site_type / "current"
+    await run_cmd(f"sudo ln -sfn {release} {current}.tmp")
+    await run_cmd(f"sudo mv -T {current}.tmp {current}")
+
+
+async def switch_release(sites: list[Site], release: str) -> Runner:
+    """
+    Switch a batch of sites (same type) to `release` and reload PHP-FPM once.
+
+    Updates `Site.skeleton_release` and clears `Site.upgrade_fingerprint`, the
+    new code still has to migrate the database; the caller commits.
+    """
+
+    site_types = {site.site_type for site in sites}
+    if len(site_types) != 1:
+        raise ValueError("Sites of a release switch batch must share one site type")
+    site_type = site_types.pop()
+    if not release_dir(site_type, release).is_dir():
+        raise ValueError(f"Release {release} of {site_type} does not exist")
+
+    runner = await asyncio.to_thread(
+        switch_tenant_release, [site.tag for site in sites], site_type, release
+    )
+    # opcache keys on paths, which don't change with the release
+    await request_reload(PHP_FPM)
+
+    for site in sites:
+        site.skeleton_release = release
+        site.upgrade_fingerprint = None
+    return runner
@@ -0,0 +1,226 @@
+"""
+Rolling fleet upgrades.
+
+Sites are upgraded in parallel with a concurrency limit per site type. A
+canary batch (the first few sites of every type) has to succeed before the
+rest of the fleet is touched, and no new upgrades are started once the error
+rate crosses a threshold. Every finished tenant is appended to a JSONL log
+under the state root, so an interrupted rollout can be resumed without
+re-upgrading sites that already succeeded. Sites already at the current
+skeleton fingerprint (and manifest, when syncing files) are skipped unless
+forced.
+"""
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from os import environ
+from statistics import median, quantiles
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Site
+from site_manager import upgrade_site
+from site_manager.skeleton import mark_upgraded, needs_sync, needs_upgrade
+from utils.state import state_path
+
+DEFAULT_CONCURRENCY = int(environ.get("UPGRADE_CONCURRENCY", "4"))
+CANARY_SIZE = int(environ.get("UPGRADE_CANARY_SIZE", "3"))
+MAX_ERROR_RATE = float(environ.get("UPGRADE_MAX_ERROR_RATE", "0.05"))
+# don't judge the error rate on a handful of results
+MIN_SAMPLES = int(environ.get("UPGRADE_MIN_SAMPLES", "20"))
+
+LOG_PATH = state_path("upgrade", "rollout.jsonl")
+
+
+class RolloutAborted(Exception):
+    pass
+
+
+class Rollout:
+    """A single (possibly resumed) rolling upgrade run."""
+
+    def __init__(
+        self,
+        sites: list[Site],
+        sync_files: bool = False,
+        concurrency: dict[str, int] | None = None,
+        canary_size: int = CANARY_SIZE,
+        max_error_rate: float = MAX_ERROR_RATE,
+        min_samples: int = MIN_SAMPLES,
+        resume: bool = False,
+        force: bool = False,
+        db: AsyncSession | None = None,
+    ):
+        self.db = db
+        self.sync_files = sync_files
+        self.force = force
+        self.concurrency = concurrency or {}
+        self.canary_size = canary_size
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+
+        self.done: set[str] = set()
+        if resume:
+            self.done = {tag for tag, ok in _read_log().items() if ok}
+        else:
+            LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            LOG_PATH.write_text("")
+
+        pending = [site for site in sites if site.tag not in self.done]
+        self.skipped = len(sites) - len(pending)
+        # only sites with actual work, so canaries aren't no-ops
+        self.sites = [site for site in pending if self._has_work(site)]
+        self.current = len(pending) - len(self.sites)
+        self.timings: dict[str, list[float]] = defaultdict(list)
+        self.failed: dict[str, str] = {}
+        self.stopped: str | None = None
+        self._commit_lock = asyncio.Lock()
+
+        self._semaphores = {
+            site_type: asyncio.Semaphore(
+                self.concurrency.get(site_type, DEFAULT_CONCURRENCY)
+            )
+            for site_type in {site.site_type for site in self.sites}
+        }
+
+    @property
+    def completed(self) -> int:
+        return sum(len(t) for t in self.timings.values()) + len(self.failed)
+
+    async def run(self) -> None:
+        """Upgrade canaries, then the rest. Raises `RolloutAborted` on a stop condition."""
+
+        canaries, rest = self._split_canaries()
+
+        if canaries:
+            print(f"canary batch: {', '.join(site.tag for site in canaries)}")
+            await self._run_batch(canaries)
+            if self.failed:
+                raise RolloutAborted(
+                    f"{len(self.failed)} canary sites failed, not touching the rest"
+                )
+
+        await self._run_batch(rest)
+        if self.stopped:
+            raise RolloutAborted(self.stopped)
+
+    def print_summary(self) -> None:
+        ok = sum(len(t) for t in self.timings.values())
+        print(
+            f"\n{ok} upgraded, {len(self.failed)} failed, "
+            f"{len(self.sites) - self.completed} not started, "
+            f"{self.current} already current, "
+            f"{self.skipped} skipped (already upgraded in a previous run)"
+        )
+        for site_type, timings in sorted(self.timings.items()):
+            p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(
+                f"  {site_type}: {len(timings)} sites, "
+                f"median {median(timings):.1f}s, p95 {p95:.1f}s, max {max(timings):.1f}s"
+            )
+        for tag, error in self.failed.items():
+            print(f"  failed {tag}: {error.splitlines()[0] if error else ''}")
+
+    def _has_work(self, site: Site) -> bool:
+        if self.force:
+            return True
+        return needs_upgrade(site) or (self.sync_files and needs_sync(site))
+
+    def _split_canaries(self) -> tuple[list[Site], list[Site]]:
+        by_type: dict[str, list[Site]] = defaultdict(list)
+        for site in self.sites:
+            by_type[site.site_type].append(site)
+
+        canaries: list[Site] = []
+        for sites in by_type.values():
+            # prefer non-donor sites, a broken canary should hurt as few people as possible
+            sites.sort(key=lambda site: (site.is_donor(), site.tag))
+            canaries.extend(sites[: self.canary_size])
+
+        canary_tags = {site.tag for site in canaries}
+        return canaries, [site for site in self.sites if site.tag not in canary_tags]
+
+    async def _run_batch(self, sites: list[Site]) -> None:
+        await asyncio.gather(*(self._upgrade(site) for site in sites))
+
+    async def _upgrade(self, site: Site) -> None:
+        async with self._semaphores[site.site_type]:
+            if self.stopped:
+                return
+
+            started = time.perf_counter()
+            error = None
+            try:
+                await upgrade_site(
+                    site,
+                    sync_files=self.sync_files,
+                    migrate=self.force or needs_upgrade(site),
+                    full_sync=self.force,
+                )
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            seconds = time.perf_counter() - started
+
+            _append_log(site.tag, error is None, seconds, error)
+            if error is None:
+                await self._mark_upgraded(site)
+                self.timings[site.site_type].append(seconds)
+                print(f"ok {site.tag} ({site.site_type}) in {seconds:.1f}s")
+            else:
+                self.failed[site.tag] = error
+                print(
+                    f"FAIL {site.tag} ({site.site_type}) after {seconds:.1f}s: {error}"
+                )
+                self._check_error_rate()
+
+    async def _mark_upgraded(self, site: Site) -> None:
+        # the session isn't safe for concurrent use, commit tenants one by one
+        async with self._commit_lock:
+            mark_upgraded(site, synced_files=self.sync_files)
+            if self.db is not None:
+                await self.db.commit()
+
+    def _check_error_rate(self) -> None:
+        completed = self.completed
+        if completed < self.min_samples:
+            return
+
+        rate = len(self.failed) / completed
+        if rate > self.max_error_rate and not self.stopped:
+            self.stopped = (
+                f"error rate {rate:.1%} over {completed} sites exceeds "
+                f"{self.max_error_rate:.1%}, stopped starting new upgrades"
+            )
+            print(self.stopped)
+
+
+def _append_log(tag: str, ok: bool, seconds: float, error: str | None) -> None:
+    entry = {
+        "tag": tag,
+        "ok": ok,
+        "seconds": round(seconds, 2),
+        "error": error,
+        "at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(LOG_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def _read_log() -> dict[str, bool]:
+    """{tag: ok} of the last outcome of every tenant in the current rollout log."""
+
+    outcomes: dict[str, bool] = {}
+    try:
+        with open(LOG_PATH) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line of an interrupted run
+                outcomes[entry["tag"]] = entry["ok"]
+    except FileNotFoundError:
+        pass
+    return outcomes
@@ -2,18 +2,30 @@
 Lower-level Ansible wrapper for tenant lifecycle management.
 """
 
+import logging
+import subprocess
+import sys
 from os import environ
 from pathlib import Path
-from tempfile import mkdtemp
+from tempfile import NamedTemporaryFile, mkdtemp
 from typing import Any
 
 from ansible_runner import Runner, RunnerConfig
 
 from settings import VARS
+from site_manager.templates import TEMPLATES_GROUP
+from utils.cgroups import FPM_CGROUP_ROOT
+from utils.memcached import OBJECT_CACHE_GROUP, OBJECT_CACHE_MB, SOCKET_ROOT
+from utils.reload import NGINX, PHP_FPM, reload_services
 
 ANSIBLE_ROOT = Path(__file__).parent.parent / "ansible"
 ANSIBLE_TIMEOUT = int(environ.get("ANSIBLE_TIMEOUT", "900"))  # 15m
 
+# bind: one read-only bind mount per shared dir (vars/<type>_files.yml mount_paths)
+# overlay: a single overlay mount per tenant over the shared tree (overlay_root),
+# only for tenants provisioned on a skeleton release
+MOUNT_LAYOUT = environ.get("TENANT_MOUNT_LAYOUT", "bind")
+
 
 def run_playbook(
     playbook_path: str,
@@ -55,21 +67,56 @@ def provision_tenant(
     reset_token: str,
     force: bool = False,
     send_email: bool = True,
+    reload: bool = True,
+    release: str | None = None,
+    template: Path | None = None,
+    cgroup_limits: dict[str, str] | None = None,
+    object_cache: dict | None = None,
 ) -> Runner:
-    """Provision a new tenant using Ansible."""
+    """
+    Provision a new tenant using Ansible, on skeleton `release` if given,
+    snapshotting its files from a prepared `template` if given, with its
+    PHP-FPM workers in a cgroup limited by `cgroup_limits` if given and its
+    own memcached, with the `object_cache` entry rendered into its config, if given.
 
-    return run_playbook(
+    Services are reloaded through the reload coordinator afterwards, unless
+    `reload` is False (batch callers reload once at the end).
+    """
+
+    extravars: dict[str, Any] = {
+        "tenant_tag": tenant_tag,
+        "tenant_hostname": hostname,
+        "service_type": service_type,
+        "tenant_admin_email": admin_email,
+        "tenant_reset_token": reset_token,
+        "force": force,
+        "defer_reload": True,
+    }
+    if release:
+        extravars["skeleton_release"] = release
+        extravars["mount_layout"] = MOUNT_LAYOUT
+    if template:
+        extravars["skeleton_template"] = str(template)
+        extravars["templates_group"] = TEMPLATES_GROUP
+    if cgroup_limits:
+        extravars["fpm_cgroup_root"] = str(FPM_CGROUP_ROOT)
+        extravars["cgroup_limits"] = cgroup_limits
+    if object_cache:
+        extravars["object_cache"] = object_cache
+        extravars.update(_object_cache_vars())
+
+    runner = run_playbook(
         "provision_main.yml",
         tags="send-email" if send_email else None,
-        extravars={
-            "tenant_tag": tenant_tag,
-            "tenant_hostname": hostname,
-            "service_type": service_type,
-            "tenant_admin_email": admin_email,
-            "tenant_reset_token": reset_token,
-            "force": force,
-        },
+        extravars=extravars,
     )
+    if reload:
+        try:
+            reload_services(PHP_FPM, NGINX)
+        except subprocess.CalledProcessError as e:
+            # the tenant is provisioned, a failed reload is picked up by the next one
+            logging.warning(f"reload after provisioning {tenant_tag} failed: {e}")
+    return runner
 
 
 def remove_tenant(
@@ -80,21 +127,42 @@ def remove_tenant(
     admin_email: str | None = None,
     hostname: str | None = None,
     reason: str | None = None,
+    reload: bool = True,
+    mounts: list[str] | None = None,
+    backup_filters: dict[str, str] | None = None,
 ) -> Runner:
-    """Remove a tenant using Ansible."""
+    """
+    Remove a tenant using Ansible (see `provision_tenant` for `reload`).
 
-    return run_playbook(
-        "backup_main.yml",
-        extravars={
-            "tenant_tag": tenant_tag,
-            "service_type": service_type,
-            "skip_backup": skip_backup,
-            "send_email": send_email,
-            "tenant_admin_email": admin_email or "",
-            "tenant_hostname": hostname or "",
-            "removal_reason": reason or "",
-        },
-    )
+    `mounts` are the tenant's mount points from a `utils.mounts.MountIndex`,
+    the playbook scans the mount table itself if not given. `backup_filters`
+    are the site type's precomputed backup excludes
+    (`site_manager.backup_filters`), discovered from the tenant tree if not given.
+    """
+
+    extravars: dict[str, Any] = {
+        "tenant_tag": tenant_tag,
+        "service_type": service_type,
+        "skip_backup": skip_backup,
+        "send_email": send_email,
+        "tenant_admin_email": admin_email or "",
+        "tenant_hostname": hostname or "",
+        "removal_reason": reason or "",
+        "defer_reload": True,
+    }
+    if mounts is not None:
+        extravars["tenant_mounts"] = mounts
+    if backup_filters is not None:
+        extravars["backup_filters"] = backup_filters
+
+    runner = run_playbook("backup_main.yml", extravars=extravars)
+    if reload:
+        try:
+            reload_services(PHP_FPM, NGINX)
+        except subprocess.CalledProcessError as e:
+            # the tenant is removed, a failed reload is picked up by the next one
+            logging.warning(f"reload after removing {tenant_tag} failed: {e}")
+    return runner
 
 
 def backup_tenant(
@@ -105,8 +173,10 @@ def backup_tenant(
     additional_excludes: list[str] = [],
     backup_dir: str | None = None,
     include_readme: bool = False,
+    mounts: list[str] | None = None,
+    backup_filters: dict[str, str] | None = None,
 ) -> Runner:
-    """Backup a tenant using Ansible."""
+    """Backup a tenant using Ansible (see `remove_tenant` for `mounts` and `backup_filters`)."""
 
     extravars: dict[str, Any] = {
         "tenant_tag": tenant_tag,
@@ -118,6 +188,10 @@ def backup_tenant(
     }
     if backup_dir:
         extravars["backup_dir_override"] = backup_dir
+    if mounts is not None:
+        extravars["tenant_mounts"] = mounts
+    if backup_filters is not None:
+        extravars["backup_filters"] = backup_filters
 
     return run_playbook(
         "backup_main.yml",
@@ -126,6 +200,15 @@ def backup_tenant(
     )
 
 
+def render_tenant_pools(pool_sizes: dict[str, dict]) -> Runner:
+    """Rewrite the PHP-FPM pools of `{tag: pm settings}`, the caller reloads PHP-FPM."""
+
+    return run_playbook(
+        "pools_main.yml",
+        extravars={"tenant_tags": list(pool_sizes), "pool_sizes": pool_sizes},
+    )
+
+
 def restore_tenant(
     tenant_tag: str,
     service_type: str,
@@ -148,15 +231,99 @@ def restore_tenant(
     )
 
 
+def set_tenant_pools_hibernated(
+    tenant_tags: list[str],
+    hibernated: bool,
+    max_children: int = 2,
+    idle_timeout: str = "10s",
+    pool_sizes: dict[str, dict] | None = None,
+) -> Runner:
+    """
+    Rewrite the PHP-FPM pools of a batch of tenants, the caller reloads PHP-FPM.
+    Woken pools get their `pool_sizes` entry back, if they have one.
+    """
+
+    return run_playbook(
+        "pools_main.yml",
+        extravars={
+            "tenant_tags": tenant_tags,
+            "tenant_hibernated": hibernated,
+            "hibernate_max_children": str(max_children),
+            "hibernate_idle_timeout": idle_timeout,
+            "pool_sizes": pool_sizes or {},
+        },
+    )
+
+
 def sync_tenant_files(
     tenant_tag: str,
     service_type: str,
+    changed_paths: list[str] | None = None,
+    release: str | None = None,
+) -> Runner:
+    """Resync tenant files from the skeleton (or its `release`), only `changed_paths` if given."""
+
+    extravars: dict[str, Any] = {
+        "tenant_tag": tenant_tag,
+        "service_type": service_type,
+    }
+    if release:
+        extravars["skeleton_release"] = release
+    if changed_paths is None:
+        return run_playbook("sync_files_main.yml", extravars=extravars)
+
+    with NamedTemporaryFile("w", prefix="sync-files-", suffix=".txt") as f:
+        f.write("\n".join(changed_paths) + "\n")
+        f.flush()
+        extravars["sync_files_from"] = f.name
+        extravars["sync_usr_lib"] = any(p.startswith("usr/lib/") for p in changed_paths)
+        return run_playbook("sync_files_main.yml", extravars=extravars)
+
+
+def switch_tenant_release(
+    tenant_tags: list[str],
+    service_type: str,
+    release: str,
 ) -> Runner:
+    """Point a batch of tenants at another skeleton release (reload PHP-FPM afterwards)."""
+
     return run_playbook(
-        "sync_files_main.yml",
+        "switch_release_main.yml",
         extravars={
-            "tenant_tag": tenant_tag,
+            "tenant_tags": tenant_tags,
             "service_type": service_type,
+            "skeleton_release": release,
+        },
+    )
+
+
+def _object_cache_vars() -> dict[str, str]:
+    return {
+        "object_cache_root": str(SOCKET_ROOT),
+        "object_cache_mb": str(OBJECT_CACHE_MB),
+        "object_cache_group": OBJECT_CACHE_GROUP,
+    }
+
+
+def start_tenant_object_cache(tenant_tag: str) -> Runner:
+    """Start (and enable) the tenant's own memcached, the caller updates its config."""
+
+    return run_playbook(
+        "object_cache_main.yml",
+        extravars={"tenant_tag": tenant_tag, **_object_cache_vars()},
+    )
+
+
+def install_cgroup_watcher(watch_interval: float) -> Runner:
+    """Install the php-fpm cgroup delegation and the `sync_cgroups --watch` service."""
+
+    return run_playbook(
+        "cgroups_main.yml",
+        extravars={
+            "php_fpm_service": PHP_FPM,
+            "backend_root": str(ANSIBLE_ROOT.parent),
+            "sync_cgroups_exec": f"{sys.executable} -m cli.sync_cgroups",
+            "cgroup_watch_interval": str(watch_interval),
         },
     )
 
@@ -0,0 +1,218 @@
+"""
+Backend-driven periodic tasks of the tenant applications.
+
+Left alone, WordPress runs wp-cron and MediaWiki runs its job queue as part of
+page views: real visitors pay for it, and idle sites never get their scheduled
+posts published or their jobs run. Tenant configs set
+`run_jobs_on_requests: false` (the shared `wp-config.php` and
+`LocalSettings.php` map it to `DISABLE_WP_CRON` / `$wgJobRunRate = 0`) and
+this module runs the work instead, through `run_cmd_as_tenant`:
+
+- WordPress: `wp cron event run --due-now`
+- MediaWiki: `maintenance/run.php runJobs`, bounded in jobs and time
+- Flarum: `php flarum schedule:run`
+
+Tenants without pending work are skipped without booting PHP: a root query
+reads the earliest event of WordPress' `cron` option and whether MediaWiki's
+`job` table has runnable jobs. Flarum's scheduler has no such state, its
+tasks are cron expressions evaluated at the time of the call, so Flarum
+tenants run every `FLARUM_SCHEDULE_EVERY_MIN` minutes (hourly and daily tasks
+fall on minute 0) and go first, before load waits can push them past the
+minute.
+
+Runs go through a `utils.throttle.Throttle`, which caps how many tenants run
+at once across the fleet, and least recently run tenants go first when a run
+is capped. Every run is appended to a JSONL log under the state root.
+"""
+
+import asyncio
+import json
+import re
+import time
+from datetime import datetime
+from os import environ
+from pathlib import Path
+
+import aiomysql
+
+from database.models import Site
+from settings import VARS
+from utils.cmd import run_cmd_as_tenant
+from utils.state import load_json, save_json, state_path
+from utils.throttle import Throttle
+
+TENANTS_ROOT = Path(VARS["paths"]["tenants"]["root"])
+
+SCHEDULER_CONCURRENCY = int(environ.get("SCHEDULER_CONCURRENCY", "2"))
+# this is the sites' own work, so it tolerates a busier host than maintenance does
+SCHEDULER_MAX_LOAD = float(environ.get("SCHEDULER_MAX_LOAD", "1.5"))
+SCHEDULER_TIMEOUT_S = int(environ.get("SCHEDULER_TIMEOUT_S", "300"))
+FLARUM_SCHEDULE_EVERY_MIN = int(environ.get("FLARUM_SCHEDULE_EVERY_MIN", "60"))
+MEDIAWIKI_MAX_JOBS = int(environ.get("MEDIAWIKI_MAX_JOBS", "200"))
+MEDIAWIKI_MAX_TIME_S = int(environ.get("MEDIAWIKI_MAX_TIME_S", "60"))
+# $wgJobBackoffThrottling aside, MediaWiki gives up on a job after this many attempts
+MEDIAWIKI_JOB_MAX_TRIES = 3
+WP_TABLE_PREFIX = environ.get("WP_TABLE_PREFIX", "wp_")
+
+LOG_PATH = state_path("scheduler", "log.jsonl")
+# {tag: last successful run (iso)}
+LAST_RUN_PATH = state_path("scheduler", "last_run.json")
+
+# (directory under the tenant root, command)
+TASKS = {
+    "flarum": ("app", "php flarum schedule:run"),
+    "mediawiki": (
+        "public",
+        "php maintenance/run.php runJobs"
+        f" --maxjobs {MEDIAWIKI_MAX_JOBS} --maxtime {MEDIAWIKI_MAX_TIME_S}",
+    ),
+    "wordpress": ("public", "wp cron event run --due-now"),
+}
+
+WP_CRON_QUERY = (
+    "SELECT option_value FROM `{schema}`.`{prefix}options` WHERE option_name = 'cron'"
+)
+MW_JOBS_QUERY = "SELECT 1 FROM `{schema}`.`job` WHERE job_attempts < %s LIMIT 1"
+
+# top-level keys of the serialized cron array are the events' unix timestamps
+_WP_CRON_TIMESTAMP = re.compile(r"i:(\d{9,});a:")
+
+
+def next_wp_cron(cron_option: str) -> int | None:
+    """Earliest event timestamp in WordPress' serialized `cron` option."""
+
+    timestamps = [int(ts) for ts in _WP_CRON_TIMESTAMP.findall(cron_option)]
+    return min(timestamps, default=None)
+
+
+def flarum_due(now: datetime, every_min: int = FLARUM_SCHEDULE_EVERY_MIN) -> bool:
+    return (now.hour * 60 + now.minute) % every_min == 0
+
+
+async def query_pending(
+    pool: aiomysql.Pool, sites: list[Site], now: datetime
+) -> set[str]:
+    """Tags of the `sites` with work to do right now."""
+
+    pending = set()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for site in sites:
+                schema = f"tenant_{site.tag}"
+                try:
+                    match site.site_type:
+                        case "wordpress":
+                            await cur.execute(
+                                WP_CRON_QUERY.format(
+                                    schema=schema, prefix=WP_TABLE_PREFIX
+                                )
+                            )
+                            row = await cur.fetchone()
+                            next_run = next_wp_cron(row[0]) if row else None
+                            is_pending = (
+                                next_run is not None and next_run <= now.timestamp()
+                            )
+                        case "mediawiki":
+                            await cur.execute(
+                                MW_JOBS_QUERY.format(schema=schema),
+                                (MEDIAWIKI_JOB_MAX_TRIES,),
+                            )
+                            is_pending = await cur.fetchone() is not None
+                        case "flarum":
+                            is_pending = flarum_due(now)
+                        case _:
+                            is_pending = False
+                except aiomysql.Error:
+                    # unexpected schema (custom table prefix, missing table), let the app decide
+                    is_pending = True
+                if is_pending:
+                    pending.add(site.tag)
+    return pending
+
+
+def plan_runs(
+    sites: list[Site],
+    pending: set[str],
+    last_run: dict[str, str] | None = None,
+    limit: int | None = None,
+) -> list[Site]:
+    """
+    Sites with pending work, Flarum first (its tasks are only due this very
+    minute), then least recently run first. `last_run` defaults to the stored state.
+    """
+
+    if last_run is None:
+        last_run = load_json(LAST_RUN_PATH, default={})
+    planned = [site for site in sites if site.tag in pending]
+    planned.sort(
+        key=lambda site: (site.site_type != "flarum", last_run.get(site.tag, ""))
+    )
+    return planned[:limit]
+
+
+async def run_tasks(
+    sites: list[Site], throttle: Throttle, timeout_s: int = SCHEDULER_TIMEOUT_S
+) -> list[dict]:
+    """Run every site's periodic task under `throttle`, returns (and logs) one entry per site."""
+
+    last_run = load_json(LAST_RUN_PATH, default={})
+
+    async def run(site: Site) -> dict:
+        directory, command = TASKS[site.site_type]
+        async with throttle:
+            started = time.monotonic()
+            # killed by coreutils' timeout, so a stuck task never holds a slot forever
+            process = await run_cmd_as_tenant(
+                f"tenant_{site.tag}",
+                f"timeout --kill-after=10 {timeout_s} {command}",
+                check=False,
+                cwd=TENANTS_ROOT / site.tag / directory,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+
+        entry = {
+            "tag": site.tag,
+            "type": site.site_type,
+            "seconds": round(time.monotonic() - started, 1),
+        }
+        if process.returncode == 124:
+            entry["error"] = f"timed out after {timeout_s}s"
+        elif process.returncode != 0:
+            lines = stderr.decode(errors="replace").strip().splitlines()
+            entry["error"] = lines[-1] if lines else f"exit code {process.returncode}"
+        else:
+            last_run[site.tag] = datetime.now().isoformat(timespec="seconds")
+        _append_log(entry)
+        return entry
+
+    results = await asyncio.gather(
+        *(run(site) for site in sites), return_exceptions=True
+    )
+    save_json(LAST_RUN_PATH, last_run)
+
+    entries = []
+    for site, result in zip(sites, results):
+        if isinstance(result, Exception):
+            entry = {"tag": site.tag, "type": site.site_type, "error": str(result)}
+            _append_log(entry)
+            entries.append(entry)
+        else:
+            entries.append(result)
+    return entries
+
+
+def forget_scheduler(tag: str) -> None:
+    """Drop a removed tenant from the last run state."""
+
+    last_run = load_json(LAST_RUN_PATH, default={})
+    if last_run.pop(tag, None) is not None:
+        save_json(LAST_RUN_PATH, last_run)
+
+
+def _append_log(entry: dict) -> None:
+    entry["at"] = datetime.now().isoformat(timespec="seconds")
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
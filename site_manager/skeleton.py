@@ -0,0 +1,275 @@
+"""
+Skeleton introspection.
+
+The upgrade fingerprint of a site type is a hash over the skeleton files that
+decide whether a tenant's database/caches need an upgrade (code version and
+migration set). Tenants record the fingerprint they were last upgraded
+against, so fleet upgrades can skip tenants that are already current.
+
+The manifest of a skeleton lists every path a file sync copies into tenants
+(size, hash, hardlink source inodes) under a version id. Tenants record the
+manifest version they were last synced from; a sync then only touches the
+paths that changed since, or nothing at all. Manifests are kept under the
+state root (never inside the skeleton, which is synced into tenants).
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import cache
+from pathlib import Path
+
+import yaml
+
+from database.models import Site
+from settings import VARS
+from utils.state import load_json, save_json, state_path, write_atomic
+
+SKELETON_ROOT = Path(VARS["paths"]["tenants"]["skeleton_root"])
+RELEASES_ROOT = SKELETON_ROOT / "releases"
+FILE_VARS_ROOT = Path(__file__).parent.parent / "ansible" / "project" / "vars"
+
+# older manifests are kept to diff tenants that are a few versions behind
+MANIFEST_HISTORY = 10
+
+# globs relative to skeleton_root/<type>
+FINGERPRINT_SOURCES: dict[str, tuple[str, ...]] = {
+    "flarum": (
+        "app/composer.lock",
+        "app/vendor/*/*/migrations/*.php",
+    ),
+    "mediawiki": (
+        "app/public/composer.lock",
+        "app/public/includes/Defines.php",  # MW_VERSION
+        "app/public/sql/*.json",
+        "app/public/sql/abstractSchemaChanges/*.json",
+        "app/public/extensions/*/extension.json",
+        "app/public/skins/*/skin.json",
+    ),
+    "wordpress": ("app/public/wp-includes/version.php",),  # $wp_db_version
+}
+
+
+def release_dir(site_type: str, release: str) -> Path:
+    return RELEASES_ROOT / site_type / release
+
+
+@cache
+def get_upgrade_fingerprint(site_type: str, release: str | None = None) -> str | None:
+    """
+    Fingerprint of `release` of `site_type`, or of the staging skeleton
+    without one (computed once per process).
+
+    None if none of the sources exist, so a missing skeleton never looks current.
+    """
+
+    root = release_dir(site_type, release) if release else SKELETON_ROOT / site_type
+    digest = hashlib.sha256()
+    matched = False
+    for pattern in FINGERPRINT_SOURCES.get(site_type, ()):
+        for path in sorted(root.glob(pattern)):
+            matched = True
+            digest.update(str(path.relative_to(root)).encode() + b"\0")
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+
+    return digest.hexdigest() if matched else None
+
+
+def needs_upgrade(site: Site) -> bool:
+    # against the code the tenant actually runs
+    fingerprint = get_upgrade_fingerprint(site.site_type, site.skeleton_release)
+    return fingerprint is None or site.upgrade_fingerprint != fingerprint
+
+
+def mark_upgraded(site: Site, synced_files: bool = False) -> None:
+    """Record a successful `upgrade_site` on the model (caller commits)."""
+
+    site.upgrade_fingerprint = get_upgrade_fingerprint(
+        site.site_type, site.skeleton_release
+    )
+    site.upgraded_at = datetime.now()
+    if synced_files and site.skeleton_release is None:
+        site.synced_manifest = get_current_manifest(site.site_type)["version"]
+
+
+def load_file_vars(site_type: str) -> dict:
+    """`ansible/project/vars/<type>_files.yml` (mount/exclude/hardlink paths)."""
+    return yaml.safe_load((FILE_VARS_ROOT / f"{site_type}_files.yml").read_text())
+
+
+def build_manifest(site_type: str, previous: dict | None = None) -> dict:
+    """
+    Manifest of what a file sync copies from skeleton_root/<type>.
+
+    Hashes of files whose size and mtime match `previous` are reused, so
+    rebuilding an unchanged skeleton costs one `stat()` per file.
+    """
+
+    root = SKELETON_ROOT / site_type
+    file_vars = load_file_vars(site_type)
+    # same paths copy_structure.yml excludes from the rsync
+    skipped = {
+        *file_vars.get("mount_paths", []),
+        *file_vars.get("exclude_paths", []),
+        *file_vars.get("hardlink_paths", []),
+    }
+    hardlink_sources = [
+        *file_vars.get("hardlink_paths", []),
+        *(link["src"] for link in file_vars.get("renamed_hardlinks") or []),
+    ]
+    cached = (previous or {}).get("entries", {})
+
+    entries: dict[str, list] = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        rel_dir = os.path.relpath(dir_path, root)
+        rel_dir = "" if rel_dir == "." else f"{rel_dir}/"
+        dir_names[:] = [d for d in dir_names if f"{rel_dir}{d}" not in skipped]
+
+        for name in dir_names:
+            path = os.path.join(dir_path, name)
+            if os.path.islink(path):
+                entries[f"{rel_dir}{name}"] = ["l", os.readlink(path)]
+            else:
+                entries[f"{rel_dir}{name}"] = ["d"]
+
+        for name in file_names:
+            rel_path = f"{rel_dir}{name}"
+            if rel_path not in skipped:
+                entries[rel_path] = _file_entry(root / rel_path, cached.get(rel_path))
+
+    hardlinks = {}
+    for rel_path in hardlink_sources:
+        path = root / rel_path
+        if path.exists():
+            stat = path.stat()
+            hardlinks[rel_path] = [stat.st_size, _sha256(path), stat.st_ino]
+
+    version = hashlib.sha256(
+        json.dumps(
+            [
+                sorted((path, _versioned(entry)) for path, entry in entries.items()),
+                sorted(hardlinks.items()),
+            ]
+        ).encode()
+    ).hexdigest()
+
+    return {
+        "version": version,
+        "site_type": site_type,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "entries": entries,
+        "hardlinks": hardlinks,
+    }
+
+
+def load_manifest(site_type: str, version: str) -> dict | None:
+    return load_json(_manifest_dir(site_type) / f"{version}.json")
+
+
+def load_current_manifest(site_type: str) -> dict | None:
+    """Last stored manifest of `site_type`, without looking at the skeleton."""
+
+    current_path = _manifest_dir(site_type) / "current"
+    if not current_path.exists():
+        return None
+    return load_manifest(site_type, current_path.read_text())
+
+
+def save_manifest(manifest: dict) -> bool:
+    """Store `manifest` as the current one. Returns whether the version changed."""
+
+    manifest_dir = _manifest_dir(manifest["site_type"])
+    current_path = manifest_dir / "current"
+    changed = (
+        not current_path.exists() or current_path.read_text() != manifest["version"]
+    )
+
+    save_json(manifest_dir / f"{manifest['version']}.json", manifest)
+    write_atomic(current_path, manifest["version"])
+
+    history = sorted(
+        manifest_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True
+    )
+    for old in history[MANIFEST_HISTORY:]:
+        old.unlink(missing_ok=True)
+
+    return changed
+
+
+@cache
+def get_current_manifest(site_type: str) -> dict:
+    """Rebuild (incrementally) and store the manifest of `site_type`, once per process."""
+
+    manifest = build_manifest(site_type, load_current_manifest(site_type))
+    save_manifest(manifest)
+    return manifest
+
+
+def diff_manifests(old: dict, new: dict) -> list[str]:
+    """Paths added or changed between two manifests (removals aren't synced)."""
+
+    old_entries = old["entries"]
+    return sorted(
+        path
+        for path, entry in new["entries"].items()
+        if path not in old_entries or _versioned(old_entries[path]) != _versioned(entry)
+    )
+
+
+def get_changed_paths(site: Site) -> list[str] | None:
+    """
+    Paths to sync for `site` to catch up with the current skeleton manifest.
+
+    Empty if the tenant is up to date, None if its last synced manifest is
+    unknown (a full sync is needed).
+    """
+
+    if site.skeleton_release is not None:
+        return None  # manifests describe the staging skeleton, not releases
+
+    current = get_current_manifest(site.site_type)
+    if site.synced_manifest == current["version"]:
+        return []
+    if site.synced_manifest is None:
+        return None
+
+    old = load_manifest(site.site_type, site.synced_manifest)
+    if old is None:
+        return None
+
+    changed = diff_manifests(old, current)
+    if old["hardlinks"] != current["hardlinks"] and not changed:
+        # only hardlink sources were replaced, the sync relinks them anyway
+        changed = list(current["hardlinks"])
+    return changed
+
+
+def needs_sync(site: Site) -> bool:
+    return get_changed_paths(site) != []
+
+
+def _file_entry(path: Path, cached: list | None) -> list:
+    stat = path.lstat()
+    if path.is_symlink():
+        return ["l", os.readlink(path)]
+    if cached and cached[0] == "f" and cached[1:3] == [stat.st_size, stat.st_mtime_ns]:
+        return cached
+    return ["f", stat.st_size, stat.st_mtime_ns, _sha256(path)]
+
+
+def _versioned(entry: list) -> list:
+    # mtime alone doesn't change what a tenant gets
+    return [entry[0], entry[1], entry[3]] if entry[0] == "f" else entry
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_dir(site_type: str) -> Path:
+    return state_path("skeleton", site_type)
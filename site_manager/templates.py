@@ -0,0 +1,99 @@
+"""
+Prepared tenant file templates.
+
+A template is the part of a skeleton that provisioning copies into every
+tenant (skeleton_root/<type> minus the bind-mounted, excluded and hardlinked
+paths), staged under skeleton_root/templates/<type>/<version> and named after
+the manifest version it was built from, same as releases. Provisioning
+materializes a tenant from it with `cp --reflink=auto` running as the tenant
+user, so the copy is owned by the tenant from the start and only the handful
+of paths outside the template (mount points, root dirs) need a `chown`,
+instead of rsync plus a recursive `find -exec chown` over the whole tree.
+
+The template keeps the skeleton's modes, tenant users read it through an ACL
+for `TEMPLATES_GROUP` (which provisioning adds them to), and copy it without
+the ACL, so nothing in a tenant tree ends up readable by other tenants.
+
+Without a template for the tenant's skeleton version, provisioning falls back
+to the rsync path (see `ansible/project/helpers/copy_structure.yml`).
+"""
+
+from pathlib import Path
+
+from site_manager.skeleton import (
+    SKELETON_ROOT,
+    get_current_manifest,
+    load_current_manifest,
+    load_file_vars,
+)
+from utils.cmd import run_cmd
+
+TEMPLATES_ROOT = SKELETON_ROOT / "templates"
+
+# older templates are kept for tenants provisioned on older releases
+TEMPLATE_HISTORY = 3
+
+# supplementary group of every tenant user, with read access to the templates
+TEMPLATES_GROUP = "tenant-templates"
+
+
+def template_dir(site_type: str, version: str) -> Path:
+    return TEMPLATES_ROOT / site_type / version
+
+
+def get_template(site_type: str, release: str | None = None) -> Path | None:
+    """
+    Template to provision a `site_type` tenant on `release` (or the staging
+    skeleton) from, None if there is none for that skeleton version.
+    """
+
+    if release is None:
+        # last manifest prepare_skeleton stored, don't stat the skeleton per signup
+        manifest = load_current_manifest(site_type)
+        if manifest is None:
+            return None
+        release = manifest["version"][:12]
+
+    path = template_dir(site_type, release)
+    return path if path.is_dir() else None
+
+
+async def build_template(site_type: str) -> str:
+    """Stage the template of the current skeleton (no-op if it already exists)."""
+
+    version = get_current_manifest(site_type)["version"][:12]
+    dest = template_dir(site_type, version)
+    if dest.exists():
+        return version
+
+    file_vars = load_file_vars(site_type)
+    excludes = " ".join(
+        f"--exclude=/{path}"
+        for key in ("mount_paths", "exclude_paths", "hardlink_paths")
+        for path in file_vars.get(key) or []
+    )
+    # hardlinked into tenants by provision_main.yml, a copy would write through the links
+    excludes += " --exclude=/usr/lib"
+
+    # tenants copy it as their own user, so they need read access, but only
+    # through the ACL: the modes are the skeleton's and get copied as they are
+    tmp = dest.with_name(f".{version}.tmp")
+    await run_cmd(f"sudo groupadd -f {TEMPLATES_GROUP}")
+    await run_cmd(f"sudo mkdir -p {dest.parent}")
+    await run_cmd(f"sudo rm -rf {tmp}")
+    await run_cmd(f"sudo rsync -a {excludes} {SKELETON_ROOT / site_type}/ {tmp}/")
+    await run_cmd(f"sudo setfacl -R -m g:{TEMPLATES_GROUP}:rX {tmp}")
+    await run_cmd(f"sudo mv -T {tmp} {dest}")
+
+    await _prune_templates(site_type)
+    return version
+
+
+async def _prune_templates(site_type: str) -> None:
+    root = TEMPLATES_ROOT / site_type
+    templates = sorted(
+        (p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for path in templates[:-TEMPLATE_HISTORY]:
+        await run_cmd(f"sudo rm -rf {path}")
@@ -0,0 +1,43 @@
+from cli.cleanup_sites import _classify
+from database.models import SiteStatsLatest
+
+
+def _stats(**kwargs) -> SiteStatsLatest:
+    values = {
+        "content_count": 100,
+        "user_count": 10,
+        "assets_mb": 10.0,
+        "db_data_mb": 5.0,
+        "db_index_mb": 1.0,
+        "db_tables": 50,
+        "db_rows": 10_000,
+    }
+    values.update(kwargs)
+    return SiteStatsLatest(site_tag="test", **values)
+
+
+def test_classify_ok():
+    assert _classify(_stats()) is None
+
+
+def test_classify_inactive():
+    assert _classify(_stats(content_count=1)) == "inactive (content=1)"
+
+
+def test_classify_too_much_content():
+    assert _classify(_stats(content_count=20_000)) == "too active (content=20000)"
+
+
+def test_classify_db_size():
+    reason = _classify(_stats(db_data_mb=900.0, db_index_mb=200.0))
+    assert reason == "too active (db=1100.0MB)"
+
+
+def test_classify_db_rows():
+    reason = _classify(_stats(db_rows=6_000_000))
+    assert reason == "too active (db_rows=6000000)"
+
+
+def test_classify_missing_db_metrics():
+    # rows collected before the db metrics existed
+    assert _classify(_stats(db_data_mb=None, db_index_mb=None, db_rows=None)) is None
@@ -9,6 +9,7 @@ os.environ.setdefault("SKELETON_ROOT", "/tmp/test_skeleton")
 os.environ.setdefault("BACKUP_HOST_ROOT", "/tmp/test_backups")
 os.environ.setdefault("BACKUP_ATTIC_ROOT", "/tmp/test_backup_attic")
 os.environ.setdefault("BACKUP_SYSTEM_ROOT", "/tmp/test_backup_system")
+os.environ.setdefault("STATE_ROOT", "/tmp/test_state")
 os.environ.setdefault("JWT_SECRET", "test-jwt-secret")
 os.environ.setdefault("TURNSTILE_KEY", "test-turnstile-key")
 os.environ.setdefault("MAILTO", "test@test.local")
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from cli.collect_pool_stats import status_row
+from database.models import PoolStats, Site
+from database.stats import get_pool_activity, purge_pool_stats
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+def _sample(minutes_ago: int, uptime_s: int, accepted: int, **status) -> PoolStats:
+    return PoolStats(
+        **status_row(
+            "pool_busy",
+            {
+                "start since": uptime_s,
+                "accepted conn": accepted,
+                "max children reached": status.get("maxed", 0),
+                "slow requests": status.get("slow", 0),
+                "listen queue": 0,
+                "active processes": status.get("active", 1),
+                "idle processes": 1,
+                "max active processes": 2,
+                "processes": [
+                    {"requests": 5, "last request cpu": 40.0},
+                    {"requests": 0, "last request cpu": 0.0},  # never served
+                ],
+            },
+            NOW - timedelta(minutes=minutes_ago),
+            status.get("cache"),
+        )
+    )
+
+
+async def test_pool_activity(test_db_session):
+    db = test_db_session
+    db.add(
+        Site(
+            tag="pool_busy",
+            admin_email="pool_busy@test.local",
+            admin_password="test",
+            site_type="mediawiki",
+            hostname="pool_busy.test.local",
+        )
+    )
+    db.add_all(
+        [
+            _sample(60 * 24 * 20, 100, 1, slow=9),  # past retention and the window
+            _sample(60, 3600, 100, maxed=1, cache={"cmd_get": 100, "get_hits": 80}),
+            _sample(
+                30,
+                5400,
+                400,
+                maxed=3,
+                active=4,
+                cache={"cmd_get": 300, "get_hits": 230},
+            ),
+            # reloaded in between, counters start over (memcached restarted too)
+            _sample(0, 600, 50, maxed=1, slow=2, cache={"cmd_get": 50, "get_hits": 40}),
+        ]
+    )
+    await db.commit()
+
+    activity = await get_pool_activity(db, now=NOW)
+    assert activity["pool_busy"] == {
+        "requests": 300 + 50,
+        "max_children_reached": 2 + 1,
+        "slow_requests": 2,
+        "peak_active": 4,
+        "requests_per_min": 350 / 60,
+        "cpu_pct": 40.0,
+        # no tenant cgroups here
+        "cpu_s": 0.0,
+        "memory_high_events": 0,
+        "peak_memory_mb": 0.0,
+        "cache_gets": 200 + 50,
+        "cache_hits": 150 + 40,
+        "cache_hit_pct": 76.0,
+    }
+
+    assert await purge_pool_stats(db, today=NOW.date()) == 1
+    await db.execute(delete(PoolStats))
+    await db.execute(delete(Site).where(Site.tag == "pool_busy"))
+    await db.commit()
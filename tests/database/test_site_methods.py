@@ -39,3 +39,14 @@ def test_is_installed():
 
     site.installed_at = datetime.now()
     assert site.is_installed() is True
+
+
+def test_is_pending_purge():
+    site = Site(tag="test.com", hostname="test.com", admin_password="test")
+    assert site.is_pending_purge() is False
+
+    site.removed_at = datetime.now()
+    assert site.is_pending_purge() is True
+
+    site.purged_at = datetime.now()
+    assert site.is_pending_purge() is False
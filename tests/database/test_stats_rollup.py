@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from database.models import (
+    SiteStats,
+    SiteStatsDaily,
+    SiteStatsLatest,
+    SiteStatsMonthly,
+)
+from database.stats import (
+    get_weekly_growth,
+    purge_raw,
+    rollup_daily,
+    rollup_monthly,
+    upsert_latest,
+)
+
+TODAY = date(2026, 10, 19)
+
+
+def _snapshot(day_offset: int, hour: int, content: int, assets: float) -> SiteStats:
+    collected = datetime.combine(
+        TODAY - timedelta(days=day_offset), datetime.min.time()
+    )
+    return SiteStats(
+        site_tag="rollup",
+        content_count=content,
+        user_count=3,
+        assets_mb=assets,
+        db_data_mb=1.0,
+        db_index_mb=0.5,
+        db_tables=10,
+        db_rows=100,
+        collected_at=collected + timedelta(hours=hour),
+    )
+
+
+async def test_rollup_and_growth(test_db_session):
+    db = test_db_session
+    for model in (SiteStats, SiteStatsDaily, SiteStatsMonthly):
+        await db.execute(delete(model))
+
+    db.add_all(
+        [
+            _snapshot(21, 1, content=10, assets=1.0),
+            _snapshot(21, 13, content=12, assets=1.5),
+            _snapshot(7, 1, content=19, assets=3.0),
+            _snapshot(0, 1, content=30, assets=4.0),  # today, not complete yet
+        ]
+    )
+    await db.commit()
+
+    assert await rollup_daily(db, today=TODAY) == 2
+    await db.commit()
+    # idempotent: already rolled up days are skipped
+    assert await rollup_daily(db, today=TODAY) == 0
+
+    daily = (
+        (await db.execute(select(SiteStatsDaily).order_by(SiteStatsDaily.day)))
+        .scalars()
+        .all()
+    )
+    assert [(d.content_count, d.assets_mb, d.samples) for d in daily] == [
+        (12, 1.5, 2),
+        (19, 3.0, 1),
+    ]
+
+    # 7 content and 1.5 MB over 14 days
+    growth = await get_weekly_growth(db, weeks=4, today=TODAY)
+    assert growth["rollup"]["content_count"] == 3.5
+    assert growth["rollup"]["assets_mb"] == 0.75
+
+    # only the 21 days old snapshots are past raw retention
+    assert await purge_raw(db, today=TODAY) == 2
+    await db.commit()
+
+    # monthly rollup folds nothing until daily rows are past their retention
+    assert await rollup_monthly(db, today=TODAY) == 0
+    assert await rollup_monthly(db, today=TODAY + timedelta(days=240)) == 2
+    await db.commit()
+    assert (await db.execute(select(SiteStatsDaily))).scalars().all() == []
+
+
+async def test_upsert_latest(test_db_session):
+    db = test_db_session
+    row = {
+        "site_tag": "latest",
+        "content_count": 1,
+        "user_count": 1,
+        "assets_mb": 1.0,
+        "db_data_mb": 1.0,
+        "db_index_mb": 1.0,
+        "db_tables": 1,
+        "db_rows": 1,
+        "collected_at": datetime(2026, 10, 18),
+    }
+    await upsert_latest(db, [row])
+    await upsert_latest(
+        db, [row | {"content_count": 5, "collected_at": datetime(2026, 10, 19)}]
+    )
+    await db.commit()
+
+    latest = (await db.execute(select(SiteStatsLatest))).scalars().all()
+    assert [(r.site_tag, r.content_count) for r in latest] == [("latest", 5)]
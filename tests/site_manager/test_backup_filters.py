@@ -0,0 +1,33 @@
+import site_manager.backup_filters
+from site_manager.backup_filters import get_backup_filters, render_backup_filters
+
+
+def test_render_backup_filters():
+    filters = render_backup_filters("mediawiki")
+
+    bind = filters["bind"].splitlines()
+    assert "- /app/public/includes" in bind
+    assert "- /app/public/index.php" in bind
+    assert "- /app/public/LocalSettings.php" in bind  # renamed hardlink
+    # excludes come before the includes, rsync stops at the first match
+    assert bind.index("- /app/public/vendor") < bind.index("+ /app/public/**")
+    assert bind[-1] == "- *"
+
+    assert filters["overlay"].splitlines()[0] == "- /app/public"
+    upper = filters["upper"].splitlines()
+    assert "- /LocalSettings.php" in upper
+    assert "- /includes" not in upper
+
+    assert "overlay" not in render_backup_filters("flarum")
+
+
+def test_get_backup_filters(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.backup_filters, "FILTER_ROOT", tmp_path)
+    get_backup_filters.cache_clear()
+
+    paths = get_backup_filters("wordpress")
+    assert set(paths) == {"bind", "overlay", "upper"}
+    with open(paths["bind"]) as f:
+        assert f.read() == render_backup_filters("wordpress")["bind"]
+
+    get_backup_filters.cache_clear()
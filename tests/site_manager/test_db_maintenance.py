@@ -0,0 +1,65 @@
+import pytest
+
+from site_manager.db_maintenance import check_result, plan_maintenance
+
+
+def _table(name: str, size_mb: float, free_mb: float, rows: int = 10, engine="InnoDB"):
+    return {
+        "schema": "tenant_wp",
+        "table": name,
+        "engine": engine,
+        "size_mb": size_mb,
+        "free_mb": free_mb,
+        "rows": rows,
+    }
+
+
+def test_plan_maintenance():
+    tables = [
+        _table("wp_options", size_mb=20, free_mb=60),
+        _table("wp_posts", size_mb=100, free_mb=40),
+        # lots of free space, but small next to the table
+        _table("wp_postmeta", size_mb=1000, free_mb=50, rows=50_000),
+        _table("wp_comments", size_mb=5, free_mb=10),  # below the minimum
+        _table("wp_cache", size_mb=1, free_mb=100, engine="MEMORY"),
+        _table("wp_users", size_mb=1, free_mb=0, rows=2000),
+    ]
+    analyzed = {"tenant_wp.wp_postmeta": 49_000, "tenant_wp.wp_users": 1000}
+
+    plan = plan_maintenance(tables, analyzed)
+    assert [(action, table["table"]) for action, table in plan] == [
+        ("OPTIMIZE", "wp_options"),
+        ("OPTIMIZE", "wp_posts"),
+        # postmeta barely changed since the last ANALYZE, users doubled
+        ("ANALYZE", "wp_users"),
+    ]
+
+    # never analyzed before
+    plan = plan_maintenance(tables, {}, min_free_mb=1000)
+    assert [table["table"] for _, table in plan] == ["wp_postmeta", "wp_users"]
+
+
+def test_check_result():
+    check_result(
+        [
+            (
+                "tenant_wp.wp_posts",
+                "optimize",
+                "note",
+                "Table does not support optimize, doing recreate + analyze instead",
+            ),
+            ("tenant_wp.wp_posts", "optimize", "status", "OK"),
+        ]
+    )
+    with pytest.raises(RuntimeError, match="Lock wait timeout"):
+        check_result(
+            [
+                (
+                    "tenant_wp.wp_posts",
+                    "optimize",
+                    "error",
+                    "Lock wait timeout exceeded",
+                ),
+                ("tenant_wp.wp_posts", "optimize", "status", "Operation failed"),
+            ]
+        )
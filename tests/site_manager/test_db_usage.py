@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+import site_manager.db_usage
+from database.models import DbUsageStats, Site
+from database.stats import get_db_usage, purge_db_usage
+from site_manager.db_usage import compute_deltas, find_outliers, update_limits
+
+
+def _delta(latency_ms: int, statements: int = 10) -> dict[str, int]:
+    return {
+        "statements": statements,
+        "latency_ms": latency_ms,
+        "rows_examined": 0,
+        "rows_sent": 0,
+        "tmp_tables": 0,
+        "tmp_disk_tables": 0,
+        "busy_ms": 0,
+        "cpu_ms": 0,
+    }
+
+
+def test_compute_deltas():
+    previous = {
+        "wiki": {"statements": 100, "latency_ms": 5000},
+        "idle": {"statements": 7, "latency_ms": 20},
+    }
+    current = {
+        "wiki": {"statements": 150, "latency_ms": 6000, "cpu_ms": 300},
+        "idle": {"statements": 7, "latency_ms": 20},
+        "new": {"statements": 3, "latency_ms": 9},
+    }
+
+    deltas = compute_deltas(current, previous)
+    assert deltas["wiki"]["statements"] == 50
+    assert deltas["wiki"]["latency_ms"] == 1000
+    assert deltas["wiki"]["cpu_ms"] == 300  # userstat enabled in between
+    assert deltas["new"]["statements"] == 3
+    assert "idle" not in deltas
+
+    # server restarted: counters start over
+    restarted = compute_deltas({"wiki": {"statements": 4, "latency_ms": 80}}, current)
+    assert restarted["wiki"]["statements"] == 4
+
+
+def test_find_outliers():
+    deltas = {"hog": _delta(80_000), "a": _delta(10_000), "b": _delta(10_000)}
+    assert find_outliers(deltas) == {"hog"}
+    assert find_outliers(deltas, share=0.05) == {"hog", "a", "b"}
+    # an idle server has no outliers
+    assert find_outliers({"hog": _delta(800), "a": _delta(100)}) == set()
+
+
+async def test_update_limits_dry_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        site_manager.db_usage, "LIMITED_PATH", tmp_path / "limited.json"
+    )
+    (tmp_path / "limited.json").write_text(
+        '{"calm": "2026-10-01T00:00:00", "gone": "2026-10-01T00:00:00"}'
+    )
+    deltas = {
+        "hog": _delta(80_000),
+        "donor": _delta(80_000),
+        "calm": _delta(1_000),
+        "a": _delta(10_000),
+    }
+
+    limited, lifted = await update_limits(
+        None,
+        deltas,
+        active={"hog", "donor", "calm", "a"},
+        exempt={"donor"},
+        dry_run=True,
+    )
+    assert limited == ["hog"]
+    assert lifted == ["calm"]  # "gone" was removed, its user with it
+
+
+async def test_get_db_usage(test_db_session):
+    db = test_db_session
+    now = datetime(2026, 10, 19, 12, 0)
+    db.add(
+        Site(
+            tag="dbu_wiki",
+            admin_email="dbu_wiki@test.local",
+            admin_password="test",
+            site_type="mediawiki",
+            hostname="dbu_wiki.test.local",
+        )
+    )
+    db.add_all(
+        [
+            DbUsageStats(
+                site_tag="dbu_wiki",
+                **_delta(500),
+                collected_at=now - timedelta(hours=h),
+            )
+            for h in (1, 2, 48 * 10)
+        ]
+    )
+    await db.commit()
+
+    usage = await get_db_usage(db, now=now)
+    assert usage["dbu_wiki"]["latency_ms"] == 1000
+    assert usage["dbu_wiki"]["statements"] == 20
+
+    assert await purge_db_usage(db, today=now.date()) == 1
+    await db.execute(delete(DbUsageStats))
+    await db.execute(delete(Site).where(Site.tag == "dbu_wiki"))
+    await db.commit()
@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta
+
+import site_manager.hibernation
+from database.models import Site
+from site_manager.hibernation import (
+    _first_request_ms,
+    is_idle,
+    should_wake,
+)
+from utils.state import save_json
+
+
+def _log(tmp_path, tag: str, lines: list[dict], age_days: float = 0):
+    path = tmp_path / tag / "logs" / "access.log"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # nginx' $time_iso8601, with the local offset
+    time = (
+        (datetime.now() - timedelta(days=age_days))
+        .astimezone()
+        .isoformat("T", "seconds")
+    )
+    path.write_text(
+        "".join(json.dumps({"time": time, **line}) + "\n" for line in lines)
+    )
+    return path
+
+
+def test_idle_and_wake(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.hibernation, "TENANTS_ROOT", tmp_path)
+    now = datetime.now()
+    old = now - timedelta(days=90)
+
+    _log(tmp_path, "busy", [{"request_time": "0.1"}], age_days=1)
+    _log(tmp_path, "quiet", [{"request_time": "0.1"}], age_days=30)
+
+    assert not is_idle(Site(tag="busy", installed_at=old), now)
+    assert is_idle(Site(tag="quiet", installed_at=old), now)
+    # no access log at all
+    assert is_idle(Site(tag="nolog", installed_at=old), now)
+    # too new, donors and not installed sites are left alone
+    assert not is_idle(Site(tag="nolog", installed_at=now), now)
+    assert not is_idle(Site(tag="quiet", installed_at=old, donated_amount=5.0), now)
+    assert not is_idle(Site(tag="quiet"), now)
+
+    asleep = Site(tag="quiet", installed_at=old, hibernated_at=now - timedelta(days=5))
+    assert not is_idle(asleep, now)
+    assert not should_wake(asleep)
+    _log(tmp_path, "quiet", [{"request_time": "0.1"}])
+    assert should_wake(asleep)
+    assert not should_wake(Site(tag="busy", installed_at=old))
+
+
+def test_last_access_ignores_rotation(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.hibernation, "TENANTS_ROOT", tmp_path)
+    now = datetime.now()
+    old = now - timedelta(days=90)
+
+    path = _log(tmp_path, "quiet", [{"request_time": "0.1"}], age_days=30)
+    # rotation: the old entries move away, a new empty log is created just now
+    path.rename(path.with_name("access.log.1"))
+    path.write_text("")
+    assert is_idle(Site(tag="quiet", installed_at=old), now)
+
+    asleep = Site(tag="quiet", installed_at=old, hibernated_at=now - timedelta(days=5))
+    with open(path, "a") as f:
+        f.write("not json\n")
+    assert not should_wake(asleep)
+
+
+def test_undated_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.hibernation, "TENANTS_ROOT", tmp_path)
+    monkeypatch.setattr(
+        site_manager.hibernation, "STATE_PATH", tmp_path / "sleeping.json"
+    )
+    now = datetime.now()
+    old = now - timedelta(days=90)
+
+    # a log format without `time` doesn't make a site idle
+    path = _log(tmp_path, "odd", [])
+    path.write_text(json.dumps({"request_time": "0.1"}) + "\n")
+    assert not is_idle(Site(tag="odd", installed_at=old), now)
+
+    # nor keeps it asleep: it wakes on anything logged after it went to sleep
+    asleep = Site(tag="odd", installed_at=old, hibernated_at=now - timedelta(days=5))
+    save_json(tmp_path / "sleeping.json", {"odd": [path.stat().st_size, 0]})
+    assert not should_wake(asleep)
+    with open(path, "a") as f:
+        f.write(json.dumps({"request_time": "0.2"}) + "\n")
+    assert should_wake(asleep)
+
+
+def test_first_request_ms(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.hibernation, "TENANTS_ROOT", tmp_path)
+
+    path = _log(tmp_path, "wiki", [{"request_time": "0.050"}])
+    offset = path.stat().st_size
+    with open(path, "a") as f:
+        f.write(json.dumps({"request_time": "1.234"}) + "\n")
+        f.write(json.dumps({"request_time": "0.010"}) + "\n")
+
+    assert _first_request_ms("wiki", offset) == 1234
+    # rotated: the log is now shorter than the recorded offset
+    assert _first_request_ms("wiki", offset * 10) == 50
+    assert _first_request_ms("missing", 0) is None
@@ -0,0 +1,42 @@
+from database.models import Site
+from site_manager import l10n_cache
+from site_manager.l10n_cache import (
+    L10N_CACHE_PATH,
+    STAMP_NAME,
+    cache_stamp,
+    has_shared_l10n_cache,
+)
+
+
+def test_cache_stamp():
+    stamp = cache_stamp("abc", {"de", "fr"})
+    assert stamp == cache_stamp("abc", {"fr", "de", "en"})  # en is always built
+    assert stamp != cache_stamp("abc", {"de"})
+    assert stamp != cache_stamp("def", {"de", "fr"})
+    assert cache_stamp(None) is None  # no skeleton
+
+
+def test_has_shared_l10n_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(l10n_cache, "SKELETON_ROOT", tmp_path)
+    monkeypatch.setattr(
+        l10n_cache,
+        "release_dir",
+        lambda site_type, release: tmp_path / "releases" / site_type / release,
+    )
+    site = Site(
+        tag="wiki",
+        admin_email="test@example.com",
+        admin_password="test",
+        site_type="mediawiki",
+        hostname="wiki.example.com",
+    )
+    assert not has_shared_l10n_cache(site)
+
+    cache = tmp_path / "mediawiki" / L10N_CACHE_PATH
+    cache.mkdir(parents=True)
+    (cache / STAMP_NAME).write_text("abc\n")
+    assert has_shared_l10n_cache(site)
+
+    # a release built before the shared cache existed
+    site.skeleton_release = "0123456789ab"
+    assert not has_shared_l10n_cache(site)
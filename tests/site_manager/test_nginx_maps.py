@@ -0,0 +1,84 @@
+import pytest
+
+from site_manager import nginx_maps
+from site_manager.nginx_maps import render_nginx_maps
+
+
+def test_render_is_order_independent():
+    a = {
+        "alpha": ["alpha.test.local", "wordpress"],
+        "beta": ["beta.test.local", "flarum"],
+    }
+    b = dict(reversed(list(a.items())))
+
+    assert render_nginx_maps(a) == render_nginx_maps(b)
+
+
+def test_render_lists_custom_domains():
+    sites_config, server_names_config = render_nginx_maps(
+        {
+            "alpha": ["alpha.test.local", "wordpress"],
+            "beta": ["wiki.example.com", "mediawiki"],
+        }
+    )
+
+    assert "    alpha.test.local    alpha;" in sites_config
+    assert "    alpha.test2.local    alpha;" in sites_config
+    assert "    wiki.example.com    beta;" in sites_config
+    assert "    beta    mediawiki;" in sites_config
+    assert "server_name wiki.example.com;" in server_names_config
+    assert "alpha.test.local" not in server_names_config
+
+
+def test_render_empty():
+    sites_config, server_names_config = render_nginx_maps({})
+
+    assert "# (none)" in sites_config
+    assert "server_name" not in server_names_config
+
+
+def test_render_compact_lists_sites_once():
+    entries = {
+        "alpha": ["alpha.test2.local", "wordpress"],
+        "beta": ["wiki.example.com", "mediawiki"],
+    }
+    sites_config, server_names_config = render_nginx_maps(entries, mode="compact")
+
+    assert r"\.(?:test\.local|test2\.local)$" in sites_config
+    assert '    alpha    "wordpress alpha.test2.local";' in sites_config
+    assert "    wiki.example.com    beta;" in sites_config
+    assert "alpha.test.local" not in sites_config
+    assert server_names_config == render_nginx_maps(entries, mode="full")[1]
+
+
+def test_render_unknown_mode():
+    with pytest.raises(ValueError):
+        render_nginx_maps({}, mode="tiny")
+
+
+async def test_failed_reload_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(nginx_maps, "NGINX_MAP_PATH", tmp_path / "sites.conf")
+    monkeypatch.setattr(nginx_maps, "CUSTOM_SERVER_NAMES_PATH", tmp_path / "names.conf")
+    monkeypatch.setattr(nginx_maps, "STATE_PATH", tmp_path / "state.json")
+    reloads = []
+
+    async def failing_reload(service):
+        reloads.append(service)
+        raise RuntimeError("reload failed")
+
+    monkeypatch.setattr(nginx_maps, "request_reload", failing_reload)
+    entries = {"alpha": ["alpha.test.local", "wordpress"]}
+    with pytest.raises(RuntimeError):
+        await nginx_maps._write(entries, None)
+    state = nginx_maps.load_json(tmp_path / "state.json")
+    assert state == {"hash": None, "sites": entries}
+
+    async def reload(service):
+        reloads.append(service)
+
+    monkeypatch.setattr(nginx_maps, "request_reload", reload)
+    # same content as the failed run, still reloaded
+    assert await nginx_maps._write(entries, state["hash"])
+    state = nginx_maps.load_json(tmp_path / "state.json")
+    assert not await nginx_maps._write(entries, state["hash"])
+    assert len(reloads) == 2
@@ -0,0 +1,161 @@
+import json
+from datetime import datetime, timedelta
+
+import site_manager.pool_sizing
+from database.models import Site
+from site_manager.pool_sizing import (
+    fit_budget,
+    get_log_usage,
+    get_pool_workers,
+    plan_pools,
+    size_pool,
+)
+
+
+def _log(tmp_path, tag: str, entries: list[tuple[float, float]]):
+    path = tmp_path / tag / "logs" / "access.log"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "".join(
+            json.dumps(
+                {
+                    # nginx' $time_iso8601, with the local offset
+                    "time": datetime.fromtimestamp(ts).astimezone().isoformat(),
+                    "request_time": f"{rt:.3f}",
+                }
+            )
+            + "\n"
+            for ts, rt in entries
+        )
+    )
+
+
+def test_log_usage(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.pool_sizing, "TENANTS_ROOT", tmp_path)
+    now = datetime.now()
+    minute = (now - timedelta(hours=1)).timestamp() // 60 * 60
+    old = (now - timedelta(days=3)).timestamp()
+    # 120 requests of 1s within one minute = 2 busy workers on average
+    _log(
+        tmp_path,
+        "busy",
+        [(old, 30.0)] + [(minute + i / 2, 1.0) for i in range(120)],
+    )
+
+    usage = get_log_usage("busy", now - timedelta(hours=24))
+    assert usage["requests"] == 120  # the old entry is outside the window
+    assert usage["peak_concurrency"] == 2.0
+
+    empty = get_log_usage("missing", now - timedelta(hours=24))
+    assert empty["requests"] == 0 and empty["peak_concurrency"] == 0.0
+
+    # entries without a time are no evidence of a quiet pool
+    path = tmp_path / "odd" / "logs" / "access.log"
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps({"request_time": "1.0"}) + "\n")
+    assert get_log_usage("odd", now - timedelta(hours=24)) is None
+
+
+def test_pool_workers(tmp_path):
+    for pid, cmdline, rss in [
+        ("100", b"php-fpm: pool wiki\0", 20_000),
+        ("101", b"php-fpm: pool wiki\0", 30_000),
+        ("102", b"php-fpm: master process (/etc/php/fpm/php-fpm.conf)\0", 10_000),
+        ("103", b"nginx: worker process\0", 5_000),
+    ]:
+        (tmp_path / pid).mkdir()
+        (tmp_path / pid / "cmdline").write_bytes(cmdline)
+        (tmp_path / pid / "status").write_text(f"Name:\tphp-fpm\nVmRSS:\t{rss} kB\n")
+    (tmp_path / "self").mkdir()
+
+    assert get_pool_workers(tmp_path) == {"wiki": (2, 50_000)}
+
+
+def test_size_pool():
+    quiet = {"per_minute": 0.1, "peak_concurrency": 0.05, "mean_concurrency": 0.0}
+    assert size_pool(quiet) == {
+        "pm": "ondemand",
+        "max_children": 1,
+        "max_requests": 200,
+        "idle_timeout": "10s",
+    }
+    assert size_pool(quiet, users=500)["max_children"] == 2
+
+    busy = {"per_minute": 600, "peak_concurrency": 4.0, "mean_concurrency": 1.2}
+    pool = size_pool(busy)
+    assert pool["pm"] == "dynamic"
+    assert pool["max_children"] == 6
+    assert pool["min_spare_servers"] == 2
+    assert pool["min_spare_servers"] <= pool["max_spare_servers"] <= 6
+
+    huge = {"per_minute": 6000, "peak_concurrency": 100.0, "mean_concurrency": 50}
+    assert size_pool(huge)["max_children"] == site_manager.pool_sizing.POOL_MAX_CHILDREN
+
+
+def test_fit_budget():
+    pools = {
+        "big": size_pool(
+            {"per_minute": 600, "peak_concurrency": 8.0, "mean_concurrency": 3.0}
+        ),
+        "small": size_pool(
+            {"per_minute": 1, "peak_concurrency": 1.0, "mean_concurrency": 0.1}
+        ),
+    }
+    worker_mb = {"big": 50.0, "small": 50.0}
+    assert pools["big"]["max_children"] == 12 and pools["small"]["max_children"] == 2
+
+    assert fit_budget(pools, worker_mb, budget_mb=10_000) == pools
+
+    # the big pool shrinks first, down to what fits
+    fitted = fit_budget(pools, worker_mb, budget_mb=400)
+    assert fitted["big"]["max_children"] == 6
+    assert fitted["small"]["max_children"] == 2
+    assert fitted["big"]["max_spare_servers"] <= 6
+
+    # never below one child, even over budget
+    fitted = fit_budget(pools, worker_mb, budget_mb=10, reserved_mb=100)
+    assert [p["max_children"] for p in fitted.values()] == [1, 1]
+
+
+def test_plan_pools_hibernated(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.pool_sizing, "TENANTS_ROOT", tmp_path)
+    now = datetime.now()
+    sites = [
+        Site(tag="awake", installed_at=now),
+        Site(tag="asleep", installed_at=now, hibernated_at=now),
+    ]
+
+    plan = plan_pools(sites, {}, {"awake": (2, 200 * 1024)}, now)
+    assert list(plan) == ["awake"]
+
+    # the hibernated pool's reserve (2 x 64 MB) leaves room for one 100 MB worker
+    plan = plan_pools(sites, {}, {"awake": (2, 200 * 1024)}, now, budget_mb=250)
+    assert plan["awake"]["max_children"] == 1
+
+
+def test_plan_pools_usage(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.pool_sizing, "TENANTS_ROOT", tmp_path)
+    now = datetime.now()
+    sites = [Site(tag="forum", installed_at=now), Site(tag="odd", installed_at=now)]
+    path = tmp_path / "odd" / "logs" / "access.log"
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps({"request_time": "1.0"}) + "\n")
+    previous = {
+        "odd": size_pool(
+            {"per_minute": 600, "peak_concurrency": 4.0, "mean_concurrency": 1.0}
+        )
+    }
+
+    # an undatable log keeps the pool out of the plan, it keeps its previous size
+    plan = plan_pools(sites, {}, {}, now, previous=previous)
+    assert list(plan) == ["forum"]
+
+    # busy workers from the status samples count even when the log is quiet,
+    # and size a pool whose log can't be dated
+    activity = {
+        "forum": {"requests": 0, "requests_per_min": 0.0, "peak_active": 4},
+        "odd": {"requests": 36_000, "requests_per_min": 600.0, "peak_active": 3},
+    }
+    plan = plan_pools(sites, {}, {}, now, activity=activity)
+    assert plan["forum"]["max_children"] == 6
+    assert plan["odd"]["pm"] == "dynamic" and plan["odd"]["max_children"] == 5
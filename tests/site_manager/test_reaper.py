@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from sqlalchemy import delete
+
+import site_manager.reaper
+from database.models import Site
+from site_manager.reaper import get_pending_sites, reap_sites
+
+
+def _site(tag: str, removed: bool = True) -> Site:
+    return Site(
+        tag=tag,
+        admin_email=f"{tag}@test.local",
+        admin_password="test",
+        site_type="wordpress",
+        hostname=f"{tag}.test.local",
+        removed_at=datetime.now() if removed else None,
+    )
+
+
+async def test_reap_sites(test_db_session, monkeypatch):
+    db = test_db_session
+    db.add_all([_site("reap_ok"), _site("reap_fail"), _site("reap_active", False)])
+    await db.commit()
+
+    removed, map_updates, reloads = [], [], []
+
+    def remove_site(site, skip_backup, send_email, reason, reload, mounts):
+        assert reload is False  # reloads are batched
+        assert mounts == []
+        if site.tag == "reap_fail":
+            raise RuntimeError("playbook failed")
+        removed.append(site.tag)
+
+    async def remove_from_nginx_maps(db, *tags):
+        map_updates.append(tags)
+
+    async def request_reload(*services):
+        reloads.append(services)
+
+    monkeypatch.setattr(site_manager.reaper, "remove_site", remove_site)
+    monkeypatch.setattr(
+        site_manager.reaper, "remove_from_nginx_maps", remove_from_nginx_maps
+    )
+    monkeypatch.setattr(site_manager.reaper, "request_reload", request_reload)
+
+    results = await reap_sites(db, "reap_ok", "reap_fail", "reap_active")
+
+    assert results == {"reap_ok": None, "reap_fail": "playbook failed"}
+    assert removed == ["reap_ok"]
+    assert map_updates == [("reap_ok",)]
+    assert len(reloads) == 1
+
+    # failed sites stay pending and are retried
+    pending = await get_pending_sites(db, "reap_ok", "reap_fail", "reap_active")
+    assert [site.tag for site in pending] == ["reap_fail"]
+    assert pending[0].purge_error == "playbook failed"
+
+    await db.execute(delete(Site).where(Site.tag.like("reap_%")))
+    await db.commit()
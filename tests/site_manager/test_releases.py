@@ -0,0 +1,46 @@
+import os
+
+import site_manager.releases
+import site_manager.templates
+from database.models import Site
+from site_manager.releases import get_default_release, list_releases
+from site_manager.skeleton import get_changed_paths
+from site_manager.templates import get_template
+
+
+def test_list_releases(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.releases, "RELEASES_ROOT", tmp_path)
+    assert list_releases("wordpress") == []
+    assert get_default_release("wordpress") is None
+
+    root = tmp_path / "wordpress"
+    for i, release in enumerate(["bbbbbbbbbbbb", "aaaaaaaaaaaa"]):
+        (root / release).mkdir(parents=True)
+        os.utime(root / release, (i, i))
+    # in-progress copies and the current link aren't releases
+    (root / ".cccccccccccc.tmp").mkdir()
+    (root / "current").symlink_to("aaaaaaaaaaaa")
+
+    assert list_releases("wordpress") == ["bbbbbbbbbbbb", "aaaaaaaaaaaa"]
+    assert get_default_release("wordpress") == "aaaaaaaaaaaa"
+
+
+def test_release_tenants_sync_fully():
+    site = Site(tag="rel", site_type="wordpress", skeleton_release="aaaaaaaaaaaa")
+    assert get_changed_paths(site) is None
+
+
+def test_get_template(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.templates, "TEMPLATES_ROOT", tmp_path)
+    monkeypatch.setattr(site_manager.templates, "load_current_manifest", lambda _: None)
+    assert get_template("wordpress") is None
+
+    monkeypatch.setattr(
+        site_manager.templates,
+        "load_current_manifest",
+        lambda _: {"version": "aaaaaaaaaaaa" + "0" * 52},
+    )
+    assert get_template("wordpress") is None
+    (tmp_path / "wordpress" / "aaaaaaaaaaaa").mkdir(parents=True)
+    assert get_template("wordpress") == tmp_path / "wordpress" / "aaaaaaaaaaaa"
+    assert get_template("wordpress", "bbbbbbbbbbbb") is None
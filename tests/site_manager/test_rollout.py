@@ -0,0 +1,102 @@
+import pytest
+
+import site_manager.rollout
+import site_manager.skeleton
+from database.models import Site
+from site_manager.rollout import Rollout, RolloutAborted
+
+
+def _sites(n: int, site_type: str = "wordpress") -> list[Site]:
+    return [
+        Site(tag=f"{site_type}{i:03d}", site_type=site_type, donated_amount=0)
+        for i in range(n)
+    ]
+
+
+def _fake_upgrade(monkeypatch, failing: set[str]) -> list[str]:
+    upgraded = []
+
+    async def upgrade_site(site, sync_files=False, migrate=True, full_sync=False):
+        if site.tag in failing:
+            raise RuntimeError("migration failed")
+        upgraded.append(site.tag)
+
+    monkeypatch.setattr(site_manager.rollout, "upgrade_site", upgrade_site)
+    return upgraded
+
+
+async def test_rollout_upgrades_everything(monkeypatch):
+    upgraded = _fake_upgrade(monkeypatch, failing=set())
+    sites = _sites(10) + _sites(4, "flarum")
+
+    rollout = Rollout(sites, concurrency={"wordpress": 3, "flarum": 1}, canary_size=2)
+    await rollout.run()
+
+    assert sorted(upgraded) == sorted(site.tag for site in sites)
+    assert len(rollout.timings["wordpress"]) == 10
+    assert not rollout.failed
+
+
+async def test_rollout_failed_canary_stops_rollout(monkeypatch):
+    upgraded = _fake_upgrade(monkeypatch, failing={"wordpress001"})
+
+    rollout = Rollout(_sites(10), canary_size=2)
+    with pytest.raises(RolloutAborted):
+        await rollout.run()
+
+    assert upgraded == ["wordpress000"]
+
+
+async def test_rollout_stops_on_error_rate(monkeypatch):
+    failing = {f"wordpress{i:03d}" for i in range(10, 40)}
+    upgraded = _fake_upgrade(monkeypatch, failing=failing)
+
+    rollout = Rollout(
+        _sites(100), concurrency={"wordpress": 1}, canary_size=2, min_samples=10
+    )
+    with pytest.raises(RolloutAborted):
+        await rollout.run()
+
+    # stopped after the first failure past min_samples, nothing after it started
+    assert len(upgraded) == 10
+    assert list(rollout.failed) == ["wordpress010"]
+
+
+async def test_rollout_resume_skips_done_sites(monkeypatch):
+    _fake_upgrade(monkeypatch, failing={"wordpress005"})
+    with pytest.raises(RolloutAborted):
+        await Rollout(_sites(10), canary_size=0, min_samples=1).run()
+
+    upgraded = _fake_upgrade(monkeypatch, failing=set())
+    rollout = Rollout(_sites(10), canary_size=0, resume=True)
+    await rollout.run()
+
+    assert "wordpress005" in upgraded
+    assert "wordpress000" not in upgraded
+    assert rollout.skipped == 10 - len(upgraded)
+
+
+async def test_rollout_skips_current_sites(monkeypatch):
+    upgraded = _fake_upgrade(monkeypatch, failing=set())
+    monkeypatch.setattr(
+        site_manager.skeleton,
+        "get_upgrade_fingerprint",
+        lambda site_type, release=None: "abc",
+    )
+    monkeypatch.setattr(
+        site_manager.rollout,
+        "needs_upgrade",
+        lambda site: site.upgrade_fingerprint != "abc",
+    )
+    sites = _sites(4)
+    sites[0].upgrade_fingerprint = "abc"
+
+    rollout = Rollout(sites, canary_size=1)
+    await rollout.run()
+
+    assert rollout.current == 1
+    assert "wordpress000" not in upgraded
+    assert all(site.upgrade_fingerprint == "abc" for site in sites)
+
+    forced = Rollout(sites, canary_size=1, force=True)
+    assert forced.current == 0
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from database.models import Site
+from site_manager.scheduler import flarum_due, next_wp_cron, plan_runs
+
+
+def _site(tag: str, site_type: str) -> Site:
+    return Site(
+        tag=tag,
+        admin_email="test@example.com",
+        admin_password="test",
+        site_type=site_type,
+        hostname=f"{tag}.example.com",
+    )
+
+
+def test_next_wp_cron():
+    cron = (
+        'a:3:{i:1700000600;a:1:{s:16:"wp_version_check";a:1:{s:32:"40cd750bba9870f18aada2478b24840a";'
+        'a:3:{s:8:"schedule";s:10:"twicedaily";s:4:"args";a:0:{}s:8:"interval";i:43200;}}}'
+        'i:1700000300;a:1:{s:17:"publish_future_post";a:1:{s:32:"a4a8ec1d0ea7fe1a17f2b4fcc56ba9b7";'
+        'a:3:{s:8:"schedule";b:0;s:4:"args";a:1:{i:0;i:42;}}}}s:7:"version";i:2;}'
+    )
+    assert next_wp_cron(cron) == 1700000300
+    assert next_wp_cron('a:1:{s:7:"version";i:2;}') is None
+
+
+def test_flarum_due():
+    assert flarum_due(datetime(2026, 1, 1, 13, 0), every_min=60)
+    assert not flarum_due(datetime(2026, 1, 1, 13, 5), every_min=60)
+    assert flarum_due(datetime(2026, 1, 1, 13, 15), every_min=15)
+
+
+def test_plan_runs():
+    sites = [
+        _site("wp1", "wordpress"),
+        _site("wp2", "wordpress"),
+        _site("wiki", "mediawiki"),
+        _site("forum", "flarum"),
+        _site("idle", "wordpress"),
+    ]
+    pending = {"wp1", "wp2", "wiki", "forum"}
+    last_run = {"wp1": "2026-01-01T12:00:00", "wiki": "2026-01-01T11:00:00"}
+
+    planned = plan_runs(sites, pending, last_run)
+    # flarum first, never run before the least recently run
+    assert [site.tag for site in planned] == ["forum", "wp2", "wiki", "wp1"]
+
+    planned = plan_runs(sites, pending, last_run, limit=2)
+    assert [site.tag for site in planned] == ["forum", "wp2"]
@@ -0,0 +1,91 @@
+import site_manager.skeleton
+from database.models import Site
+from site_manager.skeleton import (
+    build_manifest,
+    get_changed_paths,
+    get_current_manifest,
+    get_upgrade_fingerprint,
+    load_current_manifest,
+    mark_upgraded,
+    needs_upgrade,
+)
+
+
+def test_upgrade_fingerprint(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.skeleton, "SKELETON_ROOT", tmp_path)
+    monkeypatch.setattr(site_manager.skeleton, "RELEASES_ROOT", tmp_path / "releases")
+    version_php = tmp_path / "wordpress" / "app/public/wp-includes/version.php"
+
+    get_upgrade_fingerprint.cache_clear()
+    assert get_upgrade_fingerprint("wordpress") is None
+
+    version_php.parent.mkdir(parents=True)
+    version_php.write_text("<?php $wp_db_version = 58975;")
+    get_upgrade_fingerprint.cache_clear()
+    fingerprint = get_upgrade_fingerprint("wordpress")
+    assert fingerprint is not None
+
+    version_php.write_text("<?php $wp_db_version = 60421;")
+    get_upgrade_fingerprint.cache_clear()
+    assert get_upgrade_fingerprint("wordpress") != fingerprint
+
+    site = Site(tag="fp", site_type="wordpress")
+    assert needs_upgrade(site) is True
+    site.upgrade_fingerprint = get_upgrade_fingerprint("wordpress")
+    assert needs_upgrade(site) is False
+
+    # a release tenant is compared against its release, not the staging tree
+    release_php = (
+        tmp_path / "releases/wordpress/r1" / "app/public/wp-includes/version.php"
+    )
+    release_php.parent.mkdir(parents=True)
+    release_php.write_text("<?php $wp_db_version = 58975;")
+    site.skeleton_release = "r1"
+    assert needs_upgrade(site) is True
+    mark_upgraded(site)
+    assert site.upgrade_fingerprint == get_upgrade_fingerprint("wordpress", "r1")
+    assert site.upgrade_fingerprint != get_upgrade_fingerprint("wordpress")
+    assert needs_upgrade(site) is False
+
+    get_upgrade_fingerprint.cache_clear()
+
+
+def _write(path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_manifest_drift(tmp_path, monkeypatch):
+    monkeypatch.setattr(site_manager.skeleton, "SKELETON_ROOT", tmp_path)
+    root = tmp_path / "wordpress"
+    _write(root / "app/public/wp-content/index.php", "<?php")
+    _write(root / "app/public/wp-includes/version.php", "mounted, not synced")
+    _write(root / "app/public/index.php", "hardlinked")
+    _write(root / "etc/config.json", "{}")
+
+    get_current_manifest.cache_clear()
+    first = get_current_manifest("wordpress")
+    assert "app/public/wp-content/index.php" in first["entries"]
+    assert "app/public/wp-includes/version.php" not in first["entries"]
+    assert "app/public/wp-includes" not in first["entries"]
+    assert "app/public/index.php" in first["hardlinks"]
+
+    site = Site(tag="drift", site_type="wordpress")
+    assert get_changed_paths(site) is None  # never synced: full sync
+    mark_upgraded(site, synced_files=True)
+    assert get_changed_paths(site) == []
+
+    # unchanged skeleton keeps the version
+    assert build_manifest("wordpress", first)["version"] == first["version"]
+
+    _write(root / "etc/config.json", '{"changed": true}')
+    _write(root / "app/public/wp-content/new.php", "<?php")
+    get_current_manifest.cache_clear()
+    assert get_changed_paths(site) == [
+        "app/public/wp-content/new.php",
+        "etc/config.json",
+    ]
+    assert load_current_manifest("wordpress")["version"] != first["version"]
+
+    get_current_manifest.cache_clear()
+    get_upgrade_fingerprint.cache_clear()
@@ -0,0 +1,76 @@
+from utils.cgroups import (
+    apply_limits,
+    get_limits,
+    place_workers,
+    read_usage,
+    remove_stale,
+    setup_hierarchy,
+    tenant_cgroup,
+)
+
+
+def _fake_cgroupfs(tmp_path):
+    """Plain files standing in for cgroupfs."""
+
+    root = tmp_path / "php-fpm.service"
+    root.mkdir()
+    (root / "cgroup.procs").write_text("1\n2\n")
+    (root / "cgroup.subtree_control").write_text("pids\n")
+    return root
+
+
+def test_setup_and_limits(tmp_path):
+    root = _fake_cgroupfs(tmp_path)
+
+    assert setup_hierarchy(root) == 2
+    assert (root / "master").is_dir()
+    assert (root / "cgroup.subtree_control").read_text() == "+cpu +memory"
+
+    apply_limits("wiki", get_limits(donor=True), root)
+    assert (root / "tenant_wiki" / "cpu.weight").read_text() == "300"
+    assert (root / "tenant_wiki" / "memory.high").read_text() == "2G"
+    assert get_limits(donor=False)["cpu.weight"] == "100"
+
+    # tenants that are gone lose their cgroup, once empty
+    apply_limits("gone", get_limits(donor=False), root)
+    for name in ("cpu.weight", "memory.high"):
+        (tenant_cgroup("gone", root) / name).unlink()
+    assert remove_stale({"wiki"}, root) == ["gone"]
+    assert (root / "tenant_wiki").is_dir()
+
+
+def test_place_workers(tmp_path):
+    root = _fake_cgroupfs(tmp_path)
+    (root / "master").mkdir()
+    (root / "master" / "cgroup.procs").write_text("10\n11\n12\n13\n")
+    (root / "tenant_wiki").mkdir()
+
+    proc = tmp_path / "proc"
+    for pid, cmdline in [
+        ("10", b"php-fpm: master process (/etc/php/fpm/php-fpm.conf)\0"),
+        ("11", b"php-fpm: pool wiki\0"),
+        ("12", b"php-fpm: pool nocgroup\0"),  # provisioned before cgroups
+    ]:
+        (proc / pid).mkdir(parents=True)
+        (proc / pid / "cmdline").write_bytes(cmdline)
+    # 13 exited in the meantime
+
+    assert place_workers(root, proc) == {"wiki": 1}
+    assert (root / "tenant_wiki" / "cgroup.procs").read_text() == "11"
+
+
+def test_read_usage(tmp_path):
+    cgroup = tenant_cgroup("wiki", tmp_path)
+    cgroup.mkdir()
+    (cgroup / "cpu.stat").write_text(
+        "usage_usec 2500000\nuser_usec 2000000\nsystem_usec 500000\n"
+    )
+    (cgroup / "memory.current").write_text("104857600\n")
+    (cgroup / "memory.events").write_text("low 0\nhigh 7\nmax 0\noom 0\noom_kill 0\n")
+
+    assert read_usage("wiki", tmp_path) == {
+        "cpu_usage_usec": 2_500_000,
+        "memory_bytes": 104_857_600,
+        "memory_high_events": 7,
+    }
+    assert read_usage("missing", tmp_path) is None
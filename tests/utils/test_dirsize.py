@@ -0,0 +1,58 @@
+import os
+
+from utils.dirsize import DirSizeIndex
+
+
+def _write(path, size: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def test_dirsize_counts_nested_files(tmp_path):
+    _write(tmp_path / "a.png", 100)
+    _write(tmp_path / "sub" / "b.png", 50)
+    _write(tmp_path / "sub" / "deeper" / "c.png", 25)
+
+    index = DirSizeIndex("dirsize_nested")
+    assert index.get_size(tmp_path) == 175
+
+
+def test_dirsize_persists_and_picks_up_changes(tmp_path):
+    _write(tmp_path / "sub" / "a.png", 100)
+
+    index = DirSizeIndex("dirsize_persist")
+    assert index.get_size(tmp_path) == 100
+    index.save()
+
+    # new file in a subdirectory only bumps that subdirectory's mtime
+    _write(tmp_path / "sub" / "b.png", 10)
+    reloaded = DirSizeIndex("dirsize_persist")
+    assert reloaded.get_size(tmp_path) == 110
+    reloaded.forget()
+
+
+def test_dirsize_uses_cache_for_unchanged_dirs(tmp_path):
+    _write(tmp_path / "sub" / "a.png", 100)
+    index = DirSizeIndex("dirsize_cache")
+    index.get_size(tmp_path)
+
+    # grow the file without touching the dir mtime: cached total is kept
+    mtime = os.stat(tmp_path / "sub").st_mtime_ns
+    _write(tmp_path / "sub" / "a.png", 200)
+    os.utime(tmp_path / "sub", ns=(mtime, mtime))
+    assert index.get_size(tmp_path) == 100
+
+
+def test_dirsize_forgets_removed_dirs(tmp_path):
+    _write(tmp_path / "sub" / "a.png", 100)
+    index = DirSizeIndex("dirsize_removed")
+    assert index.get_size(tmp_path) == 100
+
+    (tmp_path / "sub" / "a.png").unlink()
+    (tmp_path / "sub").rmdir()
+    assert index.get_size(tmp_path) == 0
+    assert not any(k.endswith("/sub") for k in index._entries)
+
+
+def test_dirsize_missing_root(tmp_path):
+    assert DirSizeIndex("dirsize_missing").get_size(tmp_path / "nope") == 0
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import struct
+
+import pytest
+
+from utils.fastcgi import FastCGIError, fastcgi_get
+
+STATUS = {"pool": "wiki", "accepted conn": 12, "processes": []}
+
+
+async def _serve(path, respond):
+    """FastCGI responder on a unix socket, `respond(params) -> stdout bytes`."""
+
+    async def handle(reader, writer):
+        params = b""
+        while True:
+            _, record_type, request_id, length, padding = struct.unpack(
+                "!BBHHBx", await reader.readexactly(8)
+            )
+            content = (await reader.readexactly(length + padding))[:length]
+            if record_type == 4:
+                params += content
+            elif record_type == 5:
+                break
+
+        stdout = respond(_decode(params))
+        # split across two records, like FPM does for bigger responses
+        for chunk in (stdout[:10], stdout[10:]):
+            writer.write(
+                struct.pack("!BBHHBx", 1, 6, request_id, len(chunk), 0) + chunk
+            )
+        writer.write(struct.pack("!BBHHBx", 1, 3, request_id, 8, 0) + b"\0" * 8)
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_unix_server(handle, path)
+
+
+def _decode(data: bytes) -> dict[str, str]:
+    params, i = {}, 0
+    while i < len(data):
+        lengths = []
+        for _ in range(2):
+            if data[i] < 128:
+                lengths.append(data[i])
+                i += 1
+            else:
+                lengths.append(struct.unpack("!I", data[i : i + 4])[0] & 0x7FFFFFFF)
+                i += 4
+        name = data[i : i + lengths[0]].decode()
+        params[name] = data[i + lengths[0] : i + sum(lengths)].decode()
+        i += sum(lengths)
+    return params
+
+
+async def test_fastcgi_get(tmp_path):
+    path = str(tmp_path / "fpm.sock")
+    seen = {}
+
+    def respond(params):
+        seen.update(params)
+        body = json.dumps(STATUS).encode()
+        return b"Content-type: application/json\r\n\r\n" + body
+
+    server = await _serve(path, respond)
+    async with server:
+        headers, body = await fastcgi_get(path, "/fpm-status", query="json&full")
+
+    assert headers["content-type"] == "application/json"
+    assert json.loads(body) == STATUS
+    assert seen["SCRIPT_FILENAME"] == "/fpm-status"
+    assert seen["QUERY_STRING"] == "json&full"
+
+
+async def test_fastcgi_errors(tmp_path):
+    path = str(tmp_path / "fpm.sock")
+    server = await _serve(
+        path, lambda params: b"Status: 404 Not Found\r\n\r\nFile not found.\n"
+    )
+    async with server:
+        with pytest.raises(FastCGIError, match="404"):
+            await fastcgi_get(path, "/fpm-status")
+
+    with pytest.raises(FastCGIError):
+        await fastcgi_get(str(tmp_path / "missing.sock"), "/fpm-status")
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from utils.memcached import MemcachedError, get_stats, memcached_command
+
+STATS = (
+    b"STAT pid 4242\r\n"
+    b"STAT version 1.6.21\r\n"
+    b"STAT cmd_get 120\r\n"
+    b"STAT get_hits 90\r\n"
+    b"STAT rusage_user 0.5\r\n"
+    b"END\r\n"
+)
+
+
+async def _serve(socket_path, responses: dict[bytes, bytes]):
+    """memcached on a unix socket, answering each command line from `responses`."""
+
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            writer.write(responses.get(line.strip(), b"ERROR\r\n"))
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_unix_server(handle, socket_path)
+
+
+async def test_get_stats(tmp_path):
+    socket_path = tmp_path / "memcached.sock"
+    async with await _serve(socket_path, {b"stats": STATS}):
+        stats = await get_stats(socket_path)
+
+    # only the integer counters
+    assert stats == {"pid": 4242, "cmd_get": 120, "get_hits": 90}
+
+
+async def test_memcached_errors(tmp_path):
+    socket_path = tmp_path / "memcached.sock"
+    async with await _serve(socket_path, {}):
+        with pytest.raises(MemcachedError, match="ERROR"):
+            await memcached_command("stats detail on", socket_path)
+
+    with pytest.raises(MemcachedError):
+        await memcached_command("stats", tmp_path / "missing.sock")
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from utils.mounts import MountIndex, parse_mountinfo
+
+MOUNTINFO = """\
+22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw
+90 22 8:1 /skel/app/public/includes /srv/tenants/wiki/app/public/includes ro,relatime shared:1 - ext4 /dev/sda1 rw
+91 22 8:1 /skel/app/public/vendor /srv/tenants/wiki/app/public/vendor ro,relatime shared:1 - ext4 /dev/sda1 rw
+92 22 8:1 /skel/app/public/vendor /srv/tenants/wiki2/app/public/vendor ro,relatime shared:1 - ext4 /dev/sda1 rw
+93 22 0:51 / /srv/tenants/blog/app/public rw,relatime shared:2 master:1 - overlay overlay rw,lowerdir=/skel
+94 22 8:1 /x /srv/tenants/odd/my\\040dir ro,relatime shared:1 - ext4 /dev/sda1 rw
+"""
+
+
+def test_parse_mountinfo():
+    mounts = parse_mountinfo(MOUNTINFO)
+
+    assert mounts[0] == ("/", "ext4")
+    # optional fields ("master:1") before the separator
+    assert mounts[4] == ("/srv/tenants/blog/app/public", "overlay")
+    assert mounts[5] == ("/srv/tenants/odd/my dir", "ext4")
+
+
+def test_mount_index():
+    index = MountIndex(parse_mountinfo(MOUNTINFO), root=Path("/srv/tenants"))
+
+    # children before parents, and no prefix matches of other tenants
+    assert index.get("wiki") == [
+        "/srv/tenants/wiki/app/public/vendor",
+        "/srv/tenants/wiki/app/public/includes",
+    ]
+    assert index.get("wiki2") == ["/srv/tenants/wiki2/app/public/vendor"]
+    assert index.get("missing") == []
+    assert len(index) == 4
+    assert index.count() == 5
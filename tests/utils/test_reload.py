@@ -0,0 +1,57 @@
+import subprocess
+import threading
+import time
+
+import utils.reload
+from utils.reload import get_reload_stats, reload_services
+
+
+def _fake_systemctl(monkeypatch, calls: list):
+    def run(cmd, check=False):
+        calls.append(cmd)
+        time.sleep(0.05)  # a reload takes a while, requests pile up meanwhile
+
+    monkeypatch.setattr(utils.reload.subprocess, "run", run)
+
+
+def test_reload_single_request(monkeypatch):
+    calls = []
+    _fake_systemctl(monkeypatch, calls)
+
+    assert reload_services("svc-single", debounce_ms=0) == {"svc-single": 1}
+    assert calls == [["sudo", "systemctl", "reload", "svc-single"]]
+    assert get_reload_stats("svc-single")["last_absorbed"] == 1
+
+
+def test_reload_coalesces_concurrent_requests(monkeypatch):
+    calls = []
+    _fake_systemctl(monkeypatch, calls)
+    results = []
+
+    def request():
+        results.append(reload_services("svc-burst", debounce_ms=50)["svc-burst"])
+
+    threads = [threading.Thread(target=request) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every request is covered by exactly one reload
+    assert sum(results) == 20
+    assert len(calls) == len([r for r in results if r]) < 20
+
+
+def test_failed_reload_is_retried_by_next_request(monkeypatch):
+    def fail(cmd, check=False):
+        raise subprocess.CalledProcessError(1, cmd)
+
+    monkeypatch.setattr(utils.reload.subprocess, "run", fail)
+    try:
+        reload_services("svc-fail", debounce_ms=0)
+    except subprocess.CalledProcessError:
+        pass
+
+    calls = []
+    _fake_systemctl(monkeypatch, calls)
+    assert reload_services("svc-fail", debounce_ms=0) == {"svc-fail": 2}
@@ -0,0 +1,35 @@
+import asyncio
+
+import utils.throttle
+from utils.throttle import Throttle, get_io_pressure
+
+
+def test_io_pressure(tmp_path):
+    path = tmp_path / "io"
+    path.write_text(
+        "some avg10=12.50 avg60=3.00 avg300=1.00 total=123\n"
+        "full avg10=2.00 avg60=1.00 avg300=0.50 total=45\n"
+    )
+    assert get_io_pressure(path) == 12.5
+    assert get_io_pressure(tmp_path / "missing") is None
+
+
+async def test_throttle_waits_and_limits(monkeypatch):
+    loads = iter([5.0, 5.0, 0.1])
+    monkeypatch.setattr(utils.throttle, "get_load_per_cpu", lambda: next(loads, 0.1))
+    monkeypatch.setattr(utils.throttle, "get_io_pressure", lambda: None)
+
+    throttle = Throttle(concurrency=1, max_load=1.0, poll_s=0.01)
+    running, peak = 0, 0
+
+    async def job():
+        nonlocal running, peak
+        async with throttle:
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(job() for _ in range(3)))
+    assert peak == 1
+    assert throttle.waited_s > 0
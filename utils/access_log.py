@@ -0,0 +1,19 @@
+"""
+Tenant access logs.
+
+nginx writes one JSON object per request to `logs/access.log` of every tenant,
+the format `analytics/analyze.py` reads, with the request's time in `time`
+(ISO 8601, `$time_iso8601`).
+"""
+
+from datetime import datetime
+
+
+def entry_time(entry: dict) -> datetime | None:
+    """Local (naive) time of an access log entry, None if it has none."""
+
+    try:
+        ts = datetime.fromisoformat(entry["time"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo else ts
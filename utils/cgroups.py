@@ -0,0 +1,156 @@
+"""
+Per-tenant cgroups for PHP-FPM workers (cgroup v2).
+
+All pools run under a single php-fpm master, so every tenant's workers end up
+in the service's cgroup and share the host without isolation. The service's
+cgroup is delegated to us (`Delegate=`, see
+files/etc/systemd/system/php-fpm.service.d/delegate.conf), the master is
+moved into a `master` leaf and every tenant gets a `tenant_<tag>` sibling with
+its own `cpu.weight` and `memory.high`, tiered by donor status.
+
+php-fpm forks workers from the master, so new workers start out in `master`;
+`place_workers` moves them into their tenant's cgroup by pool name (from the
+process title). Only the master leaf is scanned, not all of /proc, so it's
+cheap enough to run every few seconds, and it has to: until then a worker
+runs without its tenant's limits. `sync_cgroups --install` installs the
+delegation drop-in and a `sync-cgroups` service running `sync_cgroups --watch`.
+"""
+
+from os import environ
+from pathlib import Path
+
+from utils.reload import PHP_FPM
+
+FPM_CGROUP_ROOT = Path(
+    environ.get("FPM_CGROUP_ROOT", f"/sys/fs/cgroup/system.slice/{PHP_FPM}.service")
+)
+CGROUP_CPU_WEIGHT = int(environ.get("CGROUP_CPU_WEIGHT", "100"))
+CGROUP_DONOR_CPU_WEIGHT = int(environ.get("CGROUP_DONOR_CPU_WEIGHT", "300"))
+CGROUP_MEMORY_HIGH = environ.get("CGROUP_MEMORY_HIGH", "512M")
+CGROUP_DONOR_MEMORY_HIGH = environ.get("CGROUP_DONOR_MEMORY_HIGH", "2G")
+
+CONTROLLERS = ("cpu", "memory", "pids")
+MASTER = "master"
+PREFIX = "tenant_"
+
+
+def tenant_cgroup(tag: str, root: Path = FPM_CGROUP_ROOT) -> Path:
+    return root / f"{PREFIX}{tag}"
+
+
+def cgroups_enabled(root: Path = FPM_CGROUP_ROOT) -> bool:
+    """Whether the php-fpm service cgroup has been split up by `setup_hierarchy`."""
+    return (root / MASTER).is_dir()
+
+
+def get_limits(donor: bool) -> dict[str, str]:
+    """{interface file: value} of a tenant cgroup."""
+
+    if donor:
+        return {
+            "cpu.weight": str(CGROUP_DONOR_CPU_WEIGHT),
+            "memory.high": CGROUP_DONOR_MEMORY_HIGH,
+        }
+    return {"cpu.weight": str(CGROUP_CPU_WEIGHT), "memory.high": CGROUP_MEMORY_HIGH}
+
+
+def setup_hierarchy(root: Path = FPM_CGROUP_ROOT) -> int:
+    """
+    Move everything in the service cgroup (master, after a restart also its
+    workers) into the master leaf and enable the controllers for the tenant
+    cgroups. Cgroup v2 only lets a cgroup without processes of its own
+    distribute resources to children. Returns the number of moved processes.
+    """
+
+    (root / MASTER).mkdir(exist_ok=True)
+    moved = 0
+    for pid in (root / "cgroup.procs").read_text().split():
+        moved += _move(pid, root / MASTER)
+
+    enabled = (root / "cgroup.subtree_control").read_text().split()
+    missing = [c for c in CONTROLLERS if c not in enabled]
+    if missing:
+        (root / "cgroup.subtree_control").write_text(" ".join(f"+{c}" for c in missing))
+    return moved
+
+
+def apply_limits(tag: str, limits: dict[str, str], root: Path = FPM_CGROUP_ROOT):
+    """Create the tenant's cgroup if needed and (re)write its limits."""
+
+    cgroup = tenant_cgroup(tag, root)
+    cgroup.mkdir(exist_ok=True)
+    for name, value in limits.items():
+        (cgroup / name).write_text(value)
+
+
+def place_workers(
+    root: Path = FPM_CGROUP_ROOT, proc: Path = Path("/proc")
+) -> dict[str, int]:
+    """Move pool workers out of the master leaf into their tenant's cgroup. Returns {tag: moved}."""
+
+    moved: dict[str, int] = {}
+    for pid in (root / MASTER / "cgroup.procs").read_text().split():
+        try:
+            cmdline = (proc / pid / "cmdline").read_bytes()
+        except OSError:
+            continue  # exited in the meantime
+        if not cmdline.startswith(b"php-fpm: pool "):
+            continue
+        pool = cmdline[len(b"php-fpm: pool ") :].split(b"\0")[0].decode().strip()
+        cgroup = tenant_cgroup(pool, root)
+        if cgroup.is_dir() and _move(pid, cgroup):
+            moved[pool] = moved.get(pool, 0) + 1
+    return moved
+
+
+def remove_stale(active_tags: set[str], root: Path = FPM_CGROUP_ROOT) -> list[str]:
+    """Remove the cgroups of tenants that are gone, once their last worker exited."""
+
+    removed = []
+    for cgroup in root.glob(f"{PREFIX}*"):
+        tag = cgroup.name.removeprefix(PREFIX)
+        if tag in active_tags:
+            continue
+        try:
+            cgroup.rmdir()
+        except OSError:
+            continue  # still has workers (EBUSY), next run
+        removed.append(tag)
+    return removed
+
+
+def read_usage(tag: str, root: Path = FPM_CGROUP_ROOT) -> dict[str, int] | None:
+    """
+    {cpu_usage_usec, memory_bytes, memory_high_events} of the tenant's cgroup,
+    None if it has none. CPU time and events are cumulative since the cgroup
+    was created.
+    """
+
+    cgroup = tenant_cgroup(tag, root)
+    try:
+        cpu = _read_keyed(cgroup / "cpu.stat")
+        events = _read_keyed(cgroup / "memory.events")
+        memory = int((cgroup / "memory.current").read_text())
+    except (OSError, ValueError):
+        return None
+    return {
+        "cpu_usage_usec": cpu.get("usage_usec", 0),
+        "memory_bytes": memory,
+        "memory_high_events": events.get("high", 0),
+    }
+
+
+def _read_keyed(path: Path) -> dict[str, int]:
+    return {
+        key: int(value)
+        for key, value in (line.split() for line in path.read_text().splitlines())
+    }
+
+
+def _move(pid: str, cgroup: Path) -> bool:
+    try:
+        # one pid per write, the kernel rejects lists
+        (cgroup / "cgroup.procs").write_text(pid)
+    except OSError:
+        return False  # exited, or a kernel thread that can't be moved
+    return True
@@ -0,0 +1,128 @@
+"""
+Incremental directory size accounting.
+
+Every directory's own file total is cached together with the directory mtime.
+Adding, removing or renaming a file bumps the mtime of its parent, so on the
+next run only changed directories are re-scanned; unchanged ones cost a single
+`stat()`. In-place rewrites of existing files don't touch the directory mtime
+and are not picked up until something else changes in that directory, which
+is fine for upload trees (files are written once).
+"""
+
+import os
+from pathlib import Path
+
+from settings import VARS
+from utils.state import load_json, save_json, state_path
+
+TENANTS_ROOT = Path(VARS["paths"]["tenants"]["root"])
+
+# per-app upload directories (relative to tenant root)
+UPLOAD_DIRS: dict[str, str] = {
+    "flarum": "app/public/assets",
+    "mediawiki": "app/public/images",
+    "wordpress": "app/public/wp-content/uploads",
+}
+
+# bump when the on-disk format changes, old indexes are then simply rebuilt
+INDEX_VERSION = 1
+
+
+class DirSizeIndex:
+    """Cached per-directory totals for a single tenant."""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.path = state_path("dirsize", f"{tag}.json")
+        data = load_json(self.path, default={})
+        if data.get("version") != INDEX_VERSION:
+            data = {}
+        # dir path -> [mtime_ns, own file bytes, [subdir names]]
+        self._entries: dict[str, list] = data.get("entries", {})
+        self._dirty = False
+
+    def get_size(self, root: Path) -> int:
+        """Total size in bytes of all files under `root` (0 if it doesn't exist)."""
+
+        root_key = str(root)
+        seen: set[str] = set()
+        total = self._walk(root_key, seen) if root.is_dir() else 0
+
+        # forget directories that are gone
+        prefix = root_key.rstrip("/") + "/"
+        for key in list(self._entries):
+            if (key == root_key or key.startswith(prefix)) and key not in seen:
+                del self._entries[key]
+                self._dirty = True
+
+        return total
+
+    def get_size_mb(self, root: Path) -> float:
+        return round(self.get_size(root) / 1024 / 1024, 2)
+
+    def save(self) -> None:
+        if self._dirty:
+            save_json(self.path, {"version": INDEX_VERSION, "entries": self._entries})
+            self._dirty = False
+
+    def forget(self) -> None:
+        """Drop the persisted index (tenant removed)."""
+
+        self._entries = {}
+        self._dirty = False
+        self.path.unlink(missing_ok=True)
+
+    def _walk(self, dir_path: str, seen: set[str]) -> int:
+        seen.add(dir_path)
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return 0
+
+        cached = self._entries.get(dir_path)
+        if cached is not None and cached[0] == mtime_ns:
+            _, own_bytes, subdirs = cached
+        else:
+            own_bytes, subdirs = _scan(dir_path)
+            self._entries[dir_path] = [mtime_ns, own_bytes, subdirs]
+            self._dirty = True
+
+        # subdirectory contents can change without touching our mtime
+        return own_bytes + sum(
+            self._walk(os.path.join(dir_path, name), seen) for name in subdirs
+        )
+
+
+def _scan(dir_path: str) -> tuple[int, list[str]]:
+    own_bytes = 0
+    subdirs: list[str] = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        own_bytes += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue  # vanished while scanning
+    except OSError:
+        pass
+    return own_bytes, subdirs
+
+
+def get_upload_size_mb(tag: str, site_type: str) -> float:
+    """Size of the tenant's upload dir in MB, using (and updating) the tenant's index."""
+
+    upload_dir = TENANTS_ROOT / tag / UPLOAD_DIRS.get(site_type, "")
+    if not upload_dir.exists():
+        return 0.0
+
+    index = DirSizeIndex(tag)
+    size_mb = index.get_size_mb(upload_dir)
+    index.save()
+    return size_mb
+
+
+def forget_tenant(tag: str) -> None:
+    DirSizeIndex(tag).forget()
@@ -0,0 +1,127 @@
+"""
+Minimal FastCGI client for the PHP-FPM status page.
+
+Every tenant pool exposes `pm.status_path` (see pool-template.conf), but nginx
+only passes `*.php` to the pools, so the page is only reachable over the
+pool's own socket. Talking FastCGI directly skips nginx and a `cgi-fcgi`
+process per pool, so all pools can be scraped concurrently from one event
+loop.
+"""
+
+import asyncio
+import json
+import struct
+from os import environ
+
+# one pool socket per tenant, `{tag}` is the pool name (same as `$pool` in base-pool.conf)
+FPM_SOCKET_PATTERN = environ.get("PHP_FPM_SOCKET", "/run/php/{tag}.sock")
+FPM_STATUS_PATH = "/fpm-status"
+
+_VERSION = 1
+_BEGIN_REQUEST, _END_REQUEST, _PARAMS, _STDIN, _STDOUT, _STDERR = 1, 3, 4, 5, 6, 7
+_RESPONDER = 1
+_HEADER = struct.Struct("!BBHHBx")
+_REQUEST_ID = 1
+
+
+class FastCGIError(Exception):
+    pass
+
+
+def fpm_socket(tag: str) -> str:
+    return FPM_SOCKET_PATTERN.format(tag=tag)
+
+
+async def fastcgi_get(
+    socket_path: str, script_name: str, query: str = "", timeout: float = 2.0
+) -> tuple[dict[str, str], bytes]:
+    """GET `script_name` from the FastCGI server on `socket_path`, returns (headers, body)."""
+
+    params = {
+        "GATEWAY_INTERFACE": "FastCGI/1.0",
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": script_name,
+        "SCRIPT_FILENAME": script_name,
+        "REQUEST_URI": f"{script_name}?{query}" if query else script_name,
+        "QUERY_STRING": query,
+        "SERVER_SOFTWARE": "nocost",
+    }
+
+    async def request() -> bytes:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        try:
+            writer.write(
+                _record(_BEGIN_REQUEST, struct.pack("!HB5x", _RESPONDER, 0))
+                + _record(_PARAMS, _encode_params(params))
+                + _record(_PARAMS, b"")
+                + _record(_STDIN, b"")
+            )
+            await writer.drain()
+
+            stdout = bytearray()
+            while True:
+                header = await reader.readexactly(_HEADER.size)
+                _, record_type, _, length, padding = _HEADER.unpack(header)
+                content = await reader.readexactly(length + padding)
+                if record_type == _STDOUT:
+                    stdout += content[:length]
+                elif record_type == _STDERR:
+                    raise FastCGIError(content[:length].decode(errors="replace"))
+                elif record_type == _END_REQUEST:
+                    return bytes(stdout)
+        finally:
+            writer.close()
+
+    try:
+        response = await asyncio.wait_for(request(), timeout)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+        raise FastCGIError(f"{socket_path}: {e!r}") from e
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.decode(errors="replace").split("\r\n"):
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    status = headers.get("status", "200")
+    if not status.startswith("200"):
+        raise FastCGIError(f"{socket_path}{script_name}: {status}")
+    return headers, body
+
+
+async def get_fpm_status(tag: str, timeout: float = 2.0) -> dict:
+    """
+    Status of the tenant's pool, as returned by `?json&full`: counters since
+    the pool started plus a "processes" list with the state of every worker.
+    """
+
+    _, body = await fastcgi_get(
+        fpm_socket(tag), FPM_STATUS_PATH, query="json&full", timeout=timeout
+    )
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise FastCGIError(f"{tag}: unparsable status ({e})") from e
+
+
+def _record(record_type: int, content: bytes) -> bytes:
+    padding = -len(content) % 8
+    return (
+        _HEADER.pack(_VERSION, record_type, _REQUEST_ID, len(content), padding)
+        + content
+        + b"\0" * padding
+    )
+
+
+def _encode_params(params: dict[str, str]) -> bytes:
+    encoded = bytearray()
+    for name, value in params.items():
+        name_b, value_b = name.encode(), value.encode()
+        for length in (len(name_b), len(value_b)):
+            # lengths above 127 take 4 bytes with the high bit set
+            encoded += (
+                struct.pack("!B", length)
+                if length < 128
+                else struct.pack("!I", length | 0x80000000)
+            )
+        encoded += name_b + value_b
+    return bytes(encoded)
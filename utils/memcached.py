@@ -0,0 +1,77 @@
+"""
+Minimal memcached client for the tenants' object caches.
+
+Tenants talk to their memcached themselves (see `site_manager/object_cache.py`),
+the backend only reads the counters of each instance's `stats`, over the
+instance's unix socket, without touching any keys.
+"""
+
+import asyncio
+from os import environ
+from pathlib import Path
+
+# RuntimeDirectory= of memcached-tenant@.service, one dir per tenant
+SOCKET_ROOT = Path("/run/memcached-tenants")
+# memory limit of every tenant's instance
+OBJECT_CACHE_MB = int(environ.get("OBJECT_CACHE_MB", "32"))
+# besides the tenant user, only this group can open an instance's socket
+OBJECT_CACHE_GROUP = environ.get("OBJECT_CACHE_GROUP", "www-data")
+
+
+class MemcachedError(Exception):
+    pass
+
+
+def tenant_socket(tag: str, root: Path = SOCKET_ROOT) -> Path:
+    return root / tag / "memcached.sock"
+
+
+async def memcached_command(
+    command: str, socket_path: Path | str, timeout: float = 2.0
+) -> list[str]:
+    """Send a text protocol command, returns the response lines up to `END` (or the single reply line)."""
+
+    async def request() -> list[str]:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        try:
+            writer.write(f"{command}\r\n".encode())
+            await writer.drain()
+
+            lines = []
+            while True:
+                line = (await reader.readline()).decode().rstrip("\r\n")
+                if not line and reader.at_eof():
+                    raise MemcachedError("connection closed mid-response")
+                if line == "ERROR" or line.startswith(("CLIENT_ERROR", "SERVER_ERROR")):
+                    raise MemcachedError(line)
+                if line == "END":
+                    return lines
+                if not lines and line in ("OK", "RESET"):
+                    return [line]
+                lines.append(line)
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(request(), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise MemcachedError(f"memcached at {socket_path}: {e!r}") from e
+
+
+def parse_stats(lines: list[str]) -> dict[str, int]:
+    """{name: value} of the numeric counters in the lines of `stats`."""
+
+    stats = {}
+    for line in lines:
+        # STAT <name> <value>
+        fields = line.split()
+        if len(fields) != 3 or fields[0] != "STAT" or not fields[2].isdigit():
+            continue
+        stats[fields[1]] = int(fields[2])
+    return stats
+
+
+async def get_stats(socket_path: Path | str, timeout: float = 2.0) -> dict[str, int]:
+    """Counters of the instance on `socket_path` since it started."""
+
+    return parse_stats(await memcached_command("stats", socket_path, timeout))
@@ -0,0 +1,63 @@
+"""
+Per-tenant index of the mount table.
+
+Every tenant adds its bind (or overlay) mounts to the host's mount table, so
+looking up one tenant's mounts by scanning the table is O(all mounts). The
+index parses /proc/self/mountinfo once and groups mount points by tenant,
+so batch operations (reaper, backups) pay for one scan per batch and pass
+each tenant its own list to the playbooks.
+"""
+
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from settings import VARS
+
+TENANTS_ROOT = Path(VARS["paths"]["tenants"]["root"])
+MOUNTINFO_PATH = Path("/proc/self/mountinfo")
+
+# mountinfo escapes space, tab, newline and backslash as \ooo
+_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+def parse_mountinfo(text: str) -> list[tuple[str, str]]:
+    """[(mount point, fstype)] in mount order, from the contents of a mountinfo file."""
+
+    mounts = []
+    for line in text.splitlines():
+        # id parent major:minor root mount_point options [optional...] - fstype source super
+        fields = line.split(" ")
+        try:
+            separator = fields.index("-", 6)
+        except ValueError:
+            continue
+        mount_point = _ESCAPE.sub(lambda m: chr(int(m[1], 8)), fields[4])
+        mounts.append((mount_point, fields[separator + 1]))
+    return mounts
+
+
+class MountIndex:
+    """Mount points under the tenants root, grouped by tenant tag."""
+
+    def __init__(self, mounts: list[tuple[str, str]], root: Path = TENANTS_ROOT):
+        prefix = str(root).rstrip("/") + "/"
+        self._mounts: dict[str, list[str]] = defaultdict(list)
+        for mount_point, _ in mounts:
+            if mount_point.startswith(prefix):
+                tag = mount_point[len(prefix) :].split("/", 1)[0]
+                self._mounts[tag].append(mount_point)
+
+    @classmethod
+    def load(cls, path: Path = MOUNTINFO_PATH) -> "MountIndex":
+        return cls(parse_mountinfo(path.read_text()))
+
+    def get(self, tag: str) -> list[str]:
+        """Mount points of the tenant, children before parents (safe unmount order)."""
+        return list(reversed(self._mounts.get(tag, [])))
+
+    def count(self) -> int:
+        return sum(len(mounts) for mounts in self._mounts.values())
+
+    def __len__(self) -> int:
+        return len(self._mounts)
@@ -0,0 +1,107 @@
+"""
+Coalescing reloads for nginx and PHP-FPM.
+
+Every reload re-forks workers, so a burst of signups or removals shouldn't
+trigger one reload per change. A request bumps the service's `requested`
+counter, waits out the debounce window and then takes the service's reload
+lock (at most one reload in flight, across processes). Whoever gets the lock
+first reloads on behalf of every request made up to that point; requests
+already covered by that reload return without reloading.
+"""
+
+import asyncio
+import logging
+import subprocess
+import time
+from datetime import datetime
+from os import environ
+from pathlib import Path
+
+from settings import VARS
+from utils.state import file_lock_sync, load_json, save_json, state_path
+
+NGINX = "nginx"
+PHP_FPM = f"php{VARS['php_version']}-fpm"
+
+RELOAD_DEBOUNCE_MS = int(environ.get("RELOAD_DEBOUNCE_MS", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+def reload_services(*services: str, debounce_ms: int | None = None) -> dict[str, int]:
+    """
+    Request a reload of the given systemd services, coalesced with concurrent requests.
+
+    Returns {service: absorbed}, where `absorbed` is the number of requests the
+    reload covered (0 if our request was covered by someone else's reload).
+    """
+
+    tickets = {service: _register(service) for service in services}
+    debounce_ms = RELOAD_DEBOUNCE_MS if debounce_ms is None else debounce_ms
+    if debounce_ms > 0:
+        time.sleep(debounce_ms / 1000)
+
+    return {service: _reload(service, ticket) for service, ticket in tickets.items()}
+
+
+async def request_reload(
+    *services: str, debounce_ms: int | None = None
+) -> dict[str, int]:
+    """Async variant of `reload_services`."""
+    return await asyncio.to_thread(reload_services, *services, debounce_ms=debounce_ms)
+
+
+def get_reload_stats(service: str) -> dict:
+    """Counters of a service: requested, reloaded, reloads, last_absorbed, last_reload_at."""
+    return load_json(_state_path(service), default={})
+
+
+def _register(service: str) -> int:
+    with file_lock_sync(f"reload-{service}-state"):
+        state = load_json(_state_path(service), default={})
+        state["requested"] = state.get("requested", 0) + 1
+        save_json(_state_path(service), state)
+        return state["requested"]
+
+
+def _reload(service: str, ticket: int) -> int:
+    with file_lock_sync(f"reload-{service}"):
+        with file_lock_sync(f"reload-{service}-state"):
+            state = load_json(_state_path(service), default={})
+            reloaded = state.get("reloaded", 0)
+            if reloaded >= ticket:
+                # a reload that started after our request already covered it
+                return 0
+
+            # everything requested up to now is covered by the reload below,
+            # later requests have to wait for the next one
+            requested = state.get("requested", ticket)
+            absorbed = requested - reloaded
+            state["reloaded"] = requested
+            save_json(_state_path(service), state)
+
+        try:
+            # has to run via systemctl, nocost can't signal the master processes
+            subprocess.run(["sudo", "systemctl", "reload", service], check=True)
+        except BaseException:
+            # nobody else can move `reloaded` while we hold the reload lock,
+            # so hand the requests back to the next reload
+            with file_lock_sync(f"reload-{service}-state"):
+                state = load_json(_state_path(service), default={})
+                state["reloaded"] = reloaded
+                save_json(_state_path(service), state)
+            raise
+
+        with file_lock_sync(f"reload-{service}-state"):
+            state = load_json(_state_path(service), default={})
+            state["reloads"] = state.get("reloads", 0) + 1
+            state["last_absorbed"] = absorbed
+            state["last_reload_at"] = datetime.now().isoformat(timespec="seconds")
+            save_json(_state_path(service), state)
+
+    logger.info(f"reloaded {service} (absorbed {absorbed} requests)")
+    return absorbed
+
+
+def _state_path(service: str) -> Path:
+    return state_path("reload", f"{service}.json")
@@ -0,0 +1,85 @@
+"""
+Small JSON state files under `paths.state_root`, for data that has to survive
+between CLI runs but doesn't belong in the database.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from settings import VARS
+
+STATE_ROOT = Path(VARS["paths"]["state_root"])
+
+
+def state_path(*parts: str) -> Path:
+    return STATE_ROOT.joinpath(*parts)
+
+
+def load_json(path: Path, default: Any = None) -> Any:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return default
+    except (json.JSONDecodeError, OSError):
+        # a corrupt state file is only a cache miss, never fatal
+        return default
+
+
+def save_json(path: Path, data: Any) -> None:
+    write_atomic(path, json.dumps(data, separators=(",", ":")))
+
+
+def write_atomic(path: Path, content: str, mode: int = 0o644) -> None:
+    """Write `content` via temp file + rename, so readers never see a partial file."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+@contextlib.asynccontextmanager
+async def file_lock(name: str, wait: bool = True):
+    """
+    Exclusive inter-process lock (flock) on `<state_root>/<name>.lock`.
+    With `wait=False`, raises `BlockingIOError` if it is already held.
+    """
+
+    path = state_path(f"{name}.lock")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        if wait:
+            # blocking flock in a thread, so the event loop keeps running while we wait
+            await asyncio.to_thread(fcntl.flock, f.fileno(), fcntl.LOCK_EX)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def file_lock_sync(name: str):
+    """Blocking variant of `file_lock`, for code running outside the event loop."""
+
+    path = state_path(f"{name}.lock")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
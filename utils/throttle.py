@@ -0,0 +1,81 @@
+"""
+Load-aware throttle for background jobs.
+
+Maintenance work (table rebuilds, bulk copies) competes with tenants for the
+same disks and CPUs. A `Throttle` caps how many jobs run at once and, before
+each one starts, waits until the host is quiet enough: 1 minute load per CPU
+below `max_load` and, where the kernel exposes pressure stall information,
+the share of time tasks were stalled on IO below `max_io_pressure`. Running
+jobs are never interrupted, the throttle only delays starting new ones.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from os import environ
+from pathlib import Path
+
+THROTTLE_MAX_LOAD = float(environ.get("THROTTLE_MAX_LOAD", "0.7"))
+THROTTLE_MAX_IO_PRESSURE = float(environ.get("THROTTLE_MAX_IO_PRESSURE", "10"))
+THROTTLE_POLL_S = float(environ.get("THROTTLE_POLL_S", "15"))
+
+IO_PRESSURE_PATH = Path("/proc/pressure/io")
+
+logger = logging.getLogger(__name__)
+
+
+def get_load_per_cpu() -> float:
+    return os.getloadavg()[0] / (os.cpu_count() or 1)
+
+
+def get_io_pressure(path: Path = IO_PRESSURE_PATH) -> float | None:
+    """`some avg10` of the IO pressure, in %; None without PSI support."""
+
+    try:
+        for line in path.read_text().splitlines():
+            if line.startswith("some "):
+                fields = dict(field.split("=") for field in line.split()[1:])
+                return float(fields["avg10"])
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+class Throttle:
+    """`async with throttle:` runs the block once a slot is free and the host is quiet."""
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        max_load: float = THROTTLE_MAX_LOAD,
+        max_io_pressure: float = THROTTLE_MAX_IO_PRESSURE,
+        poll_s: float = THROTTLE_POLL_S,
+    ):
+        self._slots = asyncio.Semaphore(concurrency)
+        self.max_load = max_load
+        self.max_io_pressure = max_io_pressure
+        self.poll_s = poll_s
+        self.waited_s = 0.0
+
+    def is_busy(self) -> bool:
+        if get_load_per_cpu() > self.max_load:
+            return True
+        io_pressure = get_io_pressure()
+        return io_pressure is not None and io_pressure > self.max_io_pressure
+
+    async def __aenter__(self) -> "Throttle":
+        await self._slots.acquire()
+        started = time.monotonic()
+        try:
+            while self.is_busy():
+                logger.info(f"host busy, waiting {self.poll_s:.0f}s")
+                await asyncio.sleep(self.poll_s)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.waited_s += time.monotonic() - started
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._slots.release()